@@ -23,6 +23,7 @@ import logging
 import logging.handlers
 import platform
 import errno
+import importlib
 LOGGER = logging.getLogger("pyw3d")
 term_handler = logging.StreamHandler()
 term_handler.setFormatter(
@@ -156,7 +157,13 @@ from . import activators
 from . import triggers
 from . import actions
 from . import groups
+from . import export_context
+from . import scene_plan
+from . import incremental
 from . import w3d_export_tools
+from . import tables
+from . import cache
+from . import timing
 
 from .features import W3DFeature
 from .project import W3DProject
@@ -174,3 +181,21 @@ from .actions import W3DAction, ObjectAction, GroupAction, SoundAction, \
 from .groups import W3DGroup
 from .sounds import W3DSound
 from .w3d_export_tools import export_to_blender
+from .export_context import ExportContext
+from .scene_plan import ScenePlan
+from .incremental import ExportRecord
+from .tables import W3DObjectTable
+from .cache import SnapshotCache
+from .timing import ExportTimer
+
+
+def __getattr__(name):
+    """Import export_worker only once it is used, so that it is not already
+    imported when run with python -m pyw3d.export_worker"""
+    if name in ("export_worker", "ExportWorker"):
+        export_worker = importlib.import_module(".export_worker", __name__)
+        if name == "ExportWorker":
+            return export_worker.ExportWorker
+        return export_worker
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
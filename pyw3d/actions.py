@@ -34,16 +34,10 @@ from .xml_tools import bool2text, text2bool, text2tuple
 from .names import generate_blender_object_name, generate_group_name,\
     generate_blender_sound_name, generate_relative_to_name
 from .metaclasses import SubRegisteredClass
-try:
-    import bpy
-    from .blender_actions import ActionCondition, VisibilityAction,\
-        MoveAction, ColorAction, LinkAction, TimelineStarter, TriggerEnabler,\
-        SceneReset, ScaleAction, SoundChange
-except ImportError:
-    LOGGER.debug(
-        "Could not import from blender_actions submodule. Loading"
-        "pyw3d.actions as standalone."
-    )
+from .blender_actions import ActionCondition, VisibilityAction,\
+    MoveAction, ColorAction, LinkAction, TimelineStarter, TriggerEnabler,\
+    SceneReset, ScaleAction, SoundChange
+from .scene_plan import BrickRef
 
 
 @total_ordering
@@ -53,6 +47,8 @@ class W3DAction(W3DFeature, metaclass=SubRegisteredClass):
     Note: This is mostly a dummy class. Provides fromXML to pass XML nodes to
     appropriate subclasses"""
 
+    __slots__ = ("actuators",)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.actuators = []
@@ -187,10 +183,10 @@ def generate_object_action_logic(
             "Adding audio actuators for {} to action actuator list".format(
                 object_action["object_name"])
         )
-        sound_actuator = bpy.data.objects[
-            generate_blender_object_name(
-                object_action["object_name"])].game.actuators[
-                    generate_blender_sound_name(object_action["object_name"])]
+        sound_actuator = BrickRef(
+            generate_blender_object_name(object_action["object_name"]),
+            "actuator",
+            generate_blender_sound_name(object_action["object_name"]))
         object_action.actuators.append(sound_actuator)
 
     end_text.append(
@@ -744,8 +740,9 @@ class SoundAction(W3DAction):
                 self["sound_name"]
             )
         )
-        sound_actuator = bpy.data.objects["AUDIO"].game.actuators[
-            generate_blender_sound_name(self["sound_name"])]
+        sound_actuator = BrickRef(
+            "AUDIO", "actuator",
+            generate_blender_sound_name(self["sound_name"]))
         self.actuators.append(sound_actuator)
         return start_text + cont_text + end_text
 
@@ -758,7 +755,7 @@ class EventTriggerAction(W3DAction):
     argument_validators = {
         "trigger_name": ReferenceValidator(
             ValidPyString(),
-            ["triggers"],
+            ["trigger_events"],
             help_string="Must be the name of a trigger"
         ),
         "enable": IsBoolean()
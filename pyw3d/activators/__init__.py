@@ -16,7 +16,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 from .activators import Activator
-from .timelines import BlenderTimeline
+from .timelines import BlenderTimeline, setup_timeline_scheduler
 from .triggers import BlenderTrigger, BlenderObjectPositionTrigger, \
     BlenderPositionTrigger, BlenderLookAtTrigger, BlenderPointTrigger, \
-    BlenderDirectionTrigger, BlenderLookObjectTrigger, BlenderClickTrigger
+    BlenderDirectionTrigger, BlenderLookObjectTrigger, BlenderClickTrigger, \
+    setup_position_detector, setup_look_detector
@@ -22,8 +22,6 @@ from pyw3d.errors import EBKAC
 LOGGER = logging.getLogger("pyw3d")
 try:
     import bpy
-    from _bpy import ops as ops_module
-    BPY_OPS_CALL = ops_module.call
 except ImportError:
     LOGGER.debug(
         "Module bpy not found. Loading pyw3d.timeline as standalone")
@@ -37,15 +35,18 @@ class Activator(object):
     timeline)
     :param SortedList actions: A list of actions to be activated by this
     activator
+    :param ScenePlan scene_plan: The plan to which Blender objects and logic
+    for this activator are added
 
     Associated with every Activator is a single Blender object called
     base_object, which has a "status" property. This status is used to control
     when execution of actions is triggered.
     """
 
-    def __init__(self, name_string, actions):
+    def __init__(self, name_string, actions, scene_plan):
         self.name_string = name_string
         self.actions = actions
+        self.scene_plan = scene_plan
         self.actuators = []
         self.script_header = """
 import bge
@@ -72,6 +73,7 @@ def activate(cont):
         own['start_time'] = monotonic()
         data["active_actions"] = {}
         data["complete_actions"] = {}
+        data["next_action"] = 0
         own['offset_time'] = 0
         own['status'] = 'Continue'
     if status == 'Stop':
@@ -107,10 +109,9 @@ def activate(cont):
         names.py"""
         return self.name_string
 
-    def select_base_object(self):
-        """Select base_object in Blender for modifications"""
-        bpy.context.scene.objects.active = self.base_object
-        return self.base_object
+    def create_base_object(self):
+        """Add base_object to scene plan"""
+        self.scene_plan.add_empty(self.name)
 
     def create_status_property(self, initial_value="Stop"):
         """Creates a property called "status" which defines whether the
@@ -120,13 +121,8 @@ def activate(cont):
         an activator, if possible. Continue means that the actions are ongoing,
         and Start is used to initially start the actions associated with this
         activator"""
-        self.select_base_object()
-        BPY_OPS_CALL(
-            "object.game_property_new", None,
-            {'type': 'STRING', 'name': 'status'}
-        )
-        self.base_object.game.properties["status"].value = initial_value
-        return self.base_object.game.properties["status"]
+        return self.scene_plan.add_property(
+            self.name, "status", "STRING", initial_value)
 
     def create_enabled_property(self, initial_value=True):
         """Creates a property called "enabled" which defines whether or not
@@ -136,13 +132,8 @@ def activate(cont):
         start an activator. It is NOT checked by the activator itself. This is
         to allow the activator to be immediately disabled after activation but
         still process the remainder of its actions"""
-        self.select_base_object()
-        BPY_OPS_CALL(
-            "object.game_property_new", None,
-            {'type': 'BOOL', 'name': 'enabled'}
-        )
-        self.base_object.game.properties["enabled"].value = initial_value
-        return self.base_object.game.properties["enabled"]
+        return self.scene_plan.add_property(
+            self.name, "enabled", "BOOL", initial_value)
 
     def create_status_sensors(self):
         """Creates sensors to detect change in "status" of activator
@@ -155,51 +146,19 @@ def activate(cont):
         LOGGER.debug(
             "Creating status sensors for {}".format(self.name_string)
         )
-        self.select_base_object()
         # Create property sensor to initiate actions
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': self.name,
-                'name': 'start_sensor'
-            }
-        )
-        self.base_object.game.sensors[-1].name = "start_sensor"
-        start_sensor = self.base_object.game.sensors["start_sensor"]
-        start_sensor.property = "status"
-        start_sensor.value = "Start"
-
+        self.start_sensor = self.scene_plan.add_sensor(
+            self.name, "start_sensor", "PROPERTY",
+            property="status", value="Start")
         # Create property sensor to activate actions
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': self.name,
-                'name': 'active_sensor'
-            }
-        )
-        self.base_object.game.sensors[-1].name = "active_sensor"
-        active_sensor = self.base_object.game.sensors["active_sensor"]
-        active_sensor.use_pulse_true_level = True
-        active_sensor.property = "status"
-        active_sensor.value = "Continue"
-
+        self.active_sensor = self.scene_plan.add_sensor(
+            self.name, "active_sensor", "PROPERTY",
+            use_pulse_true_level=True, property="status", value="Continue")
         # Create property sensor to pause actions
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': self.name,
-                'name': 'stop_sensor'
-            }
-        )
-        self.base_object.game.sensors[-1].name = "stop_sensor"
-        stop_sensor = self.base_object.game.sensors["stop_sensor"]
-        stop_sensor.property = "status"
-        stop_sensor.value = "Stop"
-
-        self.start_sensor = start_sensor
-        self.active_sensor = active_sensor
-        self.stop_sensor = stop_sensor
-        return [start_sensor, active_sensor, stop_sensor]
+        self.stop_sensor = self.scene_plan.add_sensor(
+            self.name, "stop_sensor", "PROPERTY",
+            property="status", value="Stop")
+        return [self.start_sensor, self.active_sensor, self.stop_sensor]
 
     def create_controller(self):
         """Create a Python controller used to effect actions triggered by this
@@ -207,19 +166,10 @@ def activate(cont):
         LOGGER.debug(
             "Creating controller for {}".format(self.name_string)
         )
-        self.select_base_object()
-        BPY_OPS_CALL(
-            "logic.controller_add", None,
-            {
-                'type': 'PYTHON', 'object': self.name,
-                'name': 'activate'
-            }
-        )
-        controller = self.base_object.game.controllers["activate"]
-        controller.mode = "MODULE"
-        controller.module = "{}.activate".format(self.name)
-        self.controller = controller
-        return controller
+        self.controller = self.scene_plan.add_controller(
+            self.name, "activate", "PYTHON",
+            mode="MODULE", module="{}.activate".format(self.name))
+        return self.controller
 
     def create_actuators(self):
         """Create any Blender actuators"""
@@ -239,9 +189,9 @@ def activate(cont):
             raise EBKAC(
                 "Controller must be created before sensors can be linked")
         try:
-            controller.link(self.start_sensor)
-            controller.link(self.active_sensor)
-            controller.link(self.stop_sensor)
+            self.scene_plan.link(controller, sensor=self.start_sensor)
+            self.scene_plan.link(controller, sensor=self.active_sensor)
+            self.scene_plan.link(controller, sensor=self.stop_sensor)
         except AttributeError:
             raise EBKAC(
                 "Sensors must be created before they can be linked")
@@ -259,36 +209,19 @@ def activate(cont):
                 "Controller must be created before actuators can be linked")
         for action in self.get_actions():
             for actuator in action.actuators:
-                actuator.link(controller)
-
-    def _create_base_object(self, name):
-        """Create the object which controls the current status of the
-        activator"""
-        base_object = bpy.data.objects.new(name, None)
-        bpy.context.scene.objects.link(base_object)
-        return base_object
+                self.scene_plan.link(controller, actuator=actuator)
 
     @property
     def base_object(self):
-        """Returns the object which controls the current status of the
-        activator, creating it if necessary"""
-        try:
-            return bpy.data.objects[self.name]
-        except KeyError:
-            blender_object = self._create_base_object(self.name)
-            blender_object.name = self.name
-            return blender_object
+        """Returns the Blender object which controls the current status of the
+        activator, once the scene plan has been applied"""
+        return bpy.data.objects[self.name]
 
     @property
-    def script(self):
-        """Returns the Python control script for base_object, creating it if
-        necessary"""
-        script_name = ".".join((self.name, "py"))
-        try:
-            return bpy.data.texts[script_name]
-        except KeyError:
-            bpy.data.texts.new(script_name)
-            return bpy.data.texts[script_name]
+    def script_name(self):
+        """Name of the text block holding the Python control script for
+        base_object"""
+        return ".".join((self.name, "py"))
 
     def generate_action_logic(self):
         """Returns a string to be written into Python control script for
@@ -307,6 +240,7 @@ def activate(cont):
         is crucial that both of these steps (and writing Python logic, if
         necessary) be called when creating an Activator.
         """
+        self.create_base_object()
         self.create_status_property()
         self.create_status_sensors()
         self.create_controller()
@@ -331,5 +265,5 @@ def activate(cont):
             self.generate_action_logic(),
             self.script_footer
         ]
-        self.script.write("\n".join(script_text))
-        return self.script
+        self.scene_plan.write_text(self.script_name, "\n".join(script_text))
+        return self.script_name
@@ -16,13 +16,57 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 """A Blender-based timeline implementation
+
+By default, each timeline is driven by its own Python controller, which runs
+on every tick while the timeline is active. In scheduled mode, all timelines
+are instead driven by a single scheduler object (see
+:func:`setup_timeline_scheduler`). Each timeline then only defines its
+actions, and keeps a "status" property and status sensors, which notify the
+scheduler whenever its status is changed (e.g. by a TimelineAction).
 """
 from pyw3d.names import generate_blender_timeline_name
+from pyw3d.scene_plan import BrickRef
+from pyw3d.blender_scripts import TIMELINE_SCHEDULER_SCRIPT
 from .activators import Activator
 
+SCHEDULER_OBJECT = "TIMELINE_SCHEDULER"
+SCHEDULED_SCRIPT_HEADER = """
+import bge
+from angles import *
+from w3d_settings import *
+from group_defs import *
+import mathutils
+from time import monotonic
+import random
+import logging
+"""
+SCHEDULER_CONTROLLER = BrickRef(SCHEDULER_OBJECT, "controller", "schedule")
+
+
+def setup_timeline_scheduler(scene_plan):
+    """Add the object and logic of the scheduler which drives all timelines
+    in scheduled mode
+
+    :param ScenePlan scene_plan: The plan to which logic is added
+    """
+    scene_plan.add_empty(SCHEDULER_OBJECT)
+    sensor = scene_plan.add_sensor(
+        SCHEDULER_OBJECT, "tick", "ALWAYS",
+        use_pulse_true_level=True, tick_skip=0)
+    controller = scene_plan.add_controller(
+        SCHEDULER_OBJECT, SCHEDULER_CONTROLLER.name, "PYTHON",
+        mode="MODULE", module="scheduler.schedule")
+    scene_plan.link(controller, sensor=sensor)
+    scene_plan.write_text("scheduler.py", TIMELINE_SCHEDULER_SCRIPT)
+    return controller
+
 
 class BlenderTimeline(Activator):
-    """Activates actions at specified times"""
+    """Activates actions at specified times
+
+    :param bool scheduled: If True, run actions from the shared timeline
+    scheduler rather than from a controller of this timeline
+    """
 
     @property
     def name(self):
@@ -33,20 +77,113 @@ class BlenderTimeline(Activator):
             initial_value=("Stop", "Start")[self.start_immediately])
 
     def generate_action_logic(self):
-        action_logic = ["        # ACTION LOGIC BEGINS HERE"]
-        action_index = 0
-        for time, action in self.actions:
-            action_logic.extend(
+        """Returns a string to be written into Python control script for
+        dispatching W3DActions
+
+        Rather than checking the conditions of every action on every tick,
+        the script keeps a table of action start times and a cursor to the
+        next action that has not yet started. Since actions are sorted by
+        time, each tick need only run the currently active actions followed
+        by those which have just become due (see
+        :meth:`generate_action_functions`)."""
+        action_logic = [
+            "        # ACTION LOGIC BEGINS HERE",
+            "        for index in sorted(data['active_actions']):",
+            "            if ACTIONS[index](cont, own, scene, data, time):",
+            "                stop_block = True",
+            "        while (data['next_action'] < len(START_TIMES) and",
+            "                START_TIMES[data['next_action']] <= time):",
+            "            index = data['next_action']",
+            "            data['next_action'] += 1",
+            "            if ACTIONS[index](cont, own, scene, data, time):",
+            "                stop_block = True"
+        ]
+        self.script_footer = "\n".join(
+            [
+                self.script_footer.format(action_count=len(self.actions)),
+                "            data['next_action'] = 0"
+            ]
+        )
+        return "\n".join(action_logic)
+
+    def generate_action_functions(self):
+        """Returns a string defining one function for each action in the
+        Python control script, along with the table of start times used to
+        dispatch them
+
+        Each function runs the start, continue, and end logic of its action
+        exactly as the conditions of that action dictate and returns True if
+        the action restarted this timeline."""
+        action_functions = []
+        for action_index, (time, action) in enumerate(self.actions):
+            action_functions.append(
+                "def action_{}(cont, own, scene, data, time):".format(
+                    action_index))
+            action_functions.append("    stop_block = False")
+            action_functions.extend(
                 action.generate_blender_logic(
                     time_condition=time,
                     index_condition=action_index,
-                    offset=2)
+                    offset=1)
             )
-            action_index += 1
-        self.script_footer = self.script_footer.format(
-            action_count=len(self.actions)
-        )
-        return "\n".join(action_logic)
+            action_functions.append("    return stop_block")
+        action_functions.append("START_TIMES = {}".format(
+            [time for time, action in self.actions]))
+        action_functions.append("ACTIONS = [{}]".format(", ".join(
+            "action_{}".format(action_index)
+            for action_index in range(len(self.actions))
+        )))
+        return "\n".join(action_functions)
+
+    def create_status_sensors(self):
+        if not self.scheduled:
+            return super(BlenderTimeline, self).create_status_sensors()
+        # The scheduler need only be notified when status changes, so no
+        # sensor pulses while the timeline is active
+        self.start_sensor = self.scene_plan.add_sensor(
+            self.name, "start_sensor", "PROPERTY",
+            property="status", value="Start")
+        self.active_sensor = self.scene_plan.add_sensor(
+            self.name, "active_sensor", "PROPERTY",
+            property="status", value="Continue")
+        self.stop_sensor = self.scene_plan.add_sensor(
+            self.name, "stop_sensor", "PROPERTY",
+            property="status", value="Stop")
+        return [self.start_sensor, self.active_sensor, self.stop_sensor]
+
+    def create_controller(self):
+        if not self.scheduled:
+            return super(BlenderTimeline, self).create_controller()
+        self.controller = self.scene_plan.add_controller(
+            self.name, "notify", "PYTHON",
+            mode="MODULE", module="scheduler.notify")
+        return self.controller
+
+    def link_actuators(self):
+        """Link actuators necessary to invoke actions to the controller which
+        runs them"""
+        if not self.scheduled:
+            return super(BlenderTimeline, self).link_actuators()
+        for action in self.get_actions():
+            for actuator in action.actuators:
+                self.scene_plan.link(SCHEDULER_CONTROLLER, actuator=actuator)
+
+    def write_python_logic(self):
+        """Write any necessary Python controller scripts for this activator"""
+        if self.scheduled:
+            script_text = [
+                SCHEDULED_SCRIPT_HEADER,
+                self.generate_action_functions()
+            ]
+        else:
+            script_text = [
+                self.script_header,
+                self.generate_action_logic(),
+                self.script_footer,
+                self.generate_action_functions()
+            ]
+        self.scene_plan.write_text(self.script_name, "\n".join(script_text))
+        return self.script_name
 
     def get_actions(self):
         """Return a list of W3DActions that are controlled by this activator
@@ -59,6 +196,9 @@ class BlenderTimeline(Activator):
         all_actions = [action[1] for action in self.actions]
         return all_actions
 
-    def __init__(self, name, actions, start_immediately=False):
-        super(BlenderTimeline, self).__init__(name, actions)
+    def __init__(
+            self, name, actions, scene_plan, start_immediately=False,
+            scheduled=False):
+        super(BlenderTimeline, self).__init__(name, actions, scene_plan)
         self.start_immediately = start_immediately
+        self.scheduled = scheduled
@@ -17,7 +17,7 @@
 
 from .triggers import BlenderTrigger
 from .object_triggers import BlenderObjectPositionTrigger
-from .user_triggers import BlenderPositionTrigger
+from .user_triggers import BlenderPositionTrigger, setup_position_detector
 from .look_triggers import BlenderLookAtTrigger, BlenderPointTrigger, \
-    BlenderDirectionTrigger, BlenderLookObjectTrigger
+    BlenderDirectionTrigger, BlenderLookObjectTrigger, setup_look_detector
 from .links import BlenderClickTrigger
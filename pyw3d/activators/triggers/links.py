@@ -24,8 +24,6 @@ from pyw3d.blender_scripts import DISABLE_LINK_SCRIPT, UNSELECT_LINK_SCRIPT,\
 LOGGER = logging.getLogger("pyw3d")
 try:
     import bpy
-    from _bpy import ops as ops_module
-    BPY_OPS_CALL = ops_module.call
 except ImportError:
     LOGGER.debug(
         "Module bpy not found. Loading pyw3d.timeline as standalone")
@@ -35,74 +33,29 @@ class BlenderClickTrigger(BlenderTrigger):
     """Activator based on mouseclick on objects in virtual space
 
     :param str object_name: The name of the clickable object
+    :param tuple object_color: RGB color (0-255) of the clickable object
+    :param bool object_visible: Whether the clickable object is initially
+    visible
     """
 
+    def create_base_object(self):
+        """Clickable object is created along with the rest of the geometry, so
+        nothing is added to the scene plan"""
+        return None
+
     def create_click_status_property(self):
         """Add property to track if link is disabled, unselected, selected, or
         activated"""
-        click_object = self.select_base_object()
-        BPY_OPS_CALL(
-            "object.game_property_new", None,
-            {'type': 'STRING', 'name': 'click_status'}
-        )
-        click_object.game.properties["click_status"].value = "False"
-        return click_object.game.properties["click_status"]
+        return self.scene_plan.add_property(
+            self.name, "click_status", "STRING", "False")
 
     def create_click_status_sensors(self):
         """Add property sensors for click status"""
-        self.select_base_object()
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': self.name,
-                'name': 'disabled_sensor'
-            }
-        )
-        self.base_object.game.sensors[-1].name = "disabled_sensor"
-        click_sensor = self.base_object.game.sensors["disabled_sensor"]
-        click_sensor.property = "click_status"
-        click_sensor.value = "disabled"
-        self.disabled_sensor = click_sensor
-
-        self.select_base_object()
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': self.name,
-                'name': 'unselected_sensor'
-            }
-        )
-        self.base_object.game.sensors[-1].name = "unselected_sensor"
-        click_sensor = self.base_object.game.sensors["unselected_sensor"]
-        click_sensor.property = "click_status"
-        click_sensor.value = "unselected"
-        self.unselected_sensor = click_sensor
-
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': self.name,
-                'name': 'selected_sensor'
-            }
-        )
-        self.base_object.game.sensors[-1].name = "selected_sensor"
-        click_sensor = self.base_object.game.sensors["selected_sensor"]
-        click_sensor.property = "click_status"
-        click_sensor.value = "selected"
-        self.selected_sensor = click_sensor
-
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': self.name,
-                'name': 'activated_sensor'
-            }
-        )
-        self.base_object.game.sensors[-1].name = "activated_sensor"
-        click_sensor = self.base_object.game.sensors["activated_sensor"]
-        click_sensor.property = "click_status"
-        click_sensor.value = "activated"
-        self.activated_sensor = click_sensor
+        for status in ("disabled", "unselected", "selected", "activated"):
+            sensor_name = "{}_sensor".format(status)
+            setattr(self, sensor_name, self.scene_plan.add_sensor(
+                self.name, sensor_name, "PROPERTY",
+                property="click_status", value=status))
 
         return (self.disabled_sensor, self.unselected_sensor,
                 self.selected_sensor, self.activated_sensor)
@@ -110,58 +63,19 @@ class BlenderClickTrigger(BlenderTrigger):
     def create_click_status_controllers(self):
         """Add controllers to handle when click status changes
         """
-        click_object = self.select_base_object()
-        BPY_OPS_CALL(
-            "logic.controller_add", None,
-            {
-                'type': 'PYTHON', 'object': self.name,
-                'name': 'disabled_controller'
-            }
-        )
-        controller = click_object.game.controllers["disabled_controller"]
-        controller.mode = "MODULE"
-        controller.module = "{}.disable_link".format(self.name)
-        controller.link(sensor=self.disabled_sensor)
-        self.disabled_controller = controller
-
-        BPY_OPS_CALL(
-            "logic.controller_add", None,
-            {
-                'type': 'PYTHON', 'object': self.name,
-                'name': 'unselected_controller'
-            }
-        )
-        controller = click_object.game.controllers["unselected_controller"]
-        controller.mode = "MODULE"
-        controller.module = "{}.unselect_link".format(self.name)
-        controller.link(sensor=self.unselected_sensor)
-        self.unselected_controller = controller
-
-        BPY_OPS_CALL(
-            "logic.controller_add", None,
-            {
-                'type': 'PYTHON', 'object': self.name,
-                'name': 'selected_controller'
-            }
-        )
-        controller = click_object.game.controllers["selected_controller"]
-        controller.mode = "MODULE"
-        controller.module = "{}.select_link".format(self.name)
-        controller.link(sensor=self.selected_sensor)
-        self.selected_controller = controller
-
-        BPY_OPS_CALL(
-            "logic.controller_add", None,
-            {
-                'type': 'PYTHON', 'object': self.name,
-                'name': 'activated_controller'
-            }
-        )
-        controller = click_object.game.controllers["activated_controller"]
-        controller.mode = "MODULE"
-        controller.module = "{}.activate_link".format(self.name)
-        controller.link(sensor=self.activated_sensor)
-        self.activated_controller = controller
+        for status, function in (
+                ("disabled", "disable_link"),
+                ("unselected", "unselect_link"),
+                ("selected", "select_link"),
+                ("activated", "activate_link")):
+            controller_name = "{}_controller".format(status)
+            controller = self.scene_plan.add_controller(
+                self.name, controller_name, "PYTHON",
+                mode="MODULE", module="{}.{}".format(self.name, function))
+            self.scene_plan.link(
+                controller,
+                sensor=getattr(self, "{}_sensor".format(status)))
+            setattr(self, controller_name, controller)
 
         return (
             self.disabled_controller, self.unselected_controller,
@@ -171,29 +85,17 @@ class BlenderClickTrigger(BlenderTrigger):
     def create_click_count_property(self):
         """Add property to keep track of how many times link has been
         clicked"""
-        self.select_base_object()
-        BPY_OPS_CALL(
-            "object.game_property_new", None,
-            {'type': 'INT', 'name': 'clicks'}
-        )
-        self.base_object.game.properties["clicks"].value = 0
-        return self.base_object.game.properties["clicks"]
+        return self.scene_plan.add_property(self.name, "clicks", "INT", 0)
 
     def create_clickable_property(self):
         """Add property to track if object is clickable
 
         Note: In order to make an object unclickable, this property should be
         *deleted*, not merely set to False"""
-        click_object = self.select_base_object()
-        if (
-                (not click_object.hide_render) and
-                self.base_object.game.properties['enabled']):
-            BPY_OPS_CALL(
-                "object.game_property_new", None,
-                {'type': 'BOOL', 'name': 'clickable'}
-            )
-            click_object.game.properties["clickable"].value = True
-            return click_object.game.properties["clickable"]
+        # Same value as the "enabled" property (see create_enabled_property)
+        if self.object_visible and self.enable_immediately:
+            return self.scene_plan.add_property(
+                self.name, "clickable", "BOOL", True)
         return None
 
     def create_blender_objects(self):
@@ -279,18 +181,22 @@ class BlenderClickTrigger(BlenderTrigger):
         return " or ".join(end_condition)
 
     def __init__(
-            self, name, actions, object_name,
+            self, name, actions, scene_plan, object_name,
             enable_immediately=True, remain_enabled=True,
             select_color=(255, 0, 0), enable_color=(0, 128, 255),
-            reset_clicks=-1):
+            reset_clicks=-1, object_color=(255, 255, 255),
+            object_visible=True):
         self.select_color = select_color
         self.reset_clicks = reset_clicks
         self.enable_color = enable_color
         self.object_name = object_name
-        self.disable_color = tuple(self.base_object.color)
+        self.object_visible = object_visible
+        self.disable_color = tuple(
+            [channel / 255.0 for channel in object_color] +
+            [int(object_visible)])
         self.select_color = tuple(select_color)
         super(BlenderClickTrigger, self).__init__(
-            name, actions, duration=0,
+            name, actions, scene_plan, duration=0,
             enable_immediately=enable_immediately,
             remain_enabled=remain_enabled)
         if reset_clicks > 0:
@@ -307,5 +213,6 @@ class BlenderClickTrigger(BlenderTrigger):
                 reset_clicks=reset_clicks
             )
         if enable_immediately:
-            for i in range(len(self.enable_color)):
-                self.base_object.color[i] = self.enable_color[i]
+            color = list(self.disable_color)
+            color[:len(self.enable_color)] = self.enable_color
+            scene_plan.set_object(object_name, color=color)
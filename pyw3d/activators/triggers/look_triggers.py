@@ -16,227 +16,125 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
 """Blender-based implementation of triggers based on the user's field of view
+
+Rather than each look trigger running its own controller on the camera, a
+single detector on the camera finds the direction in which the user is looking
+once per tick and tests the targets of all enabled look triggers against it
+(see :func:`setup_look_detector`). Directions are tested against precomputed
+cosines of their angles; points and objects are first tested against a cone
+containing the view frustum, so that the frustum itself is only checked for
+targets which may lie within it.
 """
 import math
 import logging
 from pyw3d.names import generate_blender_object_name
-from pyw3d.errors import EBKAC
+from pyw3d.blender_scripts import LOOK_DETECTOR_SCRIPT
 from .triggers import BlenderTrigger
 LOGGER = logging.getLogger("pyw3d")
-try:
-    import bpy
-    from _bpy import ops as ops_module
-    BPY_OPS_CALL = ops_module.call
-except ImportError:
-    LOGGER.debug(
-        "Module bpy not found. Loading "
-        "pyw3d.activators.triggers.look_triggers as standalone")
-
-
-class BlenderLookAtTrigger(BlenderTrigger):
-    """Activator based on where user is looking"""
-    # TODO: Restructure methods to be consistent with other triggers
-
-    def select_camera(self):
-        """Select the main camera for modifications"""
-        camera_object = bpy.data.objects["CAMERA"]
-        bpy.context.scene.objects.active = camera_object
-        return camera_object
-
-    def create_enabled_copier(self):
-        """Create system to copy enabled value to camera property
-
-        Adds a sensor to detect when "enabled" property is changed on
-        base_object, a trivial "and" controller, and an actuator to copy the
-        "enabled" property to the camera property of the same name as this
-        trigger.This allows camera to only go through costly detection actions
-        when the trigger is enabled.
-        """
-        self.select_base_object()
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': self.name,
-                'name': 'enabled_sensor'
-            }
-        )
-        self.base_object.game.sensors[-1].name = "enabled_sensor"
-        enabled_sensor = self.base_object.game.sensors["enabled_sensor"]
-        enabled_sensor.property = "enabled"
-        enabled_sensor.evaluation_type = "PROPCHANGED"
-
-        self.select_base_object()
-        BPY_OPS_CALL(
-            "logic.controller_add", None,
-            {
-                'type': 'LOGIC_AND', 'object': self.name,
-                'name': 'enable'
-            }
-        )
-        controller = self.base_object.game.controllers["enable"]
 
-        camera_object = self.select_camera()
-        BPY_OPS_CALL(
-            "logic.actuator_add", None,
-            {
-                'type': 'PROPERTY', 'object': 'CAMERA',
-                'name': self.name
-            }
-        )
-        camera_object.game.actuators[-1].name = self.name
-        property_copier = camera_object.game.actuators[self.name]
-        property_copier.mode = "COPY"
-        property_copier.property = self.name
-        property_copier.object = self.base_object
-        property_copier.object_property = "enabled"
+TARGET_TABLES = ("DIRECTION_TARGETS", "POINT_TARGETS", "OBJECT_TARGETS")
+
+
+def generate_target_table(look_triggers):
+    """Return Python module defining the targets of the given
+    BlenderLookAtTriggers"""
+    tables = {table_name: [] for table_name in TARGET_TABLES}
+    for trigger in look_triggers:
+        target = trigger.get_target()
+        if target is not None:
+            tables[trigger.target_table].append(target)
+    table = []
+    for table_name in TARGET_TABLES:
+        table.append("{} = [".format(table_name))
+        table.extend("    {!r},".format(target) for target in tables[
+            table_name])
+        table.append("]")
+    return "\n".join(table)
+
+
+def setup_look_detector(scene_plan, look_triggers):
+    """Add the logic of the detector shared by all BlenderLookAtTriggers to
+    the main camera
+
+    :param ScenePlan scene_plan: The plan to which logic is added
+    :param list look_triggers: All BlenderLookAtTriggers in the project
+    """
+    sensor = scene_plan.add_sensor(
+        "CAMERA", "look_detector", "ALWAYS",
+        use_pulse_true_level=True, tick_skip=0)
+    controller = scene_plan.add_controller(
+        "CAMERA", "look_detector", "PYTHON",
+        mode="MODULE", module="look_detector.detect")
+    scene_plan.link(controller, sensor=sensor)
+    scene_plan.write_text("look_detector.py", LOOK_DETECTOR_SCRIPT)
+    scene_plan.write_text(
+        "look_targets.py", generate_target_table(look_triggers))
+    return controller
 
-        return (enabled_sensor, controller, property_copier)
 
-    def setup_camera(self):
-        """Create a property, property sensor, and Python controller on the
-        main camera for keeping track of if this trigger is enabled
-
-        This setup is used for efficiency. By having the camera know when this
-        trigger is enabled, we can have it only perform (expensive) checks
-        related to the trigger when it is in fact enabled.
-        """
-        camera_object = self.select_camera()
-        # Property on camera to keep track of when trigger is enabled
-        BPY_OPS_CALL(
-            "object.game_property_new", None,
-            {'type': 'BOOL', 'name': self.name}
-        )
-        camera_object.game.properties[
-            self.name].value = self.enable_immediately
-        # Sensor to fire continuously while trigger is enabled
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': 'CAMERA',
-                'name': self.name
-            }
-        )
-        camera_object.game.sensors[-1].name = self.name
-        camera_enable_sensor = camera_object.game.sensors[self.name]
-        camera_enable_sensor.use_pulse_true_level = True
-        camera_enable_sensor.tick_skip = 0
-        camera_enable_sensor.property = self.name
-        camera_enable_sensor.value = str(self.enable_immediately)
-        self.camera_enable_sensor = camera_enable_sensor
-
-        # Create controller to detect trigger events
-        camera_object = self.select_camera()
-        BPY_OPS_CALL(
-            "logic.controller_add", None,
-            {
-                'type': 'PYTHON', 'object': 'CAMERA',
-                'name': self.name
-            }
-        )
-        camera_object.game.controllers[-1].name = self.name
-        controller = camera_object.game.controllers[self.name]
-        controller.mode = "MODULE"
-        controller.module = "{}.detect_event".format(self.name)
-
-        return camera_object
-
-    def link_camera_bricks(self):
-        """Link BGE logic bricks for camera"""
-        camera_object = self.select_camera()
-        camera_controller = camera_object.game.controllers[self.name]
-        try:
-            camera_controller.link(sensor=self.camera_enable_sensor)
-        except AttributeError:
-            raise EBKAC(
-                "Enabled sensor must be created on camera before being linked")
+class BlenderLookAtTrigger(BlenderTrigger):
+    """Activator based on where user is looking
 
-        enabled_sensor = self.base_object.game.sensors["enabled_sensor"]
-        enabled_controller = self.base_object.game.controllers["enable"]
-        property_copier = camera_object.game.actuators[self.name]
-        enabled_controller.link(
-            sensor=enabled_sensor, actuator=property_copier)
+    Detection is performed by the shared look detector, which starts this
+    trigger when enabled and its target comes into view."""
 
-        return (enabled_controller, camera_controller)
+    target_table = None
 
-    def create_blender_objects(self):
-        super(BlenderLookAtTrigger, self).create_blender_objects()
-        self.setup_camera()
-        self.create_enabled_copier()
+    def get_target(self):
+        """Return the entry for this trigger in the table of targets named by
+        target_table, or None if it can never be triggered
 
-    def link_logic_bricks(self):
-        super(BlenderLookAtTrigger, self).link_logic_bricks()
-        self.link_camera_bricks()
+        Dummy method intended to be overridden by subclasses"""
+        return None
 
 
 class BlenderPointTrigger(BlenderLookAtTrigger):
     """Trigger based on user looking at a point in virtual space"""
 
+    target_table = "POINT_TARGETS"
+
     def __init__(
-            self, name, actions, point, duration=0, enable_immediately=True,
-            remain_enabled=True):
+            self, name, actions, scene_plan, point, duration=0,
+            enable_immediately=True, remain_enabled=True):
         super(BlenderPointTrigger, self).__init__(
-            name, actions, duration=duration,
+            name, actions, scene_plan, duration=duration,
             enable_immediately=enable_immediately,
             remain_enabled=remain_enabled)
         self.point = point
 
-    def generate_detection_logic(self):
-        """Add a function to Python control script to detect user position"""
-        detection_logic = [
-            "\ndef detect_event(cont):",
-            "    scene = bge.logic.getCurrentScene()",
-            "    own = cont.owner",
-            "    trigger = scene.objects['{}']".format(
-                self.name),
-            "    # Following is total hack since pointInsideFrustum seems to",
-            "    # give false positive on first frame in certain",
-            "    # circumstances",
-            "    if 'initialized' not in trigger:",
-            "        trigger['initialized'] = True",
-            "        return",
-            "    if (own.pointInsideFrustum({})".format(
-                tuple(self.point)),
-            "            and trigger['enabled'] and",
-            "            trigger['status'] == 'Stop'):",
-            "        trigger['status'] = 'Start'"
-        ]
-        detection_logic = "\n".join(detection_logic)
-        return detection_logic
+    def get_target(self):
+        return (self.name, tuple(self.point))
 
 
 class BlenderDirectionTrigger(BlenderLookAtTrigger):
     """Trigger based on user looking in a direction in virtual space"""
 
+    target_table = "DIRECTION_TARGETS"
+
     def __init__(
-            self, name, actions, direction, duration=0,
+            self, name, actions, scene_plan, direction, duration=0,
             enable_immediately=True, remain_enabled=True, angle=30):
         super(BlenderDirectionTrigger, self).__init__(
-            name, actions, duration=duration,
+            name, actions, scene_plan, duration=duration,
             enable_immediately=enable_immediately,
             remain_enabled=remain_enabled)
         self.direction = direction
         self.angle = angle
 
-    def generate_detection_logic(self):
-        """Add a function to Python control script to detect user position"""
-        detection_logic = [
-            "\ndef detect_event(cont):",
-            "    scene = bge.logic.getCurrentScene()",
-            "    own = cont.owner",
-            "    cam_dir = (own.getCameraToWorld().to_quaternion() *",
-            "        mathutils.Vector((0, 0, -1)))",
-            "    target_dir = mathutils.Vector({})".format(
-                tuple(self.direction)),
-            "    angle = abs(cam_dir.angle(target_dir, 3.14))",
-            "    trigger = scene.objects['{}']".format(
-                self.name),
-            "    if (angle < {}".format(math.radians(self.angle)),
-            "            and trigger['enabled'] and",
-            "            trigger['status'] == 'Stop'):",
-            "        trigger['status'] = 'Start'"
-        ]
-        detection_logic = "\n".join(detection_logic)
-        return detection_logic
+    def get_target(self):
+        """Return name, unit direction, and cosine of angle within which the
+        camera must point along that direction"""
+        length = math.sqrt(sum(
+            component * component for component in self.direction))
+        if length == 0:
+            LOGGER.warning(
+                "Direction of {} has length zero and can never be looked "
+                "along".format(self.name_string))
+            return None
+        return (
+            self.name,
+            tuple(component / length for component in self.direction),
+            math.cos(min(math.radians(self.angle), math.pi)))
 
 
 class BlenderLookObjectTrigger(BlenderLookAtTrigger):
@@ -244,36 +142,17 @@ class BlenderLookObjectTrigger(BlenderLookAtTrigger):
 
     :param str look_at_object: Name of the W3DObject to be looked at"""
 
+    target_table = "OBJECT_TARGETS"
+
     def __init__(
-            self, name, actions, look_at_object, duration=0,
+            self, name, actions, scene_plan, look_at_object, duration=0,
             enable_immediately=True, remain_enabled=True, angle=30):
         super(BlenderLookObjectTrigger, self).__init__(
-            name, actions, duration=duration,
+            name, actions, scene_plan, duration=duration,
             enable_immediately=enable_immediately,
             remain_enabled=remain_enabled)
         self.look_at_object = generate_blender_object_name(look_at_object)
         self.angle = angle
 
-    def generate_detection_logic(self):
-        """Add a function to Python control script to detect user position"""
-        detection_logic = [
-            "\ndef detect_event(cont):",
-            "    scene = bge.logic.getCurrentScene()",
-            "    own = cont.owner",
-            "    position = scene.objects['{}'].position".format(
-                self.look_at_object),
-            "    trigger = scene.objects['{}']".format(
-                self.name),
-            "    # Following is total hack since pointInsideFrustum seems to",
-            "    # give false positive on first frame in certain",
-            "    # circumstances",
-            "    if 'initialized' not in trigger:",
-            "        trigger['initialized'] = True",
-            "        return",
-            "    if (own.pointInsideFrustum(position)",
-            "            and trigger['enabled']",
-            "            and trigger['status'] == 'Stop'):",
-            "        trigger['status'] = 'Start'"
-        ]
-        detection_logic = "\n".join(detection_logic)
-        return detection_logic
+    def get_target(self):
+        return (self.name, self.look_at_object)
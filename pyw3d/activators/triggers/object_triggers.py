@@ -22,14 +22,6 @@ import logging
 LOGGER = logging.getLogger("pyw3d")
 from pyw3d.errors import EBKAC
 from .triggers import BlenderTrigger
-try:
-    import bpy
-    from _bpy import ops as ops_module
-    BPY_OPS_CALL = ops_module.call
-except ImportError:
-    LOGGER.debug(
-        "Module bpy not found. Loading "
-        "pyw3d.activators.triggers.object_triggers as standalone")
 
 
 class BlenderObjectPositionTrigger(BlenderTrigger):
@@ -45,46 +37,26 @@ class BlenderObjectPositionTrigger(BlenderTrigger):
 
     def create_enabled_sensor(self):
         """Add a sensor to fire continuously while trigger is enabled"""
-        self.select_base_object()
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': self.name,
-                'name': 'enabled_sensor'
-            }
-        )
-        self.base_object.game.sensors[-1].name = "enabled_sensor"
-        enable_sensor = self.base_object.game.sensors["enabled_sensor"]
-        enable_sensor.use_pulse_true_level = True
-        enable_sensor.tick_skip = 0
-        enable_sensor.property = "enabled"
-        enable_sensor.value = "True"
-        self.enable_sensor = enable_sensor
-
-        return enable_sensor
+        self.enable_sensor = self.scene_plan.add_sensor(
+            self.name, "enabled_sensor", "PROPERTY",
+            use_pulse_true_level=True, tick_skip=0, property="enabled",
+            value="True")
+        return self.enable_sensor
 
     def create_detection_controller(self):
         """Add a controller for detecting specified event"""
-
-        BPY_OPS_CALL(
-            "logic.controller_add", None,
-            {
-                'type': 'PYTHON', 'object': self.name,
-                'name': 'detect'
-            }
-        )
-        controller = self.base_object.game.controllers["detect"]
-        controller.mode = "MODULE"
-        controller.module = "{}.detect_event".format(self.name)
-        self.detect_controller = controller
-        return controller
+        self.detect_controller = self.scene_plan.add_controller(
+            self.name, "detect", "PYTHON",
+            mode="MODULE", module="{}.detect_event".format(self.name))
+        return self.detect_controller
 
     def link_detection_bricks(self):
         """Link necessary logic bricks for event detection
 
         :raises EBKAC: if controller or sensor does not exist"""
         try:
-            self.detect_controller.link(sensor=self.enable_sensor)
+            self.scene_plan.link(
+                self.detect_controller, sensor=self.enable_sensor)
         except AttributeError:
             raise EBKAC(
                 "Detection sensor and controller must be created before they "
@@ -92,31 +64,66 @@ class BlenderObjectPositionTrigger(BlenderTrigger):
         return self.detect_controller
 
     def generate_detection_logic(self):
-        """Add a function to Python control script to detect user position
-        """
+        """Add a function to Python control script to detect object position
 
+        References to the tracked objects are looked up once and cached in
+        TRACKED_OBJECTS, and are looked up again only if one of them has been
+        ended. Each tick, the objects are checked in a single pass, which
+        stops as soon as the outcome is known.
+        """
+        corners = list(zip(self.box["corner1"], self.box["corner2"]))
+        in_box = " and ".join(
+            "{} <= position[{}] <= {}".format(
+                min(corners[axis]), axis, max(corners[axis]))
+            for axis in range((3, 2)[self.box["ignore_y"]]))
+        if self.box["direction"] == "Inside":
+            counted = in_box
+        else:
+            counted = "not ({})".format(in_box)
+        if self.detect_any:
+            # Any object counted decides the outcome
+            check = [
+                "        if {}:".format(counted),
+                "            return True",
+                "    return False"
+            ]
+        else:
+            # Any object not counted decides the outcome
+            check = [
+                "        if not ({}):".format(counted),
+                "            return False",
+                "    return True"
+            ]
         detection_logic = [
+            "\nTRACKED_NAMES = {}".format(self.objects_string),
+            "TRACKED_OBJECTS = []",
+            "\ndef find_tracked_objects(scene):",
+            "    TRACKED_OBJECTS[:] = [",
+            "        object_ for object_ in (",
+            "            scene.objects.get(name) for name in TRACKED_NAMES)",
+            "        if object_ is not None]",
+            "\ndef in_region():",
+            "    for object_ in TRACKED_OBJECTS:",
+            "        if object_.invalid:",
+            "            return None",
+            "        position = object_.position"
+        ]
+        detection_logic.extend(check)
+        detection_logic.extend([
             "\ndef detect_event(cont):",
-            "    scene = bge.logic.getCurrentScene()",
             "    own = cont.owner",
-            "    corners = {}".format(
-                zip(self["box"]["corner1"], self["box"]["corner2"])),
-            "    all_objects = {}".format(self.objects_string),
-            "    all_objects = ["
-            "scene.objects[object_name] for object_name in all_objects]",
-            "    in_region = {}".format(not self.detect_any),
-            "    for object_ in all_objects:",
-            "        position = object_.position",
-            "        in_region = (in_region {}".format(
-                ("or", "and")[not self.detect_any]),
-            "            {}(position[i] < min(corners[i]) or".format(
-                ("", "not ")[self.box["direction"] == "Inside"]),
-            "               position[i] > max(corners[i])))",
-            "    if (",
-            "            in_region and own['enabled'] and",
-            "            own['status'] == 'Stop'):",
+            "    if not (own['enabled'] and own['status'] == 'Stop'):",
+            "        return",
+            "    if not TRACKED_OBJECTS:",
+            "        find_tracked_objects(bge.logic.getCurrentScene())",
+            "    region = in_region()",
+            "    if region is None:",
+            "        # A tracked object has been ended",
+            "        find_tracked_objects(bge.logic.getCurrentScene())",
+            "        region = in_region()",
+            "    if region:",
             "        own['status'] = 'Start'"
-        ]
+        ])
         detection_logic = "\n".join(detection_logic)
         return detection_logic
 
@@ -130,10 +137,10 @@ class BlenderObjectPositionTrigger(BlenderTrigger):
         self.link_detection_bricks()
 
     def __init__(
-            self, name, actions, box, objects_string, duration=0,
+            self, name, actions, scene_plan, box, objects_string, duration=0,
             enable_immediately=True, remain_enabled=True, detect_any=True):
         super(BlenderObjectPositionTrigger, self).__init__(
-            name, actions, enable_imediately=enable_immediately,
+            name, actions, scene_plan, enable_immediately=enable_immediately,
             remain_enabled=remain_enabled)
         self.box = box
         self.objects_string = objects_string
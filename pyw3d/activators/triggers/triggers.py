@@ -66,8 +66,8 @@ class BlenderTrigger(Activator):
             self.script_footer,
             self.generate_detection_logic()
         ]
-        self.script.write("\n".join(script_text))
-        return self.script
+        self.scene_plan.write_text(self.script_name, "\n".join(script_text))
+        return self.script_name
 
     def create_enabled_property(self):
         return super(BlenderTrigger, self).create_enabled_property(
@@ -84,9 +84,9 @@ class BlenderTrigger(Activator):
         return self.actions
 
     def __init__(
-            self, name, actions, duration=0, enable_immediately=True,
-            remain_enabled=True):
-        super(BlenderTrigger, self).__init__(name, actions)
+            self, name, actions, scene_plan, duration=0,
+            enable_immediately=True, remain_enabled=True):
+        super(BlenderTrigger, self).__init__(name, actions, scene_plan)
         self.duration = duration
         self.enable_immediately = enable_immediately
         self.remain_enabled = remain_enabled
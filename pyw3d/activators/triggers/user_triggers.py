@@ -17,112 +17,134 @@
 
 """A Blender-based implementation of triggers based on the state of the user in
 virtual space
+
+Rather than each position trigger checking its own box on every tick, a
+single detector object looks up the position of the camera once per tick and
+tests only those boxes which could contain it (see
+:func:`setup_position_detector`).
 """
 import logging
+import math
+from statistics import median
 LOGGER = logging.getLogger("pyw3d")
-from pyw3d.errors import EBKAC
+from pyw3d.blender_scripts import POSITION_DETECTOR_SCRIPT
 from .triggers import BlenderTrigger
-try:
-    import bpy
-    from _bpy import ops as ops_module
-    BPY_OPS_CALL = ops_module.call
-except ImportError:
-    LOGGER.debug(
-        "Module bpy not found. Loading "
-        "pyw3d.activators.triggers.object_triggers as standalone")
 
 # TODO: There's some code reuse happening between this and object_triggers
 
+DETECTOR_OBJECT = "POSITION_DETECTOR"
+MAX_BOX_CELLS = 64
+
+
+def build_box_grid(boxes, max_box_cells=MAX_BOX_CELLS):
+    """Index boxes in a uniform grid over their first two axes
+
+    :param list boxes: List of (lower, upper) corners of each box
+    :param int max_box_cells: Boxes covering more cells than this are not
+    placed in the grid but returned separately, to be checked on every tick
+    :return: Tuple of cell size, dictionary mapping (i, j) cells to tuples of
+    indices of boxes overlapping them, and tuple of indices of large boxes
+    """
+    extents = [
+        max(upper[0] - lower[0], upper[1] - lower[1])
+        for lower, upper in boxes]
+    cell_size = median(extents) if extents else 1.0
+    if cell_size <= 0:
+        cell_size = 1.0
+    grid = {}
+    large = []
+    for index, (lower, upper) in enumerate(boxes):
+        cells = [
+            range(
+                math.floor(lower[axis] / cell_size),
+                math.floor(upper[axis] / cell_size) + 1)
+            for axis in range(2)]
+        if len(cells[0]) * len(cells[1]) > max_box_cells:
+            large.append(index)
+            continue
+        for i in cells[0]:
+            for j in cells[1]:
+                grid.setdefault((i, j), []).append(index)
+    grid = {cell: tuple(indices) for cell, indices in grid.items()}
+    return cell_size, grid, tuple(large)
+
+
+def generate_box_table(position_triggers):
+    """Return Python module defining the boxes of the given
+    BlenderPositionTriggers and the grid used to look them up
+
+    Only boxes which trigger when the user is inside them are placed in the
+    grid, since any box may trigger when the user is outside it."""
+    boxes = []
+    inside = []
+    outside = []
+    for trigger in position_triggers:
+        lower, upper = trigger.get_bounds()
+        if trigger.box["direction"] == "Inside":
+            inside.append(len(boxes))
+        else:
+            outside.append(len(boxes))
+        boxes.append(
+            (trigger.name, lower, upper, (3, 2)[trigger.box["ignore_y"]]))
+    cell_size, grid, large = build_box_grid(
+        [boxes[index][1:3] for index in inside])
+    table = [
+        "CELL_SIZE = {!r}".format(cell_size),
+        "BOXES = ["
+    ]
+    table.extend("    {!r},".format(box) for box in boxes)
+    table.append("]")
+    table.append("INSIDE_CELLS = {")
+    table.extend(
+        "    {!r}: {!r},".format(
+            cell, tuple(inside[index] for index in indices))
+        for cell, indices in sorted(grid.items()))
+    table.append("}")
+    table.append("LARGE_BOXES = {!r}".format(
+        tuple(inside[index] for index in large)))
+    table.append("OUTSIDE_BOXES = {!r}".format(tuple(outside)))
+    return "\n".join(table)
+
+
+def setup_position_detector(scene_plan, position_triggers):
+    """Add the object and logic of the detector shared by all
+    BlenderPositionTriggers
+
+    :param ScenePlan scene_plan: The plan to which logic is added
+    :param list position_triggers: All BlenderPositionTriggers in the project
+    """
+    scene_plan.add_empty(DETECTOR_OBJECT)
+    sensor = scene_plan.add_sensor(
+        DETECTOR_OBJECT, "tick", "ALWAYS",
+        use_pulse_true_level=True, tick_skip=0)
+    controller = scene_plan.add_controller(
+        DETECTOR_OBJECT, "detect", "PYTHON",
+        mode="MODULE", module="position_detector.detect")
+    scene_plan.link(controller, sensor=sensor)
+    scene_plan.write_text("position_detector.py", POSITION_DETECTOR_SCRIPT)
+    scene_plan.write_text(
+        "position_boxes.py", generate_box_table(position_triggers))
+    return controller
+
 
 class BlenderPositionTrigger(BlenderTrigger):
-    """Activator based on position of user in virtual space"""
-
-    def create_enabled_sensor(self):
-        """Add a sensor to fire continuously while trigger is enabled"""
-        base_object = self.select_base_object()
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': self.name,
-                'name': 'enabled_sensor'
-            }
-        )
-        base_object.game.sensors[-1].name = self.name
-        enable_sensor = base_object.game.sensors[self.name]
-        enable_sensor.use_pulse_true_level = True
-        enable_sensor.tick_skip = 0
-        enable_sensor.property = "enabled"
-        enable_sensor.value = "True"
-        self.enable_sensor = enable_sensor
-        return enable_sensor
-
-    def create_detection_controller(self):
-        """Add a controller for detecting specified event"""
-
-        BPY_OPS_CALL(
-            "logic.controller_add", None,
-            {
-                'type': 'PYTHON', 'object': self.name,
-                'name': 'detect'
-            }
-        )
-        controller = self.base_object.game.controllers["detect"]
-        controller.mode = "MODULE"
-        controller.module = "{}.detect_event".format(self.name)
-        self.detect_controller = controller
-        return controller
-
-    def link_detection_bricks(self):
-        """Link necessary logic bricks for event detection
-
-        :raises EBKAC: if controller or sensor does not exist"""
-        try:
-            self.detect_controller.link(sensor=self.enable_sensor)
-        except AttributeError:
-            raise EBKAC(
-                "Detection sensor and controller must be created before they "
-                "can be linked")
-        return self.detect_controller
-
-    def generate_detection_logic(self):
-        """Add a function to Python control script to detect user position"""
-        detection_logic = [
-            "\ndef detect_event(cont):",
-            "    scene = bge.logic.getCurrentScene()",
-            "    own = cont.owner",
-            "    position = scene.objects['CAMERA'].position",
-            "    inside = True",
-            "    corners = {}".format(
-                list(zip(self.box["corner1"], self.box["corner2"]))),
-            "    for i in range({}):".format((3, 2)[self.box["ignore_y"]]),
-            "        if (",
-            "                position[i] < min(corners[i]) or",
-            "                position[i] > max(corners[i])):",
-            "            inside = False",
-            "            break",
-            "    if ({} and own['enabled'] and".format(
-                ("not inside", "inside")[
-                    self.box["direction"] == "Inside"]),
-            "            own['status'] == 'Stop'):",
-            "        own['status'] = 'Start'"
-        ]
-        detection_logic = "\n".join(detection_logic)
-        return detection_logic
-
-    def create_blender_objects(self):
-        super(BlenderPositionTrigger, self).create_blender_objects()
-        self.create_enabled_sensor()
-        self.create_detection_controller()
-
-    def link_logic_bricks(self):
-        super(BlenderPositionTrigger, self).link_logic_bricks()
-        self.link_detection_bricks()
+    """Activator based on position of user in virtual space
+
+    Detection is performed by the shared position detector, which starts
+    this trigger when enabled and the user enters (or leaves) its box."""
+
+    def get_bounds(self):
+        """Return lower and upper corners of box"""
+        corners = list(zip(self.box["corner1"], self.box["corner2"]))
+        return (
+            tuple(min(corner) for corner in corners),
+            tuple(max(corner) for corner in corners))
 
     def __init__(
-            self, name, actions, box, duration=0, enable_immediately=True,
-            remain_enabled=True):
+            self, name, actions, scene_plan, box, duration=0,
+            enable_immediately=True, remain_enabled=True):
         super(BlenderPositionTrigger, self).__init__(
-            name, actions, duration=duration,
+            name, actions, scene_plan, duration=duration,
             enable_immediately=enable_immediately,
             remain_enabled=remain_enabled)
         self.box = box
@@ -17,14 +17,15 @@
 
 """Tools for moving a Blender object in virtual space"""
 import math
-import logging
 from pyw3d.names import generate_relative_to_name
-try:
-    import mathutils
-except ImportError:
-    logging.debug(
-        "Module mathutils not found. Loading pyw3d.blender_actions.movement as"
-        " standalone")
+
+
+def normalize(vector):
+    """Return vector scaled to unit length (zero vectors are unchanged)"""
+    length = math.sqrt(sum(coord**2 for coord in vector))
+    if length == 0:
+        return tuple(vector)
+    return tuple(coord / length for coord in vector)
 
 
 def matrix_from_axis_angle(axis, angle):
@@ -112,9 +113,7 @@ class MoveAction(object):
         # First take care of object rotation...
         if self.placement["rotation"]["rotation_mode"] != "None":
 
-            vector = mathutils.Vector(
-                self.placement["rotation"]["rotation_vector"])
-            vector.normalize()
+            vector = normalize(self.placement["rotation"]["rotation_vector"])
             if self.placement.is_default("position"):
                 position_script = \
                     "data['active_actions'][current_index].get("\
@@ -191,3 +191,258 @@ def activate_link(cont):
         else:
             own['click_status'] = 'disabled'
 """
+
+TIMELINE_SCHEDULER_SCRIPT = """
+import bge
+import heapq
+import importlib
+from time import monotonic
+from w3d_settings import *
+
+TIMELINES = {}  # Scheduled state of each timeline by name
+PENDING = {}  # Timelines whose status changed since the last tick
+ACTIVE = set()  # Names of timelines with actions in progress
+DUE = []  # Heap of (time, generation, name) for next action of timelines
+
+
+class ScheduledTimeline(object):
+    def __init__(self, own):
+        self.own = own
+        self.module = importlib.import_module(own.name)
+        self.data = {}
+        self.generation = 0
+
+
+def get_timeline(own):
+    try:
+        return TIMELINES[own.name]
+    except KeyError:
+        timeline = TIMELINES[own.name] = ScheduledTimeline(own)
+        return timeline
+
+
+def notify(cont):
+    own = cont.owner
+    PENDING[own.name] = own
+
+
+def update_status(timeline, now, current):
+    own = timeline.own
+    data = timeline.data
+    status = own['status']
+    W3D_LOG.debug("scheduler notified of {} with status {}".format(
+        own.name, status))
+    # Any events already scheduled for this timeline are now stale
+    timeline.generation += 1
+    ACTIVE.discard(own.name)
+    if status == 'Start':
+        own['start_time'] = now
+        data["active_actions"] = {}
+        data["complete_actions"] = {}
+        data["next_action"] = 0
+        own['offset_time'] = 0
+        own['status'] = 'Continue'
+    if status == 'Stop':
+        try:
+            own['offset_time'] = now - own['start_time']
+        except KeyError:
+            pass
+    if status == 'Continue':
+        current.add(own.name)
+
+
+def run_timeline(cont, scene, timeline, now, current):
+    own = timeline.own
+    data = timeline.data
+    if own['status'] != 'Continue':
+        # Status was changed earlier in this tick. Its status sensor will not
+        # notice a restart, since the status is already back to 'Continue'
+        # when next checked, so a restarted timeline is run right away.
+        update_status(timeline, now, current)
+        if own['status'] != 'Continue':
+            return
+    stop_block = False  # A flag to handle timeline restarting self
+    try:
+        if own['offset_time'] != 0:
+            own['start_time'] = now - own['offset_time']
+            own['offset_time'] = 0
+    except KeyError:
+        raise RuntimeError(
+            'Must start activator before continue is used')
+    time = now - own['start_time']
+
+    start_times = timeline.module.START_TIMES
+    actions = timeline.module.ACTIONS
+    for index in sorted(data['active_actions']):
+        if actions[index](cont, own, scene, data, time):
+            stop_block = True
+    while (data['next_action'] < len(start_times) and
+            start_times[data['next_action']] <= time):
+        index = data['next_action']
+        data['next_action'] += 1
+        if actions[index](cont, own, scene, data, time):
+            stop_block = True
+
+    if len(data["complete_actions"]) == len(actions):
+        if not stop_block:
+            own['status'] = 'Stop'
+        data["complete_actions"].clear()
+        data['next_action'] = 0
+
+    if data['active_actions']:
+        ACTIVE.add(own.name)
+    else:
+        ACTIVE.discard(own.name)
+        timeline.generation += 1
+        if data['next_action'] < len(start_times):
+            heapq.heappush(DUE, (
+                own['start_time'] + start_times[data['next_action']],
+                timeline.generation, own.name))
+
+
+def schedule(cont):
+    scene = bge.logic.getCurrentScene()
+    now = monotonic()
+    current = set(ACTIVE)
+    pending = list(PENDING.values())
+    PENDING.clear()
+    for own in pending:
+        update_status(get_timeline(own), now, current)
+    while DUE and DUE[0][0] <= now:
+        due_time, generation, name = heapq.heappop(DUE)
+        if TIMELINES[name].generation == generation:
+            current.add(name)
+    for name in sorted(current):
+        # As with separate controllers, an error in one timeline should not
+        # stop the others
+        try:
+            run_timeline(cont, scene, TIMELINES[name], now, current)
+        except Exception:
+            W3D_LOG.exception("Error in timeline {}".format(name))
+"""
+
+POSITION_DETECTOR_SCRIPT = """
+import bge
+from math import floor
+from position_boxes import *
+
+OBJECTS = {}  # Cached references to objects by name
+
+
+def get_object(scene, name):
+    try:
+        object_ = OBJECTS[name]
+        if not object_.invalid:
+            return object_
+    except KeyError:
+        pass
+    object_ = OBJECTS[name] = scene.objects[name]
+    return object_
+
+
+def contains(index, position):
+    name, lower, upper, axes = BOXES[index]
+    for i in range(axes):
+        if position[i] < lower[i] or position[i] > upper[i]:
+            return False
+    return True
+
+
+def fire(scene, index):
+    trigger = get_object(scene, BOXES[index][0])
+    if trigger['enabled'] and trigger['status'] == 'Stop':
+        trigger['status'] = 'Start'
+
+
+def detect(cont):
+    scene = bge.logic.getCurrentScene()
+    position = get_object(scene, 'CAMERA').position
+    cell = (floor(position[0] / CELL_SIZE), floor(position[1] / CELL_SIZE))
+    for index in INSIDE_CELLS.get(cell, ()):
+        if contains(index, position):
+            fire(scene, index)
+    for index in LARGE_BOXES:
+        if contains(index, position):
+            fire(scene, index)
+    for index in OUTSIDE_BOXES:
+        if not contains(index, position):
+            fire(scene, index)
+"""
+
+LOOK_DETECTOR_SCRIPT = """
+import bge
+from look_targets import *
+
+OBJECTS = {}  # Cached references to objects by name
+initialized = False
+
+
+def get_object(scene, name):
+    object_ = OBJECTS.get(name)
+    if object_ is None or object_.invalid:
+        object_ = OBJECTS[name] = scene.objects.get(name)
+    return object_
+
+
+def get_waiting_trigger(scene, name):
+    trigger = get_object(scene, name)
+    if (trigger is not None and trigger['enabled'] and
+            trigger['status'] == 'Stop'):
+        return trigger
+    return None
+
+
+def get_view_cone(cam):
+    # Squared cosine of the half-angle of a cone containing the view frustum
+    projection = cam.projection_matrix
+    tan_x = (1 + abs(projection[0][2])) / projection[0][0]
+    tan_y = (1 + abs(projection[1][2])) / projection[1][1]
+    return 1 / (1 + tan_x * tan_x + tan_y * tan_y)
+
+
+def in_view(cam, forward, position, view_cone, point):
+    offset = (
+        point[0] - position[0], point[1] - position[1],
+        point[2] - position[2])
+    along = (
+        forward[0] * offset[0] + forward[1] * offset[1] +
+        forward[2] * offset[2])
+    if along <= 0 or along * along < view_cone * (
+            offset[0] * offset[0] + offset[1] * offset[1] +
+            offset[2] * offset[2]):
+        return False
+    return cam.pointInsideFrustum(point)
+
+
+def detect(cont):
+    global initialized
+    cam = cont.owner
+    scene = bge.logic.getCurrentScene()
+    forward = cam.getAxisVect((0, 0, -1))
+    for name, direction, min_cosine in DIRECTION_TARGETS:
+        if (direction[0] * forward[0] + direction[1] * forward[1] +
+                direction[2] * forward[2]) > min_cosine:
+            trigger = get_waiting_trigger(scene, name)
+            if trigger is not None:
+                trigger['status'] = 'Start'
+    # pointInsideFrustum seems to give false positives on the first frame in
+    # certain circumstances
+    if not initialized:
+        initialized = True
+        return
+    position = cam.worldPosition
+    view_cone = get_view_cone(cam)
+    for name, point in POINT_TARGETS:
+        trigger = get_waiting_trigger(scene, name)
+        if trigger is not None and in_view(
+                cam, forward, position, view_cone, point):
+            trigger['status'] = 'Start'
+    for name, object_name in OBJECT_TARGETS:
+        trigger = get_waiting_trigger(scene, name)
+        if trigger is None:
+            continue
+        target = get_object(scene, object_name)
+        if target is not None and in_view(
+                cam, forward, position, view_cone, target.worldPosition):
+            trigger['status'] = 'Start'
+"""
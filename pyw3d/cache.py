@@ -0,0 +1,468 @@
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""Caches for loading and exporting W3D projects
+
+Loading a large Story XML file requires parsing the XML and constructing every
+feature in the project. A SnapshotCache stores the resulting project in a
+compact binary form so that later loads of an unchanged file can skip both.
+
+Exporting a project requires starting Blender. An ExportCache stores each
+exported .blend file so that later exports of an unchanged project with the
+same assets, pyw3d and Blender can simply copy it.
+
+Snapshots are stored as pickles. Only use cache directories that are not
+writable by untrusted users.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import struct
+import subprocess
+import tempfile
+import xml.etree.ElementTree as ET
+import zlib
+from pyw3d import BLENDER_EXEC, WORKSPACE, W3D_CONFIG, W3DConfigError
+LOGGER = logging.getLogger("pyw3d")
+
+SNAPSHOT_MAGIC = b"W3DC"
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_EXTENSION = ".w3dc"
+_HEADER = struct.Struct("!4sH32s")
+
+EXPORT_FORMAT_VERSION = 1
+EXPORT_EXTENSION = ".blend"
+EVICTION_POLICIES = ("LRU", "FIFO")
+
+_PYW3D_FINGERPRINT = []
+_BLENDER_VERSIONS = {}
+_FILE_HASHES = {}
+
+
+def pyw3d_fingerprint():
+    """Return SHA-256 digest of the pyw3d source code
+
+    Snapshots written by any other version of pyw3d are ignored, since the
+    layout of features may differ between versions."""
+    if not _PYW3D_FINGERPRINT:
+        digest = hashlib.sha256()
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        for root, dirs, files in os.walk(package_dir):
+            dirs.sort()
+            for filename in sorted(files):
+                if os.path.splitext(filename)[1] != ".py":
+                    continue
+                path = os.path.join(root, filename)
+                digest.update(
+                    os.path.relpath(path, package_dir).encode("utf-8"))
+                with open(path, "rb") as source_file:
+                    digest.update(source_file.read())
+        _PYW3D_FINGERPRINT.append(digest.digest())
+    return _PYW3D_FINGERPRINT[0]
+
+
+def get_blender_version(blender_exec=BLENDER_EXEC):
+    """Return version string of Blender, e.g. "2.79 (sub 0)"
+
+    Within Blender, the running version is returned. Otherwise, blender_exec
+    is asked for its version once per installed executable.
+
+    :raises OSError: If the version cannot be determined
+    """
+    try:
+        import bpy
+        return bpy.app.version_string
+    except ImportError:
+        pass
+    stat = os.stat(blender_exec)
+    state = (os.path.abspath(blender_exec), stat.st_size, stat.st_mtime)
+    if state not in _BLENDER_VERSIONS:
+        try:
+            output = subprocess.check_output(
+                [blender_exec, "--version"], stderr=subprocess.DEVNULL)
+        except subprocess.CalledProcessError as error:
+            raise OSError("Could not get Blender version: {}".format(error))
+        lines = output.decode("utf-8", "replace").strip().splitlines()
+        if not lines:
+            raise OSError("Blender did not report its version")
+        version = lines[0].strip()
+        if version.startswith("Blender "):
+            version = version[len("Blender "):]
+        _BLENDER_VERSIONS[state] = version
+    return _BLENDER_VERSIONS[state]
+
+
+def hash_file(path):
+    """Return SHA-256 digest of file contents, or None if file is missing
+
+    Digests are kept for as long as the size and modification time of the
+    file are unchanged."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    state = (path, stat.st_size, stat.st_mtime)
+    if state not in _FILE_HASHES:
+        content_hash = hashlib.sha256()
+        with open(path, "rb") as asset_file:
+            for chunk in iter(lambda: asset_file.read(2**20), b""):
+                content_hash.update(chunk)
+        _FILE_HASHES[state] = content_hash.digest()
+    return _FILE_HASHES[state]
+
+
+class FileCache(object):
+    """Directory of cached files, limited in total size
+
+    :cvar str extension: Extension of files belonging to the cache
+    """
+    extension = None
+
+    def get_entries(self, cache_dir):
+        """Return list of (modification time, size, path) for each cached
+        file in cache_dir, from oldest to newest"""
+        entries = []
+        try:
+            filenames = os.listdir(cache_dir)
+        except FileNotFoundError:
+            return entries
+        for filename in filenames:
+            if os.path.splitext(filename)[1] != self.extension:
+                continue
+            path = os.path.join(cache_dir, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self, cache_dir):
+        """Remove oldest files from cache_dir until total size is within
+        max_size
+
+        Caches which update the modification time of a file when it is used
+        therefore evict the least recently used files first."""
+        entries = self.get_entries(cache_dir)
+        total_size = sum(size for modified, size, path in entries)
+        for modified, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            self.evictions += 1
+
+    def clear(self, cache_dir):
+        """Remove all cached files from cache_dir"""
+        for modified, size, path in self.get_entries(cache_dir):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """Return dictionary of cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "evictions": self.evictions
+        }
+
+
+class SnapshotCache(FileCache):
+    """Cache of binary snapshots of projects loaded from W3D XML
+
+    Each snapshot is keyed by the absolute path, size, modification time and
+    SHA-256 hash of the XML file it was loaded from, as well as the version of
+    pyw3d that loaded it. When the cache grows beyond max_size, the least
+    recently used snapshots are removed.
+
+    :param str cache_dir: Directory in which to store snapshots, resolved
+        relative to the current working directory on creation. If None,
+        snapshots are stored in a .w3d_cache directory next to each XML file.
+    :param int max_size: Maximum total size of snapshots in bytes for each
+        cache directory
+
+    :ivar int hits: Number of loads served from a snapshot
+    :ivar int misses: Number of loads that fell back to XML
+    :ivar int bytes_read: Total size of snapshots read
+    :ivar int bytes_written: Total size of snapshots written
+    :ivar int evictions: Number of snapshots removed to respect max_size
+    """
+    extension = SNAPSHOT_EXTENSION
+
+    def __init__(self, cache_dir=None, max_size=256 * 2**20):
+        # Loading XML may change the working directory, so relative paths are
+        # resolved once here
+        if cache_dir is not None:
+            cache_dir = os.path.abspath(cache_dir)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.evictions = 0
+
+    def get_cache_dir(self, filename):
+        """Return directory used for snapshots of given XML file"""
+        if self.cache_dir is not None:
+            return self.cache_dir
+        return os.path.join(
+            os.path.dirname(os.path.abspath(filename)), ".w3d_cache")
+
+    def get_key(self, filename, options=()):
+        """Return key for snapshot of given XML file
+
+        :param str filename: Filename of XML file
+        :param tuple options: Any further options affecting how the file is
+            loaded
+        """
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        content_hash = hashlib.sha256()
+        with open(path, "rb") as xml_file:
+            for chunk in iter(lambda: xml_file.read(2**20), b""):
+                content_hash.update(chunk)
+        key = hashlib.sha256()
+        key.update(pyw3d_fingerprint())
+        key.update(repr((
+            SNAPSHOT_FORMAT_VERSION, path, stat.st_size, stat.st_mtime,
+            options)).encode("utf-8"))
+        key.update(content_hash.digest())
+        return key.hexdigest()
+
+    def get_snapshot_path(self, filename, key):
+        """Return path to snapshot with given key for given XML file"""
+        return os.path.join(
+            self.get_cache_dir(filename), key + SNAPSHOT_EXTENSION)
+
+    def load(self, filename, loader, options=()):
+        """Return project for given XML file, using snapshot if available
+
+        :param str filename: Filename of XML file
+        :param loader: Callable taking no arguments that loads the project
+            from XML if no valid snapshot is found
+        :param tuple options: Any further options affecting how the file is
+            loaded, which must match for a snapshot to be used
+        """
+        key = self.get_key(filename, options=options)
+        snapshot_path = self.get_snapshot_path(filename, key)
+        try:
+            project = self.read_snapshot(snapshot_path)
+        except (OSError, EOFError, ValueError, zlib.error,
+                pickle.UnpicklingError) as read_error:
+            if not isinstance(read_error, FileNotFoundError):
+                LOGGER.info("Ignoring snapshot {}: {}".format(
+                    snapshot_path, read_error))
+            self.misses += 1
+            project = loader()
+            try:
+                self.write_snapshot(snapshot_path, project)
+            except OSError as write_error:
+                LOGGER.warning("Could not write snapshot {}: {}".format(
+                    snapshot_path, write_error))
+            return project
+        self.hits += 1
+        return project
+
+    def read_snapshot(self, snapshot_path):
+        """Read project from snapshot file
+
+        :raises ValueError: If snapshot was written by a different version of
+            pyw3d or is otherwise unreadable
+        """
+        with open(snapshot_path, "rb") as snapshot_file:
+            data = snapshot_file.read()
+        if len(data) < _HEADER.size:
+            raise ValueError("Truncated snapshot")
+        magic, format_version, fingerprint = _HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a pyw3d snapshot")
+        if format_version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                "Unsupported snapshot format {}".format(format_version))
+        if fingerprint != pyw3d_fingerprint():
+            raise ValueError("Snapshot written by different pyw3d version")
+        project = pickle.loads(zlib.decompress(data[_HEADER.size:]))
+        self.bytes_read += len(data)
+        os.utime(snapshot_path)
+        # Match the working directory set when loading from XML
+        os.chdir(project.call_directory)
+        return project
+
+    def write_snapshot(self, snapshot_path, project):
+        """Write project to snapshot file, evicting old snapshots if
+        necessary"""
+        data = _HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, pyw3d_fingerprint()
+        ) + zlib.compress(
+            pickle.dumps(project, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        if len(data) > self.max_size:
+            LOGGER.info("Snapshot larger than cache size limit; not stored")
+            return
+        cache_dir = os.path.dirname(snapshot_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_handle, temp_path = tempfile.mkstemp(
+            dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(temp_handle, "wb") as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, snapshot_path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        self.bytes_written += len(data)
+        self.evict(cache_dir)
+
+
+class ExportCache(FileCache):
+    """Cache of .blend files exported from W3D projects
+
+    Each .blend file is keyed by the XML representation of the project, the
+    contents of all files it refers to (sounds, images, models and fonts),
+    the version of pyw3d and the version of Blender. When the cache grows
+    beyond max_size, files are removed in the order given by eviction.
+
+    :param str cache_dir: Directory in which to store .blend files
+    :param int max_size: Maximum total size of cached files in bytes
+    :param str eviction: "LRU" to remove the least recently used files first
+        or "FIFO" to remove the oldest files first
+    :param str blender_exec: Blender executable whose version is part of each
+        key
+
+    :ivar int hits: Number of exports served from the cache
+    :ivar int misses: Number of exports not found in the cache
+    :ivar int bytes_read: Total size of cached files copied to outputs
+    :ivar int bytes_written: Total size of files added to the cache
+    :ivar int evictions: Number of files removed to respect max_size
+    """
+    extension = EXPORT_EXTENSION
+
+    def __init__(
+            self, cache_dir, max_size=2 * 2**30, eviction="LRU",
+            blender_exec=BLENDER_EXEC):
+        if eviction not in EVICTION_POLICIES:
+            raise W3DConfigError(
+                "Export cache eviction must be one of {}".format(
+                    ", ".join(EVICTION_POLICIES)))
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_size = max_size
+        self.eviction = eviction
+        self.blender_exec = blender_exec
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, config=W3D_CONFIG):
+        """Create ExportCache with the settings given in the W3D
+        configuration
+
+        The settings "Export cache directory", "Export cache size" (in bytes)
+        and "Export cache eviction" ("LRU" or "FIFO") are used if present.
+        """
+        return cls(
+            config.get(
+                "Export cache directory",
+                os.path.join(WORKSPACE, "export_cache")),
+            max_size=config.get("Export cache size", 2 * 2**30),
+            eviction=config.get("Export cache eviction", "LRU"))
+
+    def get_key(self, project):
+        """Return key for .blend file exported from given project, or None if
+        no key can be made
+
+        Must be called with the working directory set by loading the project,
+        since the files it refers to may be given relative to it.
+        """
+        from .incremental import iter_feature_files
+        try:
+            blender_version = get_blender_version(self.blender_exec)
+        except OSError as error:
+            LOGGER.warning("Export cache not used: {}".format(error))
+            return None
+        key = hashlib.sha256()
+        key.update(pyw3d_fingerprint())
+        key.update(repr((
+            EXPORT_FORMAT_VERSION, blender_version)).encode("utf-8"))
+        key.update(ET.tostring(project.toXML()))
+        for path in sorted(set(iter_feature_files(project))):
+            key.update(path.encode("utf-8"))
+            key.update(repr(hash_file(path)).encode("utf-8"))
+        return key.hexdigest()
+
+    def get_cached_path(self, key):
+        """Return path to cached .blend file with given key"""
+        return os.path.join(self.cache_dir, key + EXPORT_EXTENSION)
+
+    def fetch(self, key, filename):
+        """Copy cached .blend file with given key to filename if present
+
+        :return: True if the cached file was used
+        """
+        if key is None:
+            self.misses += 1
+            return False
+        cached_path = self.get_cached_path(key)
+        try:
+            shutil.copyfile(cached_path, filename)
+        except FileNotFoundError:
+            self.misses += 1
+            LOGGER.info("Export cache miss for {}".format(filename))
+            return False
+        if self.eviction == "LRU":
+            os.utime(cached_path)
+        self.hits += 1
+        self.bytes_read += os.path.getsize(cached_path)
+        LOGGER.info("Export cache hit for {}".format(filename))
+        return True
+
+    def store(self, key, filename):
+        """Add exported .blend file to cache under given key, evicting older
+        files if necessary"""
+        if key is None:
+            return
+        size = os.path.getsize(filename)
+        if size > self.max_size:
+            LOGGER.info("Export larger than cache size limit; not stored")
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_handle, temp_path = tempfile.mkstemp(
+            dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(temp_handle, "wb") as temp_file:
+                with open(filename, "rb") as blend_file:
+                    shutil.copyfileobj(blend_file, temp_file)
+            os.replace(temp_path, self.get_cached_path(key))
+        except Exception:
+            os.remove(temp_path)
+            raise
+        self.bytes_written += size
+        self.evict(self.cache_dir)
@@ -62,3 +62,16 @@ class EBKAC(Exception):
     """
     def __init__(self, message):
         super(EBKAC, self).__init__(message)
+
+
+class ExportError(Exception):
+    """Exception thrown if a project could not be exported to Blender"""
+    def __init__(self, message):
+        super(ExportError, self).__init__(message)
+
+
+class WorkerError(ExportError):
+    """Exception thrown if a persistent export worker cannot be started or
+    stops responding"""
+    def __init__(self, message):
+        super(WorkerError, self).__init__(message)
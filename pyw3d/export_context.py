@@ -0,0 +1,171 @@
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""State shared by features while a project is exported to Blender
+
+Blender objects, materials, sounds and fonts created while exporting a project
+are cached so that they can be reused by later features of the same project.
+These caches belong to an ExportContext, which is active for the duration of
+one export and then disposed of, so that nothing created for one project is
+reused by the next.
+
+The caches are not limited in size. Each holds references to datablocks that
+remain in the Blender file whether or not they are cached, so discarding an
+entry would free no memory and would only cause the datablock to be created
+again under a new name (e.g. "material.001").
+"""
+import logging
+from collections import OrderedDict
+from .timing import ExportTimer
+LOGGER = logging.getLogger("pyw3d")
+
+
+class DatablockCache(object):
+    """Mapping from keys (e.g. filenames) to Blender data created during one
+    export, counting lookups
+
+    Entries are never discarded while the export runs, since the data they
+    refer to remains in the Blender file regardless. The cache is emptied
+    once its ExportContext is disposed of.
+
+    :ivar int hits: Number of lookups that found an item
+    :ivar int misses: Number of lookups that did not find an item
+    """
+
+    def __init__(self):
+        self._items = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __getitem__(self, key):
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        self._items[key] = value
+
+    def items(self):
+        return self._items.items()
+
+    def clear(self):
+        """Remove all items without resetting statistics"""
+        self._items.clear()
+
+    def stats(self):
+        """Return dictionary of cache statistics"""
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class ExportContext(object):
+    """Caches used while exporting a project to Blender
+
+    Use as a context manager; features find the active context with
+    :func:`get_export_context`. On exit, all caches are emptied, as is the
+    default context once no context remains active.
+
+    :ivar dict relative_to_objects: Dictionary mapping names of relative_to
+        options to Blender representations (see
+        :meth:`pyw3d.placement.W3DPlacement._create_relative_to_objects`)
+    :ivar ExportTimer timer: Timing spans of each phase and feature of the
+        export, which are kept after the context exits
+    """
+
+    def __init__(self):
+        self.relative_to_objects = {}
+        self.timer = ExportTimer()
+        self.models = DatablockCache()
+        self.materials = DatablockCache()
+        self.sounds = DatablockCache()
+        self.fonts = DatablockCache()
+        self._previous_contexts = []
+
+    def get_caches(self):
+        """Return dictionary of all caches by name"""
+        return OrderedDict((
+            ("models", self.models),
+            ("materials", self.materials),
+            ("sounds", self.sounds),
+            ("fonts", self.fonts)))
+
+    def stats(self):
+        """Return dictionary of statistics for each cache"""
+        return OrderedDict(
+            (name, cache.stats()) for name, cache in self.get_caches().items())
+
+    def dispose(self):
+        """Drop all references to Blender data held by this context"""
+        self.relative_to_objects.clear()
+        for cache in self.get_caches().values():
+            cache.clear()
+
+    def __enter__(self):
+        self._previous_contexts.append(_ACTIVE_CONTEXT[0])
+        _ACTIVE_CONTEXT[0] = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _ACTIVE_CONTEXT[0] = self._previous_contexts.pop()
+        LOGGER.debug("Export cache statistics: {}".format(dict(self.stats())))
+        self.dispose()
+        if _ACTIVE_CONTEXT[0] is None:
+            reset_default_context()
+
+
+_ACTIVE_CONTEXT = [None]
+_DEFAULT_CONTEXT = []
+
+
+def get_export_context():
+    """Return the active ExportContext
+
+    If no context is active, as when blending individual features outside of
+    :meth:`pyw3d.project.W3DProject.blend`, a context shared by all such
+    calls is returned."""
+    if _ACTIVE_CONTEXT[0] is not None:
+        return _ACTIVE_CONTEXT[0]
+    if not _DEFAULT_CONTEXT:
+        _DEFAULT_CONTEXT.append(ExportContext())
+    return _DEFAULT_CONTEXT[0]
+
+
+def reset_default_context():
+    """Dispose of the context returned by :func:`get_export_context` while no
+    context is active, so that nothing it holds outlives the current
+    export"""
+    if _DEFAULT_CONTEXT:
+        _DEFAULT_CONTEXT.pop().dispose()
@@ -0,0 +1,382 @@
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""Persistent Blender process for exporting many projects
+
+Starting Blender often takes longer than exporting a small project. An
+ExportWorker starts Blender once and then sends it one export job at a time
+over a local socket. Between jobs, the worker returns Blender to its startup
+state, so that each export is equivalent to one made by a new Blender process.
+Caches of Blender data are already discarded after each export (see
+:class:`pyw3d.export_context.ExportContext`).
+
+Messages are JSON objects, one per line. After connecting, the worker sends::
+
+    {"hello": <token>, "protocol": 1, "pid": <process id>}
+
+Each job is sent as::
+
+    {"id": <job id>, "command": "export", "project_file": <path>,
+     "filetype": "xml" or "pickle", "output": <path>,
+     "incremental": true or false}
+
+and answered with::
+
+    {"id": <job id>, "status": "ok" or "error", "timings": {<phase>: <s>},
+     "error": <traceback, if status is "error">}
+
+The worker exits when sent ``{"command": "shutdown"}`` or when the connection
+is closed.
+
+The same protocol is served outside of Blender by running this module with
+``--stand-in``, in which case projects are loaded but the output file contains
+a pickle of the project rather than a Blender scene. This allows the protocol
+to be exercised without Blender.
+"""
+import argparse
+import binascii
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+import traceback
+from pyw3d import BLENDER_EXEC
+from .errors import ExportError, WorkerError
+from .w3d_export_tools import EXPORT_SCRIPT, export_file, get_blender_call, \
+    get_export_key, load_project_file, pickle_w3dproject
+LOGGER = logging.getLogger("pyw3d")
+try:
+    import bpy
+except ImportError:
+    LOGGER.debug(
+        "Module bpy not found. Only stand-in export workers can be run")
+
+PROTOCOL_VERSION = 1
+BLENDER_WORKER_COMMAND = [
+    BLENDER_EXEC, "--background", "--python", EXPORT_SCRIPT, "--", "--worker"]
+STAND_IN_WORKER_COMMAND = [
+    sys.executable, "-m", "pyw3d.export_worker", "--stand-in"]
+
+
+def send_message(stream, message):
+    """Write message to stream as a single line of JSON"""
+    stream.write(json.dumps(message).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def receive_message(stream):
+    """Read a single line of JSON from stream
+
+    :raises WorkerError: If the connection is closed"""
+    line = stream.readline()
+    if not line:
+        raise WorkerError("Connection to export worker closed")
+    return json.loads(line.decode("utf-8"))
+
+
+def reset_blender_session():
+    """Return Blender to its startup state between exports"""
+    bpy.ops.wm.read_homefile()
+
+
+def blender_job(job):
+    """Export project in the running Blender instance
+
+    :param dict job: Export job received from client
+    :return: Dictionary of time in seconds taken by each phase
+    """
+    timings = {}
+    start = time.time()
+    reset_blender_session()
+    timings["reset"] = time.time() - start
+    export_file(
+        job["project_file"], job["output"], filetype=job["filetype"],
+        timings=timings, incremental=job.get("incremental", False))
+    return timings
+
+
+def stand_in_job(job):
+    """Load project and save it as a pickle in place of a .blend file
+
+    :param dict job: Export job received from client
+    :return: Dictionary of time in seconds taken by each phase
+    """
+    timings = {}
+    start = time.time()
+    input_project = load_project_file(
+        job["project_file"], filetype=job["filetype"])
+    timings["load"] = time.time() - start
+    start = time.time()
+    pickle_w3dproject(input_project, filename=job["output"])
+    timings["save"] = time.time() - start
+    return timings
+
+
+def serve(stream, run_job):
+    """Run export jobs received on stream until told to stop
+
+    :param stream: Binary file object connected to client
+    :param run_job: Callable taking a job and returning a dictionary of
+        timings
+    """
+    call_directory = os.getcwd()
+    while True:
+        try:
+            message = receive_message(stream)
+        except WorkerError:
+            return
+        command = message.get("command")
+        if command == "shutdown":
+            return
+        reply = {"id": message.get("id")}
+        if command != "export":
+            reply["status"] = "error"
+            reply["error"] = "Unknown command {}".format(command)
+            send_message(stream, reply)
+            continue
+        try:
+            reply["timings"] = run_job(message)
+            reply["status"] = "ok"
+        except Exception:
+            reply["status"] = "error"
+            reply["error"] = traceback.format_exc()
+        finally:
+            # Loading a project changes the working directory
+            os.chdir(call_directory)
+        send_message(stream, reply)
+
+
+class ExportWorker(object):
+    """Client for a persistent export process
+
+    The worker process is started on the first export. If it cannot be
+    started or stops responding, exports fall back to starting a new Blender
+    process for each project.
+
+    :param list command: Command line used to start worker process. Defaults
+        to a Blender worker; use STAND_IN_WORKER_COMMAND to test without
+        Blender.
+    :param float start_timeout: Seconds to wait for worker to connect
+    :param float job_timeout: Seconds to wait for each export. If None, wait
+        indefinitely.
+    :param bool fallback: If True, export projects in one-shot Blender
+        processes when worker is unavailable. Otherwise, raise WorkerError.
+    :param ExportCache export_cache: If given, projects found in this cache
+        are copied from it rather than exported, and other exports are added
+        to it
+    """
+
+    def __init__(
+            self, command=None, start_timeout=60, job_timeout=None,
+            fallback=True, export_cache=None):
+        if command is None:
+            command = BLENDER_WORKER_COMMAND
+        self.command = list(command)
+        self.start_timeout = start_timeout
+        self.job_timeout = job_timeout
+        self.fallback = fallback
+        self.export_cache = export_cache
+        self.process = None
+        self.connection = None
+        self.stream = None
+        self.unavailable = False
+        self.jobs_sent = 0
+
+    def start(self):
+        """Start worker process and wait for it to connect
+
+        :raises WorkerError: If worker does not connect within start_timeout
+        """
+        token = binascii.hexlify(os.urandom(16)).decode("ascii")
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(1)
+            listener.settimeout(0.5)
+            host, port = listener.getsockname()
+            try:
+                self.process = subprocess.Popen(self.command + [
+                    "--connect", "{}:{}".format(host, port), "--token", token
+                ])
+            except OSError as error:
+                raise WorkerError(
+                    "Could not start export worker: {}".format(error))
+            deadline = time.time() + self.start_timeout
+            while self.connection is None:
+                try:
+                    self.connection, address = listener.accept()
+                except socket.timeout:
+                    returncode = self.process.poll()
+                    if returncode is not None:
+                        self.close()
+                        raise WorkerError(
+                            "Export worker exited with code {}".format(
+                                returncode))
+                    if time.time() > deadline:
+                        self.close()
+                        raise WorkerError(
+                            "Export worker did not connect within {} s".format(
+                                self.start_timeout))
+        finally:
+            listener.close()
+        self.connection.settimeout(self.start_timeout)
+        self.stream = self.connection.makefile("rwb")
+        try:
+            hello = receive_message(self.stream)
+        except (OSError, ValueError, WorkerError) as error:
+            self.close()
+            raise WorkerError("Bad greeting from export worker: {}".format(
+                error))
+        if (
+                hello.get("hello") != token or
+                hello.get("protocol") != PROTOCOL_VERSION):
+            self.close()
+            raise WorkerError("Export worker failed handshake")
+        self.connection.settimeout(self.job_timeout)
+
+    def close(self):
+        """Ask worker to exit and wait for it to do so"""
+        if self.stream is not None:
+            try:
+                send_message(self.stream, {"command": "shutdown"})
+                self.stream.close()
+            except OSError:
+                pass
+            self.stream = None
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _export_with_worker(self, project_file, output, filetype, incremental):
+        if self.stream is None:
+            self.start()
+        self.jobs_sent += 1
+        job = {
+            "id": self.jobs_sent,
+            "command": "export",
+            "project_file": project_file,
+            "filetype": filetype,
+            "output": output,
+            "incremental": incremental
+        }
+        try:
+            send_message(self.stream, job)
+            reply = receive_message(self.stream)
+        except (OSError, ValueError, WorkerError) as error:
+            # Close connection, so that the next job starts a new worker
+            self.close()
+            raise WorkerError("Export worker stopped responding: {}".format(
+                error))
+        if reply.get("id") != job["id"]:
+            self.close()
+            raise WorkerError("Unexpected reply from export worker")
+        if reply["status"] != "ok":
+            raise ExportError("Export of {} failed:\n{}".format(
+                project_file, reply.get("error")))
+        return reply["timings"]
+
+    def export(self, project_file, output, filetype="xml", incremental=False):
+        """Export project file to .blend file
+
+        :param str filetype: One of "xml" or "pickle"
+        :param bool incremental: Update output incrementally (see
+            :func:`pyw3d.w3d_export_tools.export_to_blender`)?
+        :return: Dictionary of time in seconds taken by each phase
+        :raises ExportError: If the export itself fails
+        """
+        project_file = os.path.abspath(project_file)
+        output = os.path.abspath(output)
+        if self.export_cache is None:
+            return self._export(project_file, output, filetype, incremental)
+        start = time.time()
+        cache_key = get_export_key(
+            self.export_cache, project_file, filetype=filetype)
+        cache_hit = self.export_cache.fetch(cache_key, output)
+        cache_time = time.time() - start
+        if cache_hit:
+            return {"cache": cache_time}
+        timings = self._export(project_file, output, filetype, incremental)
+        self.export_cache.store(cache_key, output)
+        timings["cache"] = cache_time
+        return timings
+
+    def _export(self, project_file, output, filetype, incremental):
+        if not self.unavailable:
+            try:
+                return self._export_with_worker(
+                    project_file, output, filetype, incremental)
+            except WorkerError as error:
+                if self.process is None and self.jobs_sent == 0:
+                    self.unavailable = True
+                if not self.fallback:
+                    raise
+                LOGGER.warning(
+                    "{}; exporting {} in a new Blender process".format(
+                        error, project_file))
+        start = time.time()
+        try:
+            subprocess.check_call(get_blender_call(
+                project_file, output, filetype=filetype,
+                incremental=incremental))
+        except (OSError, subprocess.CalledProcessError) as error:
+            raise ExportError("Export of {} failed: {}".format(
+                project_file, error))
+        return {"blender": time.time() - start}
+
+
+def main(argv):
+    """Connect to client and serve export jobs
+
+    :param list argv: Command line arguments
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connect", required=True, help="HOST:PORT")
+    parser.add_argument("--token", required=True)
+    parser.add_argument(
+        "--stand-in", default=False, action="store_true",
+        help="serve jobs without Blender")
+    args = parser.parse_args(argv)
+    host, port = args.connect.rsplit(":", 1)
+    run_job = stand_in_job if args.stand_in else blender_job
+    with socket.create_connection((host, int(port))) as connection:
+        with connection.makefile("rwb") as stream:
+            send_message(stream, {
+                "hello": args.token,
+                "protocol": PROTOCOL_VERSION,
+                "pid": os.getpid()
+            })
+            serve(stream, run_job)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
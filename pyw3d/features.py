@@ -23,7 +23,232 @@ may appear in such a project. This may be as sophisticated as a "Timeline" or
 as simple as a "Placement" for an object (since Placement features define
 position, and potentially multiple kinds of rotation).
 """
+import copyreg
+import itertools
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping, MutableSequence, \
+    MutableSet
+from contextlib import contextmanager
 from .errors import InvalidArgument, ConsistencyError, ValidationError
+from .validators import ReferenceValidator, ListValidator, DictValidator
+
+
+PICKLE_FORMAT_VERSION = 1
+"""Version of the format in which W3DFeatures are pickled"""
+
+_construction_state = threading.local()
+"""State of trusted_construction, kept separately for each thread"""
+
+_INDEPENDENT = object()
+"""Marks a validated feature whose validity does not depend on the names of
+other features in the project"""
+
+_get_object_state = getattr(object, "__getstate__", None)
+"""Default __getstate__ of objects, available from Python 3.11"""
+
+
+def _get_instance_dict(instance):
+    """Return the instance __dict__ of instance, or None if it has none
+
+    Unlike reading instance.__dict__ directly, this does not leave an empty
+    dict behind on instances which keep all of their attributes in
+    __slots__."""
+    if _get_object_state is not None:
+        state = _get_object_state(instance)
+        if isinstance(state, tuple):
+            state = state[0]
+        return state
+    instance_dict = instance.__dict__
+    if not instance_dict:
+        # Reading __dict__ created it, so release it again
+        del instance.__dict__
+        return None
+    return instance_dict
+
+
+@contextmanager
+def trusted_construction(enabled=True):
+    """Context manager within which values are assigned to W3DFeatures without
+    validation
+
+    This is intended for bulk-loading data which is already known to be well
+    formed (e.g. from W3D XML), where calling every validator on every
+    assignment would dominate load time. On exit, the yielded list is filled
+    with every feature that had values set without validation, in the order
+    in which they were first modified, so that they can be checked later with
+    :meth:`W3DFeature.validate`. Nested blocks defer to the outermost block,
+    which records all such features. Features constructed in other threads
+    are validated as usual.
+
+    :param bool enabled: If False, values are validated as usual and the
+        yielded list remains empty
+    """
+    unvalidated = []
+    if not enabled or _get_unvalidated_features() is not None:
+        yield unvalidated
+        return
+    _construction_state.unvalidated_features = OrderedDict()
+    try:
+        yield unvalidated
+    finally:
+        unvalidated.extend(
+            _construction_state.unvalidated_features.values())
+        _construction_state.unvalidated_features = None
+
+
+def _get_unvalidated_features():
+    """Return dictionary of features modified without validation in the
+    current trusted_construction block of this thread, or None outside of
+    such a block"""
+    return getattr(_construction_state, "unvalidated_features", None)
+
+
+class FeatureList(list):
+    """A list of features which reports changes made to it in place
+
+    Whenever the list is modified, its generation is replaced by a new value
+    (unique within the process) and the feature holding the list, if any, is
+    marked as changed. This allows the holder to be skipped during validation
+    while the list is unchanged (see :meth:`W3DFeature.validate`).
+
+    :ivar W3DFeature owner: The feature holding this list
+    :ivar int generation: Value identifying the current contents of the list
+    """
+
+    _generations = itertools.count()
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.owner = None
+        self.generation = next(self._generations)
+
+    def __reduce__(self):
+        return (type(self), (list(self),))
+
+    def _changed(self):
+        self.generation = next(self._generations)
+        if self.owner is not None:
+            self.owner._mark_changed()
+
+    def _reporting(method):
+        def reporting_method(self, *args):
+            result = method(self, *args)
+            self._changed()
+            return result
+        reporting_method.__name__ = method.__name__
+        reporting_method.__doc__ = method.__doc__
+        return reporting_method
+
+    __setitem__ = _reporting(list.__setitem__)
+    __delitem__ = _reporting(list.__delitem__)
+    __iadd__ = _reporting(list.__iadd__)
+    __imul__ = _reporting(list.__imul__)
+    append = _reporting(list.append)
+    extend = _reporting(list.extend)
+    insert = _reporting(list.insert)
+    pop = _reporting(list.pop)
+    remove = _reporting(list.remove)
+    clear = _reporting(list.clear)
+    reverse = _reporting(list.reverse)
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    del _reporting
+
+
+def _fingerprint(value):
+    """Return a hashable summary of value used to detect changes between
+    validations
+
+    W3DFeatures are summarized by type and identity, since changes to their
+    own contents are tracked by the features themselves. FeatureLists are
+    summarized by identity and generation. Other immutable sequences (e.g.
+    W3DObjectTables) are summarized by value like any other hashable object.
+    If value cannot be summarized, a new object is returned, which will never
+    compare equal to a stored fingerprint."""
+    if isinstance(value, W3DFeature):
+        return (type(value), id(value))
+    if isinstance(value, FeatureList):
+        return (FeatureList, id(value), value.generation)
+    if isinstance(value, (str, bytes)):
+        return value
+    if isinstance(value, Mapping):
+        return (type(value), tuple(
+            (key, _fingerprint(item)) for key, item in value.items()))
+    if isinstance(value, (tuple, MutableSequence)):
+        return (type(value), tuple(_fingerprint(item) for item in value))
+    try:
+        hash(value)
+    except TypeError:
+        return object()
+    return (type(value), value)
+
+
+def _is_closed(value):
+    """Return True if value cannot be modified in place without the change
+    being reported to the feature holding it
+
+    Contained W3DFeatures report their own changes and are not examined."""
+    if isinstance(value, (W3DFeature, str, bytes)):
+        return True
+    if isinstance(value, (tuple, frozenset, FeatureList)):
+        return all(_is_closed(item) for item in value)
+    if isinstance(value, (MutableMapping, MutableSequence, MutableSet)):
+        return False
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _child_features(value):
+    """Yield all W3DFeatures contained in value, without descending into the
+    features themselves"""
+    if isinstance(value, W3DFeature):
+        yield value
+    elif isinstance(value, Mapping):
+        for item in value.values():
+            yield from _child_features(item)
+    elif isinstance(value, (tuple, MutableSequence)):
+        for item in value:
+            yield from _child_features(item)
+
+
+def _uses_references(validator):
+    """Return True if result of validator depends on other features in the
+    project"""
+    if isinstance(validator, ReferenceValidator):
+        return True
+    if isinstance(validator, ListValidator):
+        return any(
+            _uses_references(base) for base in validator.base_validators)
+    if isinstance(validator, DictValidator):
+        return (
+            _uses_references(validator.key_validator) or
+            _uses_references(validator.value_validator))
+    return False
+
+
+class DefaultUIOrder(object):
+    """Descriptor providing the sorted names of all arguments of a feature
+    class as the default ui_order for that class
+
+    The order is computed once per class rather than once per instance."""
+
+    def __init__(self):
+        self.ui_orders = {}
+
+    def __get__(self, instance, owner):
+        try:
+            return self.ui_orders[owner]
+        except KeyError:
+            ui_order = sorted(owner.argument_validators.keys())
+            self.ui_orders[owner] = ui_order
+            return ui_order
 
 
 class W3DFeature(dict):
@@ -41,11 +266,45 @@ class W3DFeature(dict):
 
     :cvar blender_scaling: Scaling factor used to convert back and forth
         between Blender and legacy units
+
+    :cvar name_generation: Counter incremented whenever the name of any
+        feature is set or removed, used to detect stale indices of names
+
+    :cvar ui_order: Order in which arguments should be presented in a UI. If
+        not overridden, arguments are presented in alphabetical order.
+
+    Values are stored in the underlying dict. Other per-instance state is kept
+    in __slots__, so that features which set no further attributes never
+    allocate an instance __dict__.
+
+    Once a value has been validated, a fingerprint of it is stored in
+    _validation_hashes so that later calls to validate only revisit values
+    which have changed since. Once a feature and everything it contains have
+    been validated, it is marked clean and is skipped entirely by later calls
+    to validate, until it or some feature it contains is changed. Changes are
+    reported to every feature found to contain the changed feature during
+    validation, which then visits only the children that reported changes
+    (along with any children that are not clean) rather than all of them.
+    Features holding lists, dictionaries or other values which may be
+    modified in place without notice (other than FeatureLists) are never
+    marked clean.
     """
 
+    __slots__ = (
+        "_validation_hashes", "_validation_clean", "_validation_parents",
+        "_validation_pending", "__dict__")
+
     argument_validators = {}
     default_arguments = {}
     blender_scaling = 1
+    ui_order = DefaultUIOrder()
+    _reference_keys = {}
+    _key_tuples = {}
+    _pickled_slots = {}
+    _transient_attributes = frozenset((
+        "_validation_hashes", "_validation_clean", "_validation_parents",
+        "_validation_pending"))
+    name_generation = 0
 
     def __repr__(self):
         return "< {}: {} >".format(type(self).__name__, super().__repr__())
@@ -57,20 +316,34 @@ class W3DFeature(dict):
 
         return repr(self) < repr(other)
 
+    def __new__(feature_class, *args, **kwargs):
+        new_feature = super().__new__(feature_class)
+        new_feature._validation_hashes = None
+        new_feature._validation_clean = None
+        new_feature._validation_parents = None
+        new_feature._validation_pending = None
+        return new_feature
+
     def __init__(self, *args, **kwargs):
         super(W3DFeature, self).__init__()
         self.update(args)
         self.update(kwargs.items())
-        self._validation_hashes = {}
-        try:
-            self.ui_order
-        except AttributeError:
-            self.ui_order = sorted(self.argument_validators.keys())
 
     def __setitem__(self, key, value):
         if key not in self.argument_validators:
             raise InvalidArgument(
                 "{} not a valid option for this W3D feature".format(key))
+        if key == "name":
+            W3DFeature.name_generation += 1
+        unvalidated_features = _get_unvalidated_features()
+        if self._validation_clean is not None:
+            self._mark_changed()
+        if isinstance(value, FeatureList):
+            value.owner = self
+        if unvalidated_features is not None:
+            unvalidated_features[id(self)] = self
+            super(W3DFeature, self).__setitem__(key, value)
+            return
         if not self.argument_validators[key](value):
             try:
                 value = self.argument_validators[key].coerce(value)
@@ -113,50 +386,275 @@ class W3DFeature(dict):
                 return False
         return True
 
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        if key == "name":
+            W3DFeature.name_generation += 1
+        self._mark_changed()
+
+    def pop(self, key, *args):
+        value = super().pop(key, *args)
+        if key == "name":
+            W3DFeature.name_generation += 1
+        self._mark_changed()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        W3DFeature.name_generation += 1
+        self._mark_changed()
+        return item
+
+    def clear(self):
+        super().clear()
+        W3DFeature.name_generation += 1
+        self._mark_changed()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
     def update(self, other):
         for key, value in other:
             self.__setitem__(key, value)
 
-    def validate(self, project=None):
-        """Validate all values for this feature, coercing if necessary"""
+    def _mark_changed(self):
+        """Record that this feature, and every feature known to contain it,
+        must be visited by the next call to validate"""
+        self._validation_clean = None
+        if self._validation_parents is not None:
+            for parent in self._validation_parents:
+                parent._child_changed(self)
+
+    def _child_changed(self, child):
+        """Record that child of this feature must be visited by the next call
+        to validate"""
+        if self._validation_pending is not None:
+            self._validation_pending[id(child)] = child
+        if self._validation_clean is not None:
+            self._mark_changed()
+
+    def _add_validation_parent(self, parent):
+        """Record that parent contains this feature, so that changes to this
+        feature are reported to it"""
+        parents = self._validation_parents
+        if parents is None:
+            self._validation_parents = (parent,)
+        elif not any(known is parent for known in parents):
+            self._validation_parents = parents + (parent,)
+
+    def _is_clean(self, reference_state):
+        """Return True if this feature and everything it contains are known
+        to be valid for the given state of references"""
+        clean = self._validation_clean
+        return clean is _INDEPENDENT or (
+            clean is not None and clean is reference_state)
+
+    def __reduce__(self):
+        feature_class = type(self)
+        keys = tuple(dict.keys(self))
+        try:
+            keys = feature_class._key_tuples[(feature_class, keys)]
+        except KeyError:
+            feature_class._key_tuples[(feature_class, keys)] = keys
+        values = tuple(dict.values(self))
+
+        attributes = {}
+        for name in feature_class._get_pickled_slots():
+            try:
+                attributes[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        instance_dict = _get_instance_dict(self)
+        if instance_dict:
+            for name, value in instance_dict.items():
+                if name not in self._transient_attributes:
+                    attributes[name] = value
+
+        return (
+            copyreg.__newobj__, (feature_class,),
+            (PICKLE_FORMAT_VERSION, keys, values, attributes or None)
+        )
+
+    def __setstate__(self, state):
+        try:
+            version, keys, values, attributes = state
+        except (TypeError, ValueError):
+            raise ValueError("Unrecognized W3DFeature pickle format")
+        if version != PICKLE_FORMAT_VERSION:
+            raise ValueError(
+                "Unsupported W3DFeature pickle format {}".format(version))
+        dict.update(self, zip(keys, values))
+        for value in values:
+            if isinstance(value, FeatureList):
+                value.owner = self
+        if attributes:
+            for name, value in attributes.items():
+                object.__setattr__(self, name, value)
+
+    @classmethod
+    def _get_pickled_slots(feature_class):
+        """Return names of all slots of this class which should be pickled"""
+        try:
+            return feature_class._pickled_slots[feature_class]
+        except KeyError:
+            slots = []
+            for base in feature_class.__mro__:
+                base_slots = base.__dict__.get("__slots__", ())
+                if isinstance(base_slots, str):
+                    base_slots = (base_slots,)
+                slots.extend(
+                    name for name in base_slots if name not in (
+                        "__dict__", "__weakref__") and
+                    name not in feature_class._transient_attributes
+                )
+            slots = tuple(slots)
+            feature_class._pickled_slots[feature_class] = slots
+            return slots
+
+    def validate(self, project=None, recursive=True):
+        """Validate all values for this feature, coercing if necessary
+
+        :param W3DProject project: Project used to check consistency of this
+            feature with the rest of the project
+        :param bool recursive: If False, values which are themselves
+            W3DFeatures are only checked for the correct type, and their
+            contents are not validated
+        """
+        # Results for references may only be reused within a single validation
+        # of the project that holds them
+        reference_state = getattr(project, "_reference_state", None)
+        if self._is_clean(reference_state):
+            return True
+        fallback = not recursive
         identifier = [type(self).__name__]
         if "name" in self:
             identifier.append(self["name"])
         identifier = " ".join(identifier)
+        reference_keys = self.get_reference_keys()
+        # Children to visit, if known from the last validation
+        pending = self._validation_pending
+        self._validation_pending = None
+        changed_keys = set()
+        # Whether this feature may be marked clean once validated, and whether
+        # that depends on the names of other features
+        closed = recursive
+        dependent = False
 
         for key, validator in self.argument_validators.items():
             if project is not None:
                 validator.set_project(project)
             if self.is_default(key):
                 continue
-            try:
-                if not validator(self[key], fallback=False):
-                    try:
-                        self[key] = validator.coerce(self[key])
-                    except Exception as initial_error:
-                        raise ValidationError(
-                            "\n\n{}\n\nValue {} is not valid for attribute {}"
-                            " of {}".format(
-                                "\n".join(
-                                    str(arg) for arg in initial_error.args
-                                ),
-                                self[key], key, identifier,
+            if key in reference_keys:
+                dependent = True
+                if reference_state is None:
+                    fingerprint = object()
+                else:
+                    fingerprint = (_fingerprint(self[key]), reference_state)
+            else:
+                fingerprint = _fingerprint(self[key])
+            entry = None
+            if self._validation_hashes is not None:
+                entry = self._validation_hashes.get(key)
+            if entry is None or entry[0] != fingerprint:
+                changed_keys.add(key)
+                try:
+                    if not validator(self[key], fallback=fallback):
+                        try:
+                            self[key] = validator.coerce(self[key])
+                        except Exception as initial_error:
+                            raise ValidationError(
+                                "\n\n{}\n\nValue {} is not valid for "
+                                "attribute {} of {}".format(
+                                    "\n".join(
+                                        str(arg) for arg in
+                                        initial_error.args
+                                    ),
+                                    self[key], key, identifier,
+                                )
                             )
-                        )
-                    if not validator(self[key], fallback=False):
-                        raise ValidationError(
-                            "\n\nValue {} for attribute {} of {} is not"
-                            " consistent with rest of project".format(
-                                self[key], key, identifier
+                        if not validator(self[key], fallback=fallback):
+                            raise ValidationError(
+                                "\n\nValue {} for attribute {} of {} is "
+                                "not consistent with rest of project".format(
+                                    self[key], key, identifier
+                                )
                             )
-                        )
-            except ConsistencyError:
-                raise ValidationError(
-                    "\n\nAttribute {} must be set for {}".format(
-                        key, identifier)
-                )
+                except ConsistencyError:
+                    raise ValidationError(
+                        "\n\nAttribute {} must be set for {}".format(
+                            key, identifier)
+                    )
+                if key in reference_keys:
+                    fingerprint = (_fingerprint(self[key]), reference_state)
+                else:
+                    fingerprint = _fingerprint(self[key])
+                entry = (fingerprint, _is_closed(self[key]))
+                if self._validation_hashes is None:
+                    self._validation_hashes = {}
+                self._validation_hashes[key] = entry
+            closed = closed and entry[1]
+        if not recursive:
+            return True
+
+        # Children which are not known to be valid whatever the names of other
+        # features, and so must be visited by the next validation
+        unsettled = {}
+        if pending is None or changed_keys:
+            for key, validator in self.argument_validators.items():
+                if self.is_default(key):
+                    continue
+                child_project = validator.project
+                child_state = getattr(
+                    child_project, "_reference_state", None)
+                for child in _child_features(self[key]):
+                    parents = child._validation_parents
+                    if parents is None or parents[0] is not self:
+                        child._add_validation_parent(self)
+                    if (
+                            key not in changed_keys and
+                            not child._is_clean(child_state)):
+                        child.validate(project=child_project)
+                    if child._validation_clean is not _INDEPENDENT:
+                        unsettled[id(child)] = child
+        else:
+            for child in pending.values():
+                if not child._is_clean(reference_state):
+                    child.validate(project=project)
+                if child._validation_clean is not _INDEPENDENT:
+                    unsettled[id(child)] = child
+        for child in unsettled.values():
+            child_clean = child._validation_clean
+            if child_clean is None or child_clean is not reference_state:
+                closed = False
+            else:
+                dependent = True
+        self._validation_pending = unsettled
+
+        if closed:
+            if not dependent:
+                self._validation_clean = _INDEPENDENT
+            elif reference_state is not None:
+                self._validation_clean = reference_state
         return True
 
+    @classmethod
+    def get_reference_keys(feature_class):
+        """Return set of keys whose validity depends on other features in the
+        project"""
+        try:
+            return feature_class._reference_keys[feature_class]
+        except KeyError:
+            reference_keys = frozenset(
+                key for key, validator in
+                feature_class.argument_validators.items()
+                if _uses_references(validator)
+            )
+            feature_class._reference_keys[feature_class] = reference_keys
+            return reference_keys
+
     def toXML(self, parent_root):
         """Store data in W3D XML format within parent_root
 
@@ -15,18 +15,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
-import logging
 import xml.etree.ElementTree as ET
 from .features import W3DFeature
 from .validators import ValidPyString, ListValidator, ReferenceValidator
 from .errors import BadW3DXML, ConsistencyError
 from .names import generate_group_name, \
     generate_blender_object_name
-try:
-    import bpy
-except ImportError:
-    logging.debug(
-        "Module bpy not found. Loading pyw3d.actions as standalone")
 
 
 class W3DGroup(W3DFeature):
@@ -112,26 +106,30 @@ class W3DGroup(W3DFeature):
                     raise BadW3DXML("Groups node has no name attrib")
         return group
 
-    def blend_objects(self):
-        """Store data on objects in group in Blender script"""
+    def plan_objects(self, scene_plan):
+        """Store data on objects in group in Blender script
+
+        :param ScenePlan scene_plan: The plan holding the group_defs.py
+        script"""
         group_name = generate_group_name(self["name"])
-        script = bpy.data.texts["group_defs.py"]
         object_names = [
             generate_blender_object_name(object_) for object_ in
             self["objects"]
         ]
-        script.write("\n{} = {}".format(
+        scene_plan.write_text("group_defs.py", "\n{} = {}".format(
             group_name, object_names))
-        return script
+        return "group_defs.py"
+
+    def plan_groups(self, scene_plan):
+        """Store data on groups in group in Blender script
 
-    def blend_groups(self):
-        """Store data on groups in group in Blender script"""
+        :param ScenePlan scene_plan: The plan holding the group_defs.py
+        script"""
         group_name = generate_group_name(self["name"])
-        script = bpy.data.texts["group_defs.py"]
         script_text = [""]
         for group in self["groups"]:
             script_text.append(
                 "{}.extend({})".format(
                     group_name, generate_group_name(group))
             )
-        script.write("\n".join(script_text))
+        scene_plan.write_text("group_defs.py", "\n".join(script_text))
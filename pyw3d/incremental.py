@@ -0,0 +1,538 @@
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""Incremental export of projects to an existing .blend file
+
+When a project is exported incrementally, a record of the export is stored in
+the .blend file as a text block. The record holds a fingerprint of each feature
+that creates geometry (sounds and objects), the Blender datablocks each such
+feature created, and digests of the project's
+:class:`pyw3d.scene_plan.ScenePlan`.
+
+On the next incremental export to the same file, only the geometry of features
+whose fingerprint changed is deleted and created again. The new ScenePlan is
+compared with the recorded digests, and empties, texts, game properties, logic
+bricks and links are recreated only for the Blender objects whose part of the
+plan changed or which were themselves recreated. Logic bricks are always
+recreated for a whole object at once, so that their order matches that of a
+full export.
+
+Any change to project-level settings or to pyw3d itself, or a missing or
+unreadable record, results in a full export.
+"""
+import hashlib
+import json
+import logging
+import os
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+from .cache import pyw3d_fingerprint
+from .features import W3DFeature
+from .names import generate_relative_to_name
+from .placement import W3DPlacement
+from .scene_plan import ObjectRef, BRICK_KINDS, freeze_settings
+from .validators import ValidFile, ValidFontFile
+LOGGER = logging.getLogger("pyw3d")
+try:
+    import bpy
+    from _bpy import ops as ops_module
+    BPY_OPS_CALL = ops_module.call
+except ImportError:
+    LOGGER.debug(
+        "Module bpy not found. Incremental exports are unavailable")
+
+RECORD_TEXT = "w3d_export_record.json"
+RECORD_FORMAT_VERSION = 1
+GEOMETRY_KEYS = ("sounds", "objects")
+DATA_COLLECTIONS = (
+    "objects", "meshes", "curves", "materials", "textures", "images", "lamps",
+    "sounds")
+# Datablocks are purged before the datablocks they use
+PURGE_ORDER = (
+    "meshes", "curves", "lamps", "materials", "textures", "images", "sounds")
+
+
+def digest(value):
+    """Return hex digest of repr of value"""
+    return hashlib.sha256(repr(value).encode("utf-8")).hexdigest()
+
+
+def iter_feature_files(feature):
+    """Iterate over absolute paths of files referred to by feature or any
+    feature it contains"""
+    if isinstance(feature, W3DFeature):
+        for key, value in sorted(feature.items()):
+            validator = feature.argument_validators.get(key)
+            if isinstance(validator, ValidFile) and isinstance(value, str):
+                if (
+                        isinstance(validator, ValidFontFile) and
+                        not os.path.isfile(value)):
+                    value = os.path.join("fonts", value)
+                yield os.path.abspath(value)
+            else:
+                yield from iter_feature_files(value)
+    elif isinstance(feature, Mapping):
+        for value in feature.values():
+            yield from iter_feature_files(value)
+    elif isinstance(feature, Sequence) and not isinstance(feature, str):
+        for value in feature:
+            yield from iter_feature_files(value)
+
+
+def feature_fingerprint(feature):
+    """Return fingerprint of a feature and any files it refers to
+
+    The fingerprint changes if the XML representation of the feature changes
+    or if the size or modification time of any of its files changes."""
+    fingerprint = hashlib.sha256()
+    feature_root = ET.Element("Fingerprint")
+    feature.toXML(feature_root)
+    fingerprint.update(ET.tostring(feature_root))
+    for path in iter_feature_files(feature):
+        try:
+            stat = os.stat(path)
+            file_state = (path, stat.st_size, stat.st_mtime)
+        except OSError:
+            file_state = (path, None, None)
+        fingerprint.update(repr(file_state).encode("utf-8"))
+    return fingerprint.hexdigest()
+
+
+def project_fingerprint(project):
+    """Return fingerprint of the project-level settings of a W3DProject and
+    the version of pyw3d exporting it"""
+    fingerprint = hashlib.sha256(pyw3d_fingerprint())
+    project_root = ET.Element("Story")
+    project._global_toXML(project_root)
+    fingerprint.update(ET.tostring(project_root))
+    return fingerprint.hexdigest()
+
+
+def iter_geometry_features(project):
+    """Iterate over (source, feature) for each feature of project that
+    creates geometry, in the order they are blended"""
+    for key in GEOMETRY_KEYS:
+        for feature in project.iter_features(key):
+            yield "{}/{}".format(key, feature["name"]), feature
+
+
+def link_key(spec):
+    """Return tuple identifying the link described by a LinkSpec"""
+    return (
+        spec.controller.object, spec.controller.name, spec.brick.kind,
+        spec.brick.object, spec.brick.name)
+
+
+def summarize_plan(scene_plan):
+    """Return dictionary of digests of each part of a ScenePlan"""
+    properties = OrderedDict()
+    for spec in scene_plan.properties:
+        properties.setdefault(spec.object, []).append(
+            (spec.name, spec.type, spec.value))
+    bricks = OrderedDict()
+    for spec in scene_plan.bricks:
+        bricks.setdefault(spec.object, []).append(
+            (spec.kind, spec.name, spec.type, spec.settings))
+    return {
+        "empties": {
+            name: digest(spec.settings)
+            for name, spec in scene_plan.empties.items()},
+        "object_settings": {
+            name: [digest(freeze_settings(settings)), sorted(settings)]
+            for name, settings in scene_plan.object_settings.items()},
+        "properties": {
+            name: digest(entries) for name, entries in properties.items()},
+        "bricks": {
+            name: digest(entries) for name, entries in bricks.items()},
+        "links": [list(link_key(spec)) for spec in scene_plan.links],
+        "texts": {
+            name: digest(scene_plan.get_text(name))
+            for name in scene_plan.texts}
+    }
+
+
+def get_plan_references(scene_plan):
+    """Return dictionary mapping names of objects to the set of names of
+    objects referred to by their settings or logic bricks"""
+    references = {}
+
+    def add_references(name, settings):
+        for path, value in settings:
+            if isinstance(value, ObjectRef):
+                references.setdefault(name, set()).add(value.name)
+
+    for name, spec in scene_plan.empties.items():
+        add_references(name, spec.settings)
+    for name, settings in scene_plan.object_settings.items():
+        add_references(name, settings.items())
+    for spec in scene_plan.bricks:
+        add_references(spec.object, spec.settings)
+    return references
+
+
+class DatablockTracker(object):
+    """Record the Blender datablocks created by each geometry feature
+
+    :ivar dict datablocks: Dictionary mapping sources to dictionaries of
+        names of created datablocks by collection
+    """
+
+    def __init__(self, datablocks=None):
+        if datablocks is None:
+            datablocks = {}
+        self.datablocks = datablocks
+
+    def snapshot(self):
+        return {
+            collection: set(getattr(bpy.data, collection).keys())
+            for collection in DATA_COLLECTIONS}
+
+    @contextmanager
+    def tracking(self, source):
+        """Attribute datablocks created within this context to source"""
+        before = self.snapshot()
+        yield
+        after = self.snapshot()
+        self.datablocks[source] = {
+            collection: sorted(after[collection] - before[collection])
+            for collection in DATA_COLLECTIONS
+            if after[collection] - before[collection]}
+
+    def get_objects(self, sources):
+        """Return set of names of Blender objects created by sources"""
+        return {
+            name for source in sources
+            for name in self.datablocks.get(source, {}).get("objects", ())}
+
+
+class ExportRecord(object):
+    """Fingerprints of a project as exported to a .blend file
+
+    :param str project: Fingerprint of project-level settings (see
+        :func:`project_fingerprint`)
+    :param dict features: Fingerprint of each geometry feature by source
+    :param dict plan: Digests of ScenePlan (see :func:`summarize_plan`)
+    :param dict datablocks: Names of datablocks created by each geometry
+        feature (see :class:`DatablockTracker`)
+    """
+
+    def __init__(self, project, features, plan, datablocks=None):
+        self.project = project
+        self.features = features
+        self.plan = plan
+        if datablocks is None:
+            datablocks = {}
+        self.datablocks = datablocks
+
+    @classmethod
+    def from_project(cls, project, scene_plan):
+        """Create record of project as it is now, without datablocks"""
+        return cls(
+            project_fingerprint(project),
+            OrderedDict(
+                (source, feature_fingerprint(feature))
+                for source, feature in iter_geometry_features(project)),
+            summarize_plan(scene_plan))
+
+    def to_json(self):
+        return json.dumps({
+            "format": RECORD_FORMAT_VERSION,
+            "project": self.project,
+            "features": self.features,
+            "plan": self.plan,
+            "datablocks": self.datablocks
+        }, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, json_string):
+        """Create record from string written by :meth:`to_json`
+
+        :raises ValueError: If string is not a record of the current format
+        """
+        data = json.loads(json_string)
+        try:
+            if data["format"] != RECORD_FORMAT_VERSION:
+                raise ValueError(
+                    "Unsupported export record format {}".format(
+                        data["format"]))
+            return cls(
+                data["project"], data["features"], data["plan"],
+                data["datablocks"])
+        except (KeyError, TypeError) as error:
+            raise ValueError("Malformed export record: {}".format(error))
+
+    def save(self):
+        """Store record in current .blend as a text block"""
+        text = bpy.data.texts.get(RECORD_TEXT)
+        if text is None:
+            text = bpy.data.texts.new(RECORD_TEXT)
+        text.clear()
+        text.write(self.to_json())
+
+    @classmethod
+    def load(cls):
+        """Return record stored in current .blend or None if there is no
+        usable record"""
+        text = bpy.data.texts.get(RECORD_TEXT)
+        if text is None:
+            return None
+        try:
+            return cls.from_json(text.as_string())
+        except ValueError as error:
+            LOGGER.info("Ignoring export record: {}".format(error))
+            return None
+
+
+class IncrementalUpdate(object):
+    """Changes needed to bring a .blend file exported from an earlier version
+    of a project up to date
+
+    :param project: The W3DProject as it is now
+    :param ScenePlan scene_plan: Plan of the project as it is now
+    :param ExportRecord previous: Record stored by the earlier export
+    :param ExportRecord current: Record of the project as it is now
+    """
+
+    def __init__(self, project, scene_plan, previous, current):
+        self.project = project
+        self.scene_plan = scene_plan
+        self.previous = previous
+        self.current = current
+        self.references = get_plan_references(scene_plan)
+
+        old_features = previous.features
+        new_features = current.features
+        # Sources whose geometry must be deleted or created
+        self.stale_sources = [
+            source for source in old_features
+            if new_features.get(source) != old_features[source]]
+        self.changed_sources = [
+            source for source in new_features
+            if old_features.get(source) != new_features[source]]
+
+        old_plan = previous.plan
+        new_plan = current.plan
+        self.stale_objects = DatablockTracker(
+            previous.datablocks).get_objects(self.stale_sources)
+        self.stale_empties = {
+            name for name, empty_digest in old_plan["empties"].items()
+            if new_plan["empties"].get(name) != empty_digest}
+        self.new_empties = {
+            name for name, empty_digest in new_plan["empties"].items()
+            if old_plan["empties"].get(name) != empty_digest}
+        # Empties referring to recreated objects are recreated as well
+        changed = True
+        while changed:
+            changed = False
+            for name in new_plan["empties"]:
+                if name in self.new_empties:
+                    continue
+                if self.references.get(name, set()) & (
+                        self.stale_objects | self.stale_empties):
+                    self.stale_empties.add(name)
+                    self.new_empties.add(name)
+                    changed = True
+        self.stale_objects |= self.stale_empties
+
+        # Objects which are kept but whose plan changed
+        self.logic_objects = set()
+        self.settings_objects = set()
+        for name in self.get_planned_objects():
+            if name in self.stale_objects:
+                continue
+            refers_to_stale = bool(
+                self.references.get(name, set()) & self.stale_objects)
+            if refers_to_stale or any(
+                    old_plan[part].get(name) != new_plan[part].get(name)
+                    for part in ("properties", "bricks")):
+                self.logic_objects.add(name)
+            old_settings = old_plan["object_settings"].get(name)
+            new_settings = new_plan["object_settings"].get(name)
+            if refers_to_stale or old_settings != new_settings:
+                self.settings_objects.add(name)
+
+        self.old_links = {
+            tuple(key) for key in old_plan["links"]}
+        self.new_links = {
+            tuple(key) for key in new_plan["links"]}
+
+    @classmethod
+    def from_blend(cls, project, scene_plan, current):
+        """Return IncrementalUpdate for the open .blend or None if it must be
+        exported in full"""
+        previous = ExportRecord.load()
+        if previous is None:
+            LOGGER.info("No export record found; exporting in full")
+            return None
+        if previous.project != current.project:
+            LOGGER.info(
+                "Project settings or pyw3d changed; exporting in full")
+            return None
+        update = cls(project, scene_plan, previous, current)
+        reason = update.get_full_export_reason()
+        if reason is not None:
+            LOGGER.info("{}; exporting in full".format(reason))
+            return None
+        return update
+
+    def get_planned_objects(self):
+        """Return set of names of all objects with logic or settings in either
+        plan"""
+        names = set()
+        for plan in (self.previous.plan, self.current.plan):
+            for part in ("object_settings", "properties", "bricks"):
+                names.update(plan[part])
+        return names
+
+    def get_full_export_reason(self):
+        """Return reason this update cannot be applied or None if it can"""
+        for name in ("CAMERA",) + tuple(
+                generate_relative_to_name(option)
+                for option in self.get_relative_to_options()):
+            if name not in bpy.data.objects:
+                return "Object {} missing".format(name)
+        for name in self.settings_objects:
+            old_settings = self.previous.plan["object_settings"].get(name)
+            new_settings = self.current.plan["object_settings"].get(name)
+            if old_settings is not None and (
+                    new_settings is None or
+                    not set(old_settings[1]) <= set(new_settings[1])):
+                return "Settings of {} cannot be reverted".format(name)
+        return None
+
+    def get_relative_to_options(self):
+        return [
+            option for option in W3DPlacement.argument_validators[
+                "relative_to"].valid_options
+            if option != "Camera"]
+
+    def restore_relative_to_objects(self, export_context):
+        """Use the relative_to objects already in the .blend for placing
+        geometry"""
+        for option in self.get_relative_to_options():
+            export_context.relative_to_objects[option] = bpy.data.objects[
+                generate_relative_to_name(option)]
+
+    def remove_logic(self, blender_object):
+        """Remove all logic bricks and game properties of object"""
+        bpy.context.scene.objects.active = blender_object
+        for kind in BRICK_KINDS:
+            collection = getattr(blender_object.game, kind + "s")
+            for name in [brick.name for brick in collection]:
+                BPY_OPS_CALL(
+                    "logic.{}_remove".format(kind), None,
+                    {kind: name, 'object': blender_object.name}
+                )
+        for _ in range(len(blender_object.game.properties)):
+            BPY_OPS_CALL("object.game_property_remove", None, {'index': 0})
+
+    def remove_stale(self):
+        """Remove Blender data which is out of date"""
+        for name in sorted(self.logic_objects):
+            if name in bpy.data.objects:
+                self.remove_logic(bpy.data.objects[name])
+
+        # Links to removed bricks are removed along with them, so only links
+        # between bricks which are kept need to be removed here
+        removed_objects = self.stale_objects | self.logic_objects
+        for key in self.old_links - self.new_links:
+            controller_object, controller, kind, brick_object, brick = key
+            if (
+                    controller_object in removed_objects or
+                    brick_object in removed_objects):
+                continue
+            try:
+                game_controller = bpy.data.objects[
+                    controller_object].game.controllers[controller]
+                game_brick = getattr(
+                    bpy.data.objects[brick_object].game,
+                    kind + "s")[brick]
+            except KeyError:
+                continue
+            game_controller.unlink(**{kind: game_brick})
+
+        for name in sorted(self.stale_objects):
+            blender_object = bpy.data.objects.get(name)
+            if blender_object is not None:
+                bpy.data.objects.remove(blender_object, do_unlink=True)
+
+        new_texts = self.current.plan["texts"]
+        for name, text_digest in self.previous.plan["texts"].items():
+            if new_texts.get(name) != text_digest and name in bpy.data.texts:
+                bpy.data.texts.remove(bpy.data.texts[name])
+
+        for collection in PURGE_ORDER:
+            blender_collection = getattr(bpy.data, collection)
+            for source in self.stale_sources:
+                for name in self.previous.datablocks.get(source, {}).get(
+                        collection, ()):
+                    datablock = blender_collection.get(name)
+                    if datablock is not None and datablock.users == 0:
+                        blender_collection.remove(datablock)
+
+    def apply(self, applier, export_context, blend_features):
+        """Update the open .blend to match the project
+
+        :param SceneApplier applier: Applier for the current ScenePlan
+        :param ExportContext export_context: Context of this export
+        :param blend_features: Callable taking an iterable of (source,
+            feature) pairs and a DatablockTracker, which creates the geometry
+            of each feature
+        :return: DatablockTracker holding the datablocks of all geometry
+            features of the project
+        """
+        self.restore_relative_to_objects(export_context)
+        self.remove_stale()
+
+        tracker = DatablockTracker({
+            source: datablocks
+            for source, datablocks in self.previous.datablocks.items()
+            if source in self.current.features and
+            source not in self.changed_sources})
+        applier.apply_scene_settings()
+        changed_sources = set(self.changed_sources)
+        blend_features([
+            (source, feature)
+            for source, feature in iter_geometry_features(self.project)
+            if source in changed_sources], tracker)
+
+        old_texts = self.previous.plan["texts"]
+        applier.create_texts(only={
+            name for name, text_digest in self.current.plan["texts"].items()
+            if old_texts.get(name) != text_digest})
+        applier.create_empties(only=self.new_empties)
+
+        rebuilt_objects = (
+            tracker.get_objects(changed_sources) | self.new_empties)
+        applier.apply_object_settings(
+            only=rebuilt_objects | self.settings_objects)
+        logic_objects = rebuilt_objects | self.logic_objects
+        applier.create_properties(only=logic_objects)
+        applier.create_bricks(only=logic_objects)
+        applier.create_links(only=lambda spec: (
+            spec.controller.object in logic_objects or
+            spec.brick.object in logic_objects or
+            link_key(spec) not in self.old_links))
+
+        LOGGER.info(
+            "Incremental export: {} of {} geometry features and logic of {}"
+            " objects rebuilt".format(
+                len(self.changed_sources), len(self.current.features),
+                len(logic_objects)))
+        return tracker
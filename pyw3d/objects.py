@@ -28,6 +28,7 @@ from .features import W3DFeature
 from .actions import W3DAction, ObjectAction, GroupAction,\
     SoundAction, EventTriggerAction
 from .placement import W3DPlacement
+from .export_context import get_export_context
 from .validators import OptionValidator, IsNumeric, ListValidator, IsInteger,\
     ValidPyString, IsBoolean, FeatureValidator, DictValidator,\
     TextValidator, ValidFile, ValidFontFile, ReferenceValidator
@@ -37,11 +38,12 @@ from .names import generate_blender_object_name,\
     generate_blender_particle_name, generate_blender_curve_name
 from .metaclasses import SubRegisteredClass
 from .activators import BlenderClickTrigger
-from .sounds import audio_playback_object
+from .scene_plan import BrickRef
 import logging
 LOGGER = logging.getLogger("pyw3d")
 try:
     import bpy
+    import bmesh
     import mathutils
     from _bpy import ops as ops_module
     BPY_OPS_CALL = ops_module.call
@@ -91,6 +93,26 @@ def set_object_center(blender_object, center_vec):
     blender_object.matrix_world.translation = center_vec
 
 
+def add_mesh_object(name, create_mesh, **parameters):
+    """Create mesh object using given bmesh operator and link it to scene
+
+    This creates the same mesh as the mesh.primitive_*_add operator that
+    calls the same bmesh operator, but does not depend on or change the
+    selected and active objects and does not update the scene.
+
+    :param create_mesh: bmesh operator, e.g. bmesh.ops.create_cube
+    :param parameters: Parameters of bmesh operator
+    """
+    mesh = bpy.data.meshes.new(name)
+    mesh_builder = bmesh.new()
+    create_mesh(mesh_builder, **parameters)
+    mesh_builder.to_mesh(mesh)
+    mesh_builder.free()
+    new_object = bpy.data.objects.new(name, mesh)
+    bpy.context.scene.objects.link(new_object)
+    return new_object
+
+
 def duplicate_object(original):
     """Duplicate given object"""
     new = original.copy()
@@ -102,32 +124,32 @@ def duplicate_object(original):
 
 
 def generate_object_from_model(filename):
-    """Generate Blender object from model file"""
+    """Generate Blender object from model file
+
+    The first object imported from each file is kept in the active
+    :class:`pyw3d.export_context.ExportContext`, and later objects for the
+    same file are copied from it."""
+    models = get_export_context().models
     try:
-        return duplicate_object(
-            generate_object_from_model._models[filename]
-        )
-    except AttributeError:
-        generate_object_from_model._models = {}
+        return duplicate_object(models[filename])
     except KeyError:
+        pass
+    BPY_OPS_CALL(
+        "import_scene.obj", None,
+        {'filepath': filename}
+    )
+    model_pieces = bpy.context.selected_objects
+    for piece in model_pieces:
+        bpy.context.scene.objects.active = piece
         BPY_OPS_CALL(
-            "import_scene.obj", None,
-            {'filepath': filename}
+            "object.convert", None,
+            {'target': 'MESH', 'keep_original': False}
         )
-        model_pieces = bpy.context.selected_objects
-        for piece in model_pieces:
-            bpy.context.scene.objects.active = piece
-            BPY_OPS_CALL(
-                "object.convert", None,
-                {'target': 'MESH', 'keep_original': False}
-            )
-        BPY_OPS_CALL("object.join", None, {})
-        new_model = bpy.context.object
-        generate_object_from_model._models[filename] = new_model
+    BPY_OPS_CALL("object.join", None, {})
+    new_model = bpy.context.object
+    models[filename] = new_model
 
-        return new_model
-
-    return generate_object_from_model(filename)
+    return new_model
 
 
 def _alpha_prep(slot, material):
@@ -139,54 +161,53 @@ def _alpha_prep(slot, material):
 
 
 def generate_material_from_image(filename, double_sided=True):
-    """Generate Blender material from image for texturing"""
+    """Generate Blender material from image for texturing
+
+    Materials are kept in the active
+    :class:`pyw3d.export_context.ExportContext` for reuse."""
+    materials = get_export_context().materials
     try:
-        return generate_material_from_image._materials[
-            filename][double_sided]
-    except AttributeError:
-        generate_material_from_image._materials = {}
+        return materials[filename][double_sided]
     except KeyError:
-        material_name = bpy.path.display_name_from_filepath(filename)
+        pass
+    material_name = bpy.path.display_name_from_filepath(filename)
 
-        material_single = bpy.data.materials.new(
-            name="{}{}".format(material_name, 0)
-        )
-        material_double = bpy.data.materials.new(
-            name="{}{}".format(material_name, 1)
-        )
-        texture_slot_single = material_single.texture_slots.add()
-        texture_slot_double = material_double.texture_slots.add()
+    material_single = bpy.data.materials.new(
+        name="{}{}".format(material_name, 0)
+    )
+    material_double = bpy.data.materials.new(
+        name="{}{}".format(material_name, 1)
+    )
+    texture_slot_single = material_single.texture_slots.add()
+    texture_slot_double = material_double.texture_slots.add()
 
-        texture_name = '_'.join(
-            (os.path.splitext(os.path.basename(filename))[0],
-             "image_texture")
-        )
-        image_texture = bpy.data.textures.new(name=texture_name, type="IMAGE")
-        image_texture.image = bpy.data.images.load(filename)
-        # NOTE: The above already raises a sensible RuntimeError if file is not
-        # found
-        image_texture.image.use_alpha = True
-        _alpha_prep(texture_slot_single, material_single)
-        _alpha_prep(texture_slot_double, material_double)
-
-        texture_slot_single.texture = image_texture
-        texture_slot_double.texture = image_texture
-        texture_slot_single.texture_coords = 'UV'
-        texture_slot_double.texture_coords = 'UV'
-
-        # material.alpha = 0.0
-        # material.specular_alpha = 0.0
-        # texture_slot.use_map_alpha
-        # material.use_transparency = True
-        material_single.game_settings.use_backface_culling = True
-        material_double.game_settings.use_backface_culling = False
-
-        generate_material_from_image._materials[filename] = (
-            material_single, material_double
-        )
+    texture_name = '_'.join(
+        (os.path.splitext(os.path.basename(filename))[0],
+         "image_texture")
+    )
+    image_texture = bpy.data.textures.new(name=texture_name, type="IMAGE")
+    image_texture.image = bpy.data.images.load(filename)
+    # NOTE: The above already raises a sensible RuntimeError if file is not
+    # found
+    image_texture.image.use_alpha = True
+    _alpha_prep(texture_slot_single, material_single)
+    _alpha_prep(texture_slot_double, material_double)
+
+    texture_slot_single.texture = image_texture
+    texture_slot_double.texture = image_texture
+    texture_slot_single.texture_coords = 'UV'
+    texture_slot_double.texture_coords = 'UV'
 
-    return generate_material_from_image(
-        filename, double_sided=double_sided)
+    # material.alpha = 0.0
+    # material.specular_alpha = 0.0
+    # texture_slot.use_map_alpha
+    # material.use_transparency = True
+    material_single.game_settings.use_backface_culling = True
+    material_double.game_settings.use_backface_culling = False
+
+    materials[filename] = (material_single, material_double)
+
+    return materials[filename][double_sided]
 
 
 class W3DLink(W3DFeature):
@@ -201,6 +222,8 @@ class W3DLink(W3DFeature):
     :param int reset: Number of clicks after which to reset link (negative
         value to never reset)"""
 
+    __slots__ = ("num_clicks",)
+
     ui_order = [
         "enabled", "remain_enabled", "selected_color", "reset", "actions"]
 
@@ -318,23 +341,32 @@ class W3DLink(W3DFeature):
 
         return link
 
-    def blend(self, object_name):
-        """Create Blender object to implement W3DLink
+    def plan_logic(
+            self, scene_plan, object_name, object_color=(255, 255, 255),
+            object_visible=True):
+        """Add logic implementing W3DLink to scene plan
 
+        :param ScenePlan scene_plan: The plan to which logic is added
         :param str object_name: The name of the object to which link is
-        assigned"""
+        assigned
+        :param tuple object_color: RGB color of that object
+        :param bool object_visible: Is that object initially visible?"""
         self.activator = BlenderClickTrigger(
-            object_name, self["actions"], object_name,
+            object_name, self["actions"], scene_plan, object_name,
             enable_immediately=self["enabled"],
             remain_enabled=self["remain_enabled"],
             select_color=self["selected_color"],
             enable_color=self["enabled_color"],
-            reset_clicks=self['reset']
+            reset_clicks=self['reset'],
+            object_color=object_color,
+            object_visible=object_visible
         )
-        self.activator.base_object.game.use_collision_bounds = True
-        self.activator.base_object.game.collision_bounds_type = "CONVEX_HULL"
+        scene_plan.set_object(object_name, **{
+            "game.use_collision_bounds": True,
+            "game.collision_bounds_type": "CONVEX_HULL"
+        })
         self.activator.create_blender_objects()
-        return self.activator.base_object
+        return self.activator
 
     def link_blender_logic(self):
         """Link BGE logic bricks for this W3DLink"""
@@ -342,7 +374,7 @@ class W3DLink(W3DFeature):
             self.activator.link_logic_bricks()
         except AttributeError:
             raise EBKAC(
-                "blend() must be called before link_blender_logic()")
+                "plan_logic() must be called before link_blender_logic()")
 
     def write_blender_logic(self):
         """Write any necessary game engine logic for this W3DTimeline"""
@@ -350,7 +382,7 @@ class W3DLink(W3DFeature):
             self.activator.write_python_logic()
         except AttributeError:
             raise EBKAC(
-                "blend() must be called before write_blender_logic()")
+                "plan_logic() must be called before write_blender_logic()")
 
 
 class W3DContent(W3DFeature, metaclass=SubRegisteredClass):
@@ -359,6 +391,14 @@ class W3DContent(W3DFeature, metaclass=SubRegisteredClass):
     blender_scaling = 1
     ui_order = []
 
+    def plan_logic(self, scene_plan, object_names):
+        """Add any game logic needed by this content to scene plan
+
+        :param ScenePlan scene_plan: The plan to which logic is added
+        :param list object_names: The names of the Blender objects holding
+        this content (the object itself and its particle copy)"""
+        return None
+
     @staticmethod
     def fromXML(content_root):
         """Create object of appropriate subclass from Content node
@@ -437,35 +477,29 @@ class W3DShape(W3DContent):
         return new_shape
 
     def blend(self):
+        # Parameters match those passed to bmesh by the default
+        # mesh.primitive_*_add operators
         if self["shape_type"] == "Sphere":
-            BPY_OPS_CALL(
-                "mesh.primitive_uv_sphere_add", None,
-                {'size': self["radius"]}
-            )
-        elif self["shape_type"] == "Cube":
-            BPY_OPS_CALL(
-                "mesh.primitive_cube_add", None,
-                {'radius': self["radius"]}
-            )
-        elif self["shape_type"] == "Cone":
-            BPY_OPS_CALL(
-                "mesh.primitive_cone_add", None,
-                {'radius1': self["radius"], 'depth': self["depth"]}
-            )
-        elif self["shape_type"] == "Cylinder":
-            BPY_OPS_CALL(
-                "mesh.primitive_cylinder_add", None,
-                {'radius': self["radius"], 'depth': self["depth"]}
-            )
-        elif self["shape_type"] == "Monkey":
-            BPY_OPS_CALL(
-                "mesh.primitive_monkey_add", None,
-                {'radius': self["radius"]}
-            )
-
-        new_shape_object = bpy.context.object
-
-        return new_shape_object
+            return add_mesh_object(
+                "Sphere", bmesh.ops.create_uvsphere, u_segments=32,
+                v_segments=16, diameter=self["radius"])
+        if self["shape_type"] == "Cube":
+            return add_mesh_object(
+                "Cube", bmesh.ops.create_cube, size=2 * self["radius"])
+        if self["shape_type"] == "Cone":
+            return add_mesh_object(
+                "Cone", bmesh.ops.create_cone, cap_ends=True, cap_tris=False,
+                segments=32, diameter1=self["radius"], diameter2=0,
+                depth=self["depth"])
+        if self["shape_type"] == "Cylinder":
+            return add_mesh_object(
+                "Cylinder", bmesh.ops.create_cone, cap_ends=True,
+                cap_tris=False, segments=32, diameter1=self["radius"],
+                diameter2=self["radius"], depth=self["depth"])
+        if self["shape_type"] == "Monkey":
+            return add_mesh_object(
+                "Suzanne", bmesh.ops.create_monkey,
+                matrix=mathutils.Matrix.Scale(self["radius"], 4))
 
 
 class W3DText(W3DContent):
@@ -499,8 +533,6 @@ class W3DText(W3DContent):
 
     ui_order = ["text", "halign", "valign", "font", "depth"]
 
-    _loaded_fonts = {}
-
     def toXML(self, object_root):
         """Store W3DText as Content node within Object node
 
@@ -568,8 +600,10 @@ class W3DText(W3DContent):
                 pass
 
         if font_spec is not None:
-            if self["font"] in self._loaded_fonts:
-                new_text_object.data.font = self._loaded_fonts[self["font"]]
+            loaded_fonts = get_export_context().fonts
+            loaded_font = loaded_fonts.get(self["font"])
+            if loaded_font is not None:
+                new_text_object.data.font = loaded_font
             elif not os.path.isabs(font_spec):
                 font_file = os.path.join(os.getcwd(), font_spec)
                 try:
@@ -587,7 +621,7 @@ class W3DText(W3DContent):
                         raise ConsistencyError(
                             "Font file {} could not be found".format(font_file)
                         )
-                self._loaded_fonts[self["font"]] = new_text_object.data.font
+                loaded_fonts[self["font"]] = new_text_object.data.font
             else:
                 font_file = font_spec
                 try:
@@ -596,7 +630,7 @@ class W3DText(W3DContent):
                     raise ConsistencyError(
                         "Font file {} could not be found".format(font_file)
                     )
-                self._loaded_fonts[self["font"]] = new_text_object.data.font
+                loaded_fonts[self["font"]] = new_text_object.data.font
         #if font_spec is not None:
         #    new_text_object.data.resolution_u = 1
         #    new_text_object.data.resolution_v = 1
@@ -618,11 +652,8 @@ class W3DText(W3DContent):
                     self["text"], self["font"]
                 )
             )
-            BPY_OPS_CALL(
-                "object.add", None,
-                {'type': "EMPTY", 'location': (0, 0, 0)}
-            )
-            final_object = bpy.context.object
+            final_object = bpy.data.objects.new("Empty", None)
+            bpy.context.scene.objects.link(final_object)
             return final_object
 
         depth = final_object.bound_box[1][2]
@@ -679,11 +710,9 @@ class W3DImage(W3DContent):
 
     def blend(self):
         """Create representation of W3DImage in Blender"""
-        BPY_OPS_CALL(
-            "mesh.primitive_plane_add", None,
-            {'radius': 0.1524}
-        )
-        new_image_object = bpy.context.object
+        new_image_object = add_mesh_object(
+            "Plane", bmesh.ops.create_grid, x_segments=1, y_segments=1,
+            size=0.1524)
         apply_euler_rotation(new_image_object, math.pi / 2, 0, 0)
 
         material = generate_material_from_image(self["filename"])
@@ -899,14 +928,11 @@ class W3DLight(W3DContent):
         light_type_conversion = {
             "Point": "POINT", "Directional": "SUN", "Spot": "SPOT"
         }
-        BPY_OPS_CALL(
-            "object.lamp_add", None,
-            {
-                'type': light_type_conversion[self["light_type"]],
-                'rotation': (-math.pi / 2, 0, 0)
-            }
-        )
-        new_light_object = bpy.context.object
+        new_lamp = bpy.data.lamps.new(
+            self["light_type"], light_type_conversion[self["light_type"]])
+        new_light_object = bpy.data.objects.new("Lamp", new_lamp)
+        new_light_object.rotation_euler = (-math.pi / 2, 0, 0)
+        bpy.context.scene.objects.link(new_light_object)
         new_light_object.data.use_diffuse = self["diffuse"]
         new_light_object.data.use_specular = self["specular"]
         new_light_object.data.energy = (
@@ -984,10 +1010,6 @@ class W3DObject(W3DFeature):
 
     def __init__(self, *args, **kwargs):
         super(W3DObject, self).__init__(*args, **kwargs)
-        self.ui_order = [
-            "name", "visible", "color", "lighting", "scale", "click_through",
-            "around_own_axis", "sound", "placement", "link", "content"
-        ]
         if "placement" not in self:
             self["placement"] = W3DPlacement()
 
@@ -1124,31 +1146,11 @@ class W3DObject(W3DFeature):
         LOGGER.debug("Object: {}".format(blender_object.name))
         LOGGER.debug("Position: {}".format(blender_object.location))
 
-        for object_ in bpy.context.selectable_objects:
-            object_.select = False
-
-        blender_object.select = True
-        bpy.context.scene.objects.active = blender_object
-
-        BPY_OPS_CALL(
-            "object.game_property_new", None,
-            {'type': 'BOOL', 'name': 'visible_tag'}
-        )
-        blender_object.game.properties["visible_tag"].value = self["visible"]
-        BPY_OPS_CALL(
-            "object.game_property_new", None,
-            {'type': 'BOOL', 'name': 'click_through'}
-        )
-        blender_object.game.properties[
-            "click_through"].value = self["click_through"]
-
         blender_object.game.physics_type = 'DYNAMIC'
         blender_object.game.use_ghost = True
 
-        if (
-                bpy.data.lamps[-1] is not None and not
-                bpy.data.lamps[-1].name.startswith("light_object_")):
-            blender_lamp = bpy.data.lamps[-1]
+        if blender_object.type == "LAMP":
+            blender_lamp = blender_object.data
             blender_lamp.name = generate_light_object_name(self["name"])
             self.apply_lamp_color(blender_lamp)
 
@@ -1163,43 +1165,54 @@ class W3DObject(W3DFeature):
         particle_copy.name = particle_name
         particle_copy.hide_render = False
         particle_copy.color[3] = 1
-        bpy.data.objects[particle_name].layers = [
-            layer == 5 for layer in range(20)
-        ]
-        bpy.data.objects[particle_name].game.physics_type = 'DYNAMIC'
+        particle_copy.layers = [layer == 5 for layer in range(20)]
+        particle_copy.game.physics_type = 'DYNAMIC'
+
+        return blender_object
+
+    def plan_logic(self, scene_plan):
+        """Add game properties and logic for W3DObject to scene plan
+
+        The Blender object must be created by blend(), but this method itself
+        does not require Blender.
+
+        :param ScenePlan scene_plan: The plan to which logic is added"""
+        object_name = generate_blender_object_name(self["name"])
+        # Particle copies share the properties and content logic of the
+        # object, but not its link or sound
+        object_names = [
+            object_name, generate_blender_particle_name(object_name)]
+        for name in object_names:
+            scene_plan.add_property(
+                name, "visible_tag", "BOOL", self["visible"])
+            scene_plan.add_property(
+                name, "click_through", "BOOL", self["click_through"])
+
+        self["content"].plan_logic(scene_plan, object_names)
 
         if self["link"] is not None:
-            self["link"].blend(generate_blender_object_name(self["name"]))
+            self["link"].plan_logic(
+                scene_plan, object_name, object_color=self["color"],
+                object_visible=self["visible"])
 
         if self["sound"] is not None:
             sound_name = generate_blender_sound_name(self["sound"])
             sound_actuator_name = generate_blender_sound_name(self["name"])
-            BPY_OPS_CALL(
-                "logic.actuator_add", None,
-                {
-                    'type': 'SOUND',
-                    'object': blender_object.name,
-                    'name': sound_actuator_name
-                }
-            )
             try:
-                actuator = blender_object.game.actuators[sound_actuator_name]
-                central_actuator = audio_playback_object().game.actuators[
-                    sound_name]
+                central_actuator = scene_plan.get_brick(
+                    BrickRef("AUDIO", "actuator", sound_name))
             except KeyError:
                 LOGGER.warn(
                     "Sound {} not found for object {}".format(
                         self["sound"], self["name"]
                     )
                 )
-                return blender_object
-            actuator.sound = central_actuator.sound
-            actuator.use_sound_3d = central_actuator.use_sound_3d
-            actuator.mode = central_actuator.mode
-            actuator.pitch = central_actuator.pitch
-            actuator.volume = central_actuator.volume
-
-        return blender_object
+                return scene_plan.add_actuator(
+                    object_name, sound_actuator_name, "SOUND")
+            return scene_plan.add_actuator(
+                object_name, sound_actuator_name, "SOUND",
+                **dict(central_actuator.settings))
+        return None
 
     def write_blender_logic(self):
         """Write Python logic for this object to associated script"""
@@ -1344,51 +1357,30 @@ def activate_particles(cont):
 
     def blend(self):
         """Create representation of W3DPSys in Blender"""
-        psys_name = "psys0"
-        psys_index = 0
-        psys_module = "{}.py".format(psys_name)
-        while psys_module in bpy.data.texts:
-            psys_name = "psys{}".format(psys_index)
-            psys_module = "{}.py".format(psys_name)
-            psys_index += 1
-
-        bpy.data.texts.new(psys_module)
-        script = bpy.data.texts[psys_module]
-
-        psys_object = bpy.data.objects.new(psys_name, None)
+        psys_object = bpy.data.objects.new("psys", None)
         bpy.context.scene.objects.link(psys_object)
+        return psys_object
 
-        bpy.context.scene.objects.active = psys_object
-
-        BPY_OPS_CALL(
-            "logic.sensor_add", None,
-            {
-                'type': 'PROPERTY', 'object': psys_object.name,
-                'name': 'visible_sensor'
-            }
-        )
-        psys_object.game.sensors[-1].name = "visible_sensor"
-        visible_sensor = psys_object.game.sensors["visible_sensor"]
-        visible_sensor.property = "visible_tag"
-        visible_sensor.value = "True"
-        visible_sensor.use_pulse_true_level = True
-
-        bpy.context.scene.objects.active = psys_object
-        BPY_OPS_CALL(
-            "logic.controller_add", None,
-            {
-                'type': 'PYTHON', 'object': psys_object.name,
-                'name': 'activate_particles'
-            }
-        )
-        psys_object.game.controllers[-1].name = "activate_particles"
-        controller = psys_object.game.controllers["activate_particles"]
-        controller.mode = "MODULE"
-        controller.module = "{}.activate_particles".format(psys_name)
-        controller.link(visible_sensor)
-
-        script.write(self.generate_logic())
-
-        LOGGER.debug("Particle system created")
+    def plan_logic(self, scene_plan, object_names):
+        """Add particle system logic to scene plan"""
+        psys_index = 0
+        psys_name = "psys0"
+        while "{}.py".format(psys_name) in scene_plan.texts:
+            psys_index += 1
+            psys_name = "psys{}".format(psys_index)
 
-        return psys_object
+        scene_plan.write_text("{}.py".format(psys_name), self.generate_logic())
+        for object_name in object_names:
+            visible_sensor = scene_plan.add_sensor(
+                object_name, "visible_sensor", "PROPERTY",
+                property="visible_tag", value="True",
+                use_pulse_true_level=True)
+            controller = scene_plan.add_controller(
+                object_name, "activate_particles", "PYTHON",
+                mode="MODULE",
+                module="{}.activate_particles".format(psys_name))
+            scene_plan.link(controller, sensor=visible_sensor)
+
+        LOGGER.debug("Particle system planned")
+
+        return psys_name
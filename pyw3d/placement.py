@@ -24,6 +24,7 @@ from .validators import OptionValidator, ListValidator, IsNumeric, \
 from .errors import BadW3DXML, ConsistencyError
 from .xml_tools import text2tuple
 from .names import generate_relative_to_name
+from .export_context import get_export_context
 import logging
 LOGGER = logging.getLogger("pyw3d")
 try:
@@ -194,13 +195,6 @@ class W3DPlacement(W3DFeature):
         "relative_to": "Center",
         "position": (0, 0, 0),
     }
-    relative_to_objects = {}
-    """Dictionary mapping names of relative_to options to Blender
-    representations
-
-    In default W3DWriting, these are simply the four walls, but this can be
-    overridden to provide additional functionality"""
-
     def __init__(self, *args, **kwargs):
         super(W3DPlacement, self).__init__(*args, **kwargs)
         if "rotation" not in self:
@@ -251,8 +245,15 @@ class W3DPlacement(W3DFeature):
                 "RightWall": (0, 0, -math.pi / 2),
                 "FloorWall": (-math.pi / 2, 0, 0)}):
         """Create Blender objects corresponding to relative_to options if
-        necessary"""
-        if len(place_class.relative_to_objects) < len(
+        necessary
+
+        :return: Dictionary mapping names of relative_to options to Blender
+            representations, kept in the active
+            :class:`pyw3d.export_context.ExportContext`. In default
+            W3DWriting, these are simply the four walls, but this can be
+            overridden to provide additional functionality."""
+        relative_to_objects = get_export_context().relative_to_objects
+        if len(relative_to_objects) < len(
                 place_class.argument_validators[
                     "relative_to"].valid_options) - 1:
             for wall_name, position in wall_positions.items():
@@ -263,22 +264,21 @@ class W3DPlacement(W3DFeature):
                         rotation=wall_rotations[wall_name],
                         layers=[layer == 3 for layer in range(1, 21)]
                     )
-                    place_class.relative_to_objects[
-                        wall_name] = bpy.context.object
-                    place_class.relative_to_objects[
+                    relative_to_objects[wall_name] = bpy.context.object
+                    relative_to_objects[
                         wall_name].name = generate_relative_to_name(wall_name)
 
-            for name, obj in place_class.relative_to_objects.items():
+            for name, obj in relative_to_objects.items():
                 if name != "Center":
-                    obj.parent = place_class.relative_to_objects["Center"]
+                    obj.parent = relative_to_objects["Center"]
 
-        return place_class.relative_to_objects
+        return relative_to_objects
 
     def place(self, blender_object):
         """Place Blender object in specified position and orientation
         """
-        self._create_relative_to_objects()
-        relative_object = self.relative_to_objects[self["relative_to"]]
+        relative_object = self._create_relative_to_objects()[
+            self["relative_to"]]
 
         position = self["position"]
         position = [
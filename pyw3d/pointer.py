@@ -18,81 +18,44 @@
 
 """Handle pointer interface (mouse, wand, etc.) for project"""
 
-import logging
 from .blender_scripts import MOUSE_LOOK_SCRIPT
-LOGGER = logging.getLogger("pyw3d")
-try:
-    import bpy
-except ImportError:
-    LOGGER.info(
-        "Module bpy not found. Loading pyw3d.pointer as standalone")
 
 
-def setup_mouselook(project):
-    bpy.context.scene.objects.active = project.main_camera
-    bpy.ops.logic.sensor_add(
-        type="MOUSE",
-        object=project.main_camera.name,
-        name="Look"
-    )
-    project.main_camera.game.sensors[-1].name = "Look"
-    sensor = project.main_camera.game.sensors["Look"]
-    sensor.mouse_event = "MOVEMENT"
-    bpy.ops.logic.controller_add(
-        type='PYTHON',
-        object=project.main_camera.name,
-        name="Look")
-    project.main_camera.game.controllers[-1].name = "Look"
-    controller = project.main_camera.game.controllers["Look"]
-    controller.mode = "MODULE"
-    controller.module = "mouse.look"
-    controller.link(sensor=sensor)
-    bpy.ops.logic.actuator_add(
-        type="MOTION",
-        object=project.main_camera.name,
-        name="Look_x"
-    )
-    project.main_camera.game.actuators[-1].name = "Look_x"
-    actuator = project.main_camera.game.actuators["Look_x"]
-    actuator.mode = "OBJECT_NORMAL"
-    actuator.use_local_rotation = True
-    controller.link(actuator=actuator)
-
-    bpy.ops.logic.actuator_add(
-        type="MOTION",
-        object=project.main_camera.name,
-        name="Look_y"
-    )
-    project.main_camera.game.actuators[-1].name = "Look_y"
-    actuator = project.main_camera.game.actuators["Look_y"]
-    actuator.mode = "OBJECT_NORMAL"
-    actuator.use_local_rotation = False
-    controller.link(actuator=actuator)
-
-    bpy.data.texts.new("mouse.py")
-    script = bpy.data.texts["mouse.py"]
-    script.write(MOUSE_LOOK_SCRIPT.format(far_clip=project['far_clip']))
+def setup_mouselook(project, scene_plan):
+    """Add logic for looking around with the mouse to the main camera
+
+    :param W3DProject project: The project being exported
+    :param ScenePlan scene_plan: The plan to which logic is added
+    """
+    sensor = scene_plan.add_sensor(
+        "CAMERA", "Look", "MOUSE", mouse_event="MOVEMENT")
+    controller = scene_plan.add_controller(
+        "CAMERA", "Look", "PYTHON", mode="MODULE", module="mouse.look")
+    scene_plan.link(controller, sensor=sensor)
+    actuator = scene_plan.add_actuator(
+        "CAMERA", "Look_x", "MOTION",
+        mode="OBJECT_NORMAL", use_local_rotation=True)
+    scene_plan.link(controller, actuator=actuator)
+    actuator = scene_plan.add_actuator(
+        "CAMERA", "Look_y", "MOTION",
+        mode="OBJECT_NORMAL", use_local_rotation=False)
+    scene_plan.link(controller, actuator=actuator)
+
+    scene_plan.write_text(
+        "mouse.py", MOUSE_LOOK_SCRIPT.format(far_clip=project['far_clip']))
 
     return sensor
 
 
-def setup_click(project):
-    bpy.ops.logic.sensor_add(
-        type="MOUSE",
-        object=project.main_camera.name,
-        name="Click"
-    )
-    project.main_camera.game.sensors[-1].name = "Click"
-    click_sensor = project.main_camera.game.sensors["Click"]
-    click_sensor.mouse_event = "LEFTCLICK"
+def setup_click(project, scene_plan):
+    """Add logic for clicking on objects to the main camera
 
-    bpy.ops.logic.controller_add(
-        type='PYTHON',
-        object=project.main_camera.name,
-        name="Click"
-    )
-    project.main_camera.game.controllers[-1].name = "Click"
-    controller = project.main_camera.game.controllers["Click"]
-    controller.mode = "MODULE"
-    controller.module = "mouse.click"
-    controller.link(sensor=click_sensor)
+    :param W3DProject project: The project being exported
+    :param ScenePlan scene_plan: The plan to which logic is added
+    """
+    click_sensor = scene_plan.add_sensor(
+        "CAMERA", "Click", "MOUSE", mouse_event="LEFTCLICK")
+    controller = scene_plan.add_controller(
+        "CAMERA", "Click", "PYTHON", mode="MODULE", module="mouse.click")
+    scene_plan.link(controller, sensor=click_sensor)
+    return click_sensor
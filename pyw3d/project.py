@@ -18,26 +18,37 @@
 """Tools for working with W3D projects
 """
 import xml.etree.ElementTree as ET
-import xml.dom.minidom as minidom
+import io
 import logging
 import math
 import os
 import sys
-from .features import W3DFeature
+from functools import partial
+from itertools import groupby
+from .features import W3DFeature, FeatureList, trusted_construction
 from .placement import W3DPlacement, W3DRotation, convert_to_blender_axes
 from .validators import ListValidator, IsNumeric, OptionValidator,\
     IsBoolean, FeatureValidator, IsInteger, DictValidator
-from .xml_tools import bool2text, text2tuple, attrib2bool, text2bool
+from .xml_tools import bool2text, text2tuple, attrib2bool, text2bool, \
+    PrettyXMLWriter
 from .objects import W3DObject
+from .tables import W3DObjectTable
 from .psys import W3DPAction
 from .sounds import W3DSound
 from .timeline import W3DTimeline
 from .groups import W3DGroup
 from .triggers import W3DTrigger
-from .errors import BadW3DXML
+from .errors import BadW3DXML, ConsistencyError
 from .blender_scripts import MOVE_TOGGLE_SCRIPT, ANGLES_SCRIPT
 from .names import generate_light_object_name
+from .export_context import ExportContext
+from .scene_plan import ScenePlan, SceneApplier
+from .incremental import ExportRecord, IncrementalUpdate, DatablockTracker, \
+    iter_geometry_features
 from .pointer import setup_mouselook, setup_click
+from .activators import setup_timeline_scheduler, setup_position_detector, \
+    setup_look_detector, BlenderPositionTrigger, BlenderLookAtTrigger
+from .timing import ExportTimer, FEATURE
 LOGGER = logging.getLogger("pyw3d")
 try:
     import bpy
@@ -65,49 +76,36 @@ def setup_blender_layout():
 
 
 def add_key_movement(
-        blender_object, move_name, key, direction, speed):
+        scene_plan, object_name, move_name, key, direction, speed):
     """Convenience function for adding keyboard-controlled motion to
     Blender object
 
-    :param blender_object: object to add motion to
+    :param ScenePlan scene_plan: The plan to which motion logic is added
+    :param str object_name: Name of object to add motion to
     :param str move_name: Name for controller
     :param str key: Key used to activate motion
     :param int direction: 0, 1, 2 for x, y, z
     :param float speed: Speed of motion"""
-    bpy.context.scene.objects.active = blender_object
-    bpy.ops.logic.sensor_add(
-        type="KEYBOARD",
-        object=blender_object.name,
-        name=move_name
-    )
-    blender_object.game.sensors[-1].name = move_name
-    sensor = blender_object.game.sensors[move_name]
-    sensor.key = key
-    bpy.ops.logic.controller_add(
-        type='LOGIC_AND',
-        object=blender_object.name,
-        name=move_name
-    )
-    blender_object.game.controllers[-1].name = move_name
-    controller = blender_object.game.controllers[move_name]
-    bpy.ops.logic.actuator_add(
-        type="MOTION",
-        object=blender_object.name,
-        name=move_name
-    )
-    blender_object.game.actuators[-1].name = move_name
-    actuator = blender_object.game.actuators[move_name]
-    actuator.mode = "OBJECT_NORMAL"
-    actuator.offset_location[direction] = speed
-    actuator.use_local_location = True
-    controller.link(actuator=actuator)
-    controller.link(sensor=sensor)
+    sensor = scene_plan.add_sensor(object_name, move_name, "KEYBOARD", key=key)
+    controller = scene_plan.add_controller(
+        object_name, move_name, "LOGIC_AND")
+    offset_location = [0, 0, 0]
+    offset_location[direction] = speed
+    actuator = scene_plan.add_actuator(
+        object_name, move_name, "MOTION",
+        mode="OBJECT_NORMAL", offset_location=offset_location,
+        use_local_location=True)
+    scene_plan.link(controller, actuator=actuator)
+    scene_plan.link(controller, sensor=sensor)
 
 
 class W3DProject(W3DFeature):
     """Represent entire project for display in W3D
 
     :param list objects: List of W3DObjects to be displayed
+    :param list object_tables: List of W3DObjectTables, each holding many
+    W3DObjects which are only created from its rows once the project is
+    exported or saved (see iter_features)
     :param list groups: Maps names of groups to lists of W3DObjects
     :param list timelines: List of W3DTimelines within project
     :param list sounds: List of W3DSounds within project
@@ -122,8 +120,13 @@ class W3DProject(W3DFeature):
     :param bool allow_rotation: Allow user to rotate withing project?
     :param bool debug: Turn on debug-level logging
     :param bool profile: Turn on performance profiling
+    :param bool schedule_timelines: Drive all timelines from a single
+    scheduler rather than from a controller per timeline
     :param dict wall_placements: Dictionary mapping names of walls to
     W3DPlacements specifying their position and orientation
+
+    :ivar list unvalidated_features: Features loaded without validation, which
+    will be checked on the next call to validate
     """
 
     # ui_order = [
@@ -137,6 +140,10 @@ class W3DProject(W3DFeature):
             FeatureValidator(W3DObject),
             help_string="A list of W3DObjects in the project"
         ),
+        "object_tables": ListValidator(
+            FeatureValidator(W3DObjectTable),
+            help_string="A list of W3DObjectTables in the project"
+        ),
         "groups": ListValidator(
             FeatureValidator(W3DGroup),
             help_string="A list of W3DObjects in the project"
@@ -173,6 +180,7 @@ class W3DProject(W3DFeature):
         "allow_rotation": IsBoolean(),
         "debug": IsBoolean(),
         "profile": IsBoolean(),
+        "schedule_timelines": IsBoolean(),
         "wall_placements": DictValidator(
             OptionValidator(
                 "Center", "FrontWall", "LeftWall", "RightWall", "FloorWall"),
@@ -187,6 +195,7 @@ class W3DProject(W3DFeature):
         "allow_rotation": True,
         "debug": False,
         "profile": False,
+        "schedule_timelines": False,
     }
 
     def __setitem__(self, key, value):
@@ -195,9 +204,18 @@ class W3DProject(W3DFeature):
                 LOGGER.setLevel(logging.DEBUG)
             else:
                 LOGGER.setLevel(logging.WARNING)
+        if key in self.feature_list_keys and type(value) is list:
+            value = FeatureList(value)
+        self._name_indices.pop(key, None)
         super().__setitem__(key, value)
 
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._name_indices = {}
+
     def __init__(self, *args, **kwargs):
+        self.unvalidated_features = []
+        self._name_indices = {}
         self.call_directory = kwargs.pop("call_directory", None)
         if self.call_directory is None:
             self.call_directory = os.path.normpath(
@@ -206,17 +224,19 @@ class W3DProject(W3DFeature):
         super(W3DProject, self).__init__(*args, **kwargs)
         os.chdir(self.call_directory)
         if "objects" not in self:
-            self["objects"] = []
+            self["objects"] = FeatureList()
+        if "object_tables" not in self:
+            self["object_tables"] = FeatureList()
         if "groups" not in self:
-            self["groups"] = []
+            self["groups"] = FeatureList()
         if "particle_actions" not in self:
-            self["particle_actions"] = []
+            self["particle_actions"] = FeatureList()
         if "timelines" not in self:
-            self["timelines"] = []
+            self["timelines"] = FeatureList()
         if "sounds" not in self:
-            self["sounds"] = []
+            self["sounds"] = FeatureList()
         if "trigger_events" not in self:
-            self["trigger_events"] = []
+            self["trigger_events"] = FeatureList()
         if "camera_placement" not in self:
             self["camera_placement"] = W3DPlacement(
                 position=convert_to_blender_axes((0, 0, 0)))
@@ -270,28 +290,47 @@ class W3DProject(W3DFeature):
                 )
             }
 
+    feature_roots = (
+        ("ObjectRoot", "Object", "objects", W3DObject),
+        ("GroupRoot", "Group", "groups", W3DGroup),
+        ("TimelineRoot", "Timeline", "timelines", W3DTimeline),
+        ("SoundRoot", "Sound", "sounds", W3DSound),
+        ("ParticleActionRoot", "ParticleActionList", "particle_actions",
+         W3DPAction),
+        ("EventRoot", "EventTrigger", "trigger_events", W3DTrigger)
+    )
+    """Tuple of (root tag, child tag, project key, feature class) for each
+    list of features stored directly beneath the Story node"""
+
+    indexed_keys = frozenset(
+        key for root_tag, child_tag, key, feature_class in feature_roots)
+    """Keys of lists of features for which an index of names is kept (see
+    get_name_index)"""
+
+    feature_list_keys = indexed_keys.union(("object_tables",))
+    """Keys of lists held by the project as FeatureLists"""
+
+    _reference_state = None
+    _reference_cache = None
+    _transient_attributes = W3DFeature._transient_attributes.union(
+        ("_name_indices", "_reference_cache"))
+
     def toXML(self):
         """Store W3DProject as W3D XML tree
         """
         project_root = ET.Element("Story", attrib={"version": "8"})
-        object_root = ET.SubElement(project_root, "ObjectRoot")
-        for object_ in self["objects"]:
-            object_.toXML(object_root)
-        group_root = ET.SubElement(project_root, "GroupRoot")
-        for group in self["groups"]:
-            group.toXML(group_root)
-        timeline_root = ET.SubElement(project_root, "TimelineRoot")
-        for timeline in self["timelines"]:
-            timeline.toXML(timeline_root)
-        sound_root = ET.SubElement(project_root, "SoundRoot")
-        for sound in self["sounds"]:
-            sound.toXML(sound_root)
-        paction_root = ET.SubElement(project_root, "ParticleActionRoot")
-        for paction in self["particle_actions"]:
-            paction.toXML(paction_root)
-        event_root = ET.SubElement(project_root, "EventRoot")
-        for trigger in self["trigger_events"]:
-            trigger.toXML(event_root)
+        for root_tag, child_tag, key, feature_class in self.feature_roots:
+            feature_root = ET.SubElement(project_root, root_tag)
+            for feature in self.iter_features(key):
+                feature.toXML(feature_root)
+        self._global_toXML(project_root)
+        return project_root
+
+    def _global_toXML(self, project_root):
+        """Store global options and wall placements within Story node
+
+        :param :py:class:xml.etree.ElementTree.Element project_root
+        """
         global_node = ET.SubElement(project_root, "Global")
         camera_node = ET.SubElement(
             global_node, "CameraPos", attrib={
@@ -314,46 +353,42 @@ class W3DProject(W3DFeature):
         debug_node.text = bool2text(self["debug"])
         profile_node = ET.SubElement(global_node, "Profile")
         profile_node.text = bool2text(self["profile"])
+        if not self.is_default("schedule_timelines"):
+            schedule_node = ET.SubElement(global_node, "ScheduleTimelines")
+            schedule_node.text = bool2text(self["schedule_timelines"])
         wall_root = ET.SubElement(project_root, "PlacementRoot")
         for wall, placement in self["wall_placements"].items():
             place_root = placement.toXML(wall_root)
             place_root.attrib["name"] = wall
-
         return project_root
 
     @classmethod
-    def fromXML(project_class, project_root, call_directory=None):
+    def fromXML(
+            project_class, project_root, call_directory=None, trusted=False):
         """Create W3DProject from Story node of W3D XML
 
         :param :py:class:xml.etree.ElementTree.Element project_root
+        :param bool trusted: If True, skip validation of values as they are
+        loaded. Loaded features are instead checked in a single batch on the
+        next call to validate.
         """
-        new_project = project_class(call_directory=call_directory)
-        object_root = project_root.find("ObjectRoot")
-        if object_root is not None:
-            for child in object_root.findall("Object"):
-                new_project["objects"].append(W3DObject.fromXML(child))
-        group_root = project_root.find("GroupRoot")
-        if group_root is not None:
-            for child in group_root.findall("Group"):
-                new_project["groups"].append(W3DGroup.fromXML(child))
-        timeline_root = project_root.find("TimelineRoot")
-        if timeline_root is not None:
-            for child in timeline_root.findall("Timeline"):
-                new_project["timelines"].append(W3DTimeline.fromXML(child))
-        sound_root = project_root.find("SoundRoot")
-        if sound_root is not None:
-            for child in sound_root.findall("Sound"):
-                new_project["sounds"].append(W3DSound.fromXML(child))
-        paction_root = project_root.find("ParticleActionRoot")
-        if paction_root is not None:
-            for child in paction_root.findall("ParticleActionList"):
-                new_project["particle_actions"].append(
-                    W3DPAction.fromXML(child))
-        trigger_root = project_root.find("EventRoot")
-        if trigger_root is not None:
-            for child in trigger_root.findall("EventTrigger"):
-                new_project["trigger_events"].append(W3DTrigger.fromXML(child))
+        with trusted_construction(trusted) as unvalidated:
+            new_project = project_class(call_directory=call_directory)
+            for root_tag, child_tag, key, feature_class in (
+                    project_class.feature_roots):
+                feature_root = project_root.find(root_tag)
+                if feature_root is not None:
+                    for child in feature_root.findall(child_tag):
+                        new_project[key].append(feature_class.fromXML(child))
+            new_project._global_fromXML(project_root)
+        new_project.unvalidated_features.extend(unvalidated)
+        return new_project
 
+    def _global_fromXML(self, project_root):
+        """Set global options and wall placements from Story node
+
+        :param :py:class:xml.etree.ElementTree.Element project_root
+        """
         global_root = project_root.find("Global")
         if global_root is None:
             raise BadW3DXML("Story root has no Global node")
@@ -362,28 +397,28 @@ class W3DProject(W3DFeature):
         if camera_node is None:
             raise BadW3DXML("Global node has no CaveCameraPos child")
         if "far-clip" in camera_node.attrib:
-            new_project["far_clip"] = float(camera_node.attrib["far-clip"])
+            self["far_clip"] = float(camera_node.attrib["far-clip"])
         place_node = camera_node.find("Placement")
         if camera_node is None:
             raise BadW3DXML("CameraPos node has no Placement child")
-        new_project["camera_placement"] = W3DPlacement.fromXML(place_node)
+        self["camera_placement"] = W3DPlacement.fromXML(place_node)
 
         camera_node = global_root.find("CameraPos")
         if camera_node is None:
             raise BadW3DXML("Global node has no CameraPos child")
         if "far-clip" in camera_node.attrib:
-            new_project["far_clip"] = float(camera_node.attrib["far-clip"])
+            self["far_clip"] = float(camera_node.attrib["far-clip"])
         place_node = camera_node.find("Placement")
         if camera_node is None:
             raise BadW3DXML("CameraPos node has no Placement child")
-        new_project["desktop_camera_placement"] = W3DPlacement.fromXML(
+        self["desktop_camera_placement"] = W3DPlacement.fromXML(
             place_node)
 
         bg_node = global_root.find("Background")
         if bg_node is None:
             raise BadW3DXML("Global node has no Background child")
         if "color" in bg_node.attrib:
-            new_project["background"] = text2tuple(
+            self["background"] = text2tuple(
                 bg_node.attrib["color"],
                 evaluator=int
             )
@@ -391,17 +426,20 @@ class W3DProject(W3DFeature):
         wand_node = global_root.find("WandNavigation")
         if wand_node is None:
             raise BadW3DXML("Global node has no WandNavigation child")
-        new_project["allow_rotation"] = attrib2bool(
+        self["allow_rotation"] = attrib2bool(
             wand_node, "allow-rotation", default=False)
-        new_project["allow_movement"] = attrib2bool(
+        self["allow_movement"] = attrib2bool(
             wand_node, "allow-movement", default=False)
 
         debug_node = global_root.find("Debug")
         if debug_node is not None:
-            new_project["debug"] = text2bool(debug_node.text)
+            self["debug"] = text2bool(debug_node.text)
         profile_node = global_root.find("Profile")
         if profile_node is not None:
-            new_project["profile"] = text2bool(profile_node.text)
+            self["profile"] = text2bool(profile_node.text)
+        schedule_node = global_root.find("ScheduleTimelines")
+        if schedule_node is not None:
+            self["schedule_timelines"] = text2bool(schedule_node.text)
 
         wall_root = project_root.find("PlacementRoot")
         for placement in wall_root.findall("Placement"):
@@ -410,34 +448,260 @@ class W3DProject(W3DFeature):
             except KeyError:
                 raise BadW3DXML(
                     "Placements within PlacementRoot must specify name")
-            new_project["wall_placements"][
+            self["wall_placements"][
                 wall_name] = W3DPlacement.fromXML(placement)
+        return self
+
+    @classmethod
+    def fromXML_iter(
+            project_class, source, call_directory=None, trusted=False):
+        """Create W3DProject from W3D XML without holding entire tree in memory
+
+        Each object, group, timeline, sound, particle action, and trigger is
+        created as soon as its closing tag is parsed, and its XML node is then
+        discarded. Peak memory use is therefore bounded by the largest single
+        feature rather than the size of the whole document. The resulting
+        project is identical to that produced by fromXML.
+
+        :param source: Filename or file object containing W3D XML
+        :param bool trusted: If True, skip validation of values as they are
+        loaded (see fromXML)
+        """
+        with trusted_construction(trusted) as unvalidated:
+            new_project = project_class._fromXML_iter(source, call_directory)
+        new_project.unvalidated_features.extend(unvalidated)
         return new_project
 
     @classmethod
-    def fromXML_file(project_class, filename):
+    def _fromXML_iter(project_class, source, call_directory):
+        new_project = project_class(call_directory=call_directory)
+        child_specs = {
+            root_tag: (child_tag, key, feature_class)
+            for root_tag, child_tag, key, feature_class in
+            project_class.feature_roots
+        }
+        # Only the first instance of each root is read, as with fromXML
+        seen_roots = set()
+        active_roots = set()
+        project_root = None
+        stack = []
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                if not stack:
+                    project_root = element
+                stack.append(element)
+                if (
+                        len(stack) == 2 and element.tag in child_specs and
+                        element.tag not in seen_roots):
+                    seen_roots.add(element.tag)
+                    active_roots.add(element)
+                continue
+            stack.pop()
+            if len(stack) == 2 and stack[1] in active_roots:
+                child_tag, key, feature_class = child_specs[stack[1].tag]
+                if element.tag == child_tag:
+                    new_project[key].append(feature_class.fromXML(element))
+                    element.clear()
+                    stack[1].remove(element)
+        new_project._global_fromXML(project_root)
+        return new_project
+
+    @classmethod
+    def fromXML_file(project_class, filename, trusted=False, cache=None):
         """Create W3DProject from XML file of given filename
 
         :param str filename: Filename of XML file for project
+        :param bool trusted: If True, skip validation of values as they are
+        loaded (see fromXML)
+        :param SnapshotCache cache: If given, load project from a binary
+        snapshot of this file when one is available, storing a new snapshot
+        otherwise
         """
         # For relative paths...
         call_directory = os.path.normpath(os.path.dirname(filename))
-        return project_class.fromXML(
-            ET.parse(filename).getroot(), call_directory)
+        if cache is None:
+            return project_class.fromXML_iter(
+                filename, call_directory, trusted=trusted)
+        return cache.load(
+            filename,
+            lambda: project_class.fromXML_iter(
+                filename, call_directory, trusted=trusted),
+            options=(project_class.__module__, project_class.__name__,
+                     trusted)
+        )
+
+    def validate(self, project=None, recursive=True):
+        """Validate all values for this project, coercing if necessary
+
+        Any features loaded without validation are first checked in a single
+        pass over unvalidated_features. Since not every such feature is
+        reachable by walking the project (e.g. the base_trigger of a
+        W3DTrigger), this batch is always performed before the usual
+        validation of the project itself.
+
+        Values that have not changed since they were last validated against
+        this project are not checked again, so repeated validation after small
+        edits only revisits the edited features.
+        """
+        if project is self:
+            self._reference_state = self._get_reference_state()
+        # The list is detached while it is checked, since it may contain this
+        # project, and restored if any of its features fails validation
+        unvalidated = self.unvalidated_features
+        self.unvalidated_features = []
+        checked = False
+        try:
+            for feature in unvalidated:
+                feature.validate(project=project, recursive=False)
+            checked = True
+            return super().validate(project=project, recursive=recursive)
+        finally:
+            if not checked:
+                self.unvalidated_features = unvalidated
+            self._reference_state = None
+
+    def get_name_index(self, path):
+        """Return dictionary mapping names to features for the list of
+        features found at given path within this project
+
+        Indices are kept until the name of some feature is set or the list is
+        modified, so that repeated lookups take constant time. Names of the
+        objects in object_tables are included in the index for "objects",
+        mapped to the table holding them.
+
+        :param list path: Path to a list of features, as used by ProjectPath
+        :return: The index, or None if no index is kept for path
+        """
+        if len(path) != 1 or path[0] not in self.indexed_keys:
+            return None
+        key = path[0]
+        features = self[key]
+        if not isinstance(features, FeatureList):
+            return None
+        generation = (
+            W3DFeature.name_generation, id(features), features.generation)
+        if key == "objects":
+            tables = self["object_tables"]
+            if not isinstance(tables, FeatureList):
+                return None
+            generation += (id(tables), tables.generation)
+        try:
+            cached_generation, name_index = self._name_indices[key]
+        except KeyError:
+            pass
+        else:
+            if cached_generation == generation:
+                return name_index
+        name_index = {}
+        for feature in features:
+            try:
+                name = feature["name"]
+            except (KeyError, ConsistencyError):
+                name = str(feature)
+            name_index.setdefault(name, feature)
+        if key == "objects":
+            for table in tables:
+                for name in table.names.tolist():
+                    name_index.setdefault(name, table)
+        self._name_indices[key] = (generation, name_index)
+        return name_index
+
+    def _get_reference_state(self):
+        """Return a summary of all names that may be referenced by other
+        features in this project
+
+        While no name has been set and no list of features has been modified,
+        the same summary object is returned, so that features validated
+        against it can recognize it by identity."""
+        generations = [W3DFeature.name_generation]
+        for key in sorted(self.feature_list_keys):
+            if isinstance(self[key], FeatureList):
+                generations.append((id(self[key]), self[key].generation))
+            else:
+                generations = None
+                break
+        if self._reference_cache is not None:
+            cached_generations, cached_state = self._reference_cache
+            if generations is not None and generations == cached_generations:
+                return cached_state
+        state = self._summarize_names()
+        if self._reference_cache is not None and state == cached_state:
+            state = cached_state
+        self._reference_cache = (generations, state)
+        return state
+
+    def _summarize_names(self):
+        """Return tuple of the names of features in each list of features of
+        this project"""
+        state = []
+        for root_tag, child_tag, key, feature_class in self.feature_roots:
+            names = []
+            for feature in self[key]:
+                try:
+                    names.append(feature["name"])
+                except (KeyError, ConsistencyError):
+                    names.append(None)
+            if key == "objects":
+                # Tables cannot be modified, so they stand for their names
+                names.extend(self["object_tables"])
+            state.append(tuple(names))
+        return tuple(state)
+
+    def iter_features(self, key):
+        """Iterate over the features in the list of features under key
+
+        For "objects", W3DObjects are also created from the rows of each table
+        in object_tables, one at a time, after the objects in the list.
+
+        :param str key: Key of a list of features, e.g. "objects"
+        """
+        yield from self[key]
+        if key == "objects":
+            for table in self["object_tables"]:
+                yield from table
+
+    def write_prettyxml(self, file_):
+        """Write W3DProject as indented W3D XML to an open file
+
+        Each feature is converted to XML and written out in turn, so the
+        complete XML tree for the project is never held in memory.
+
+        :param file_: Writable text file object
+        """
+        writer = PrettyXMLWriter(file_)
+        writer.write_declaration()
+        project_root = ET.Element("Story", attrib={"version": "8"})
+        writer.start(project_root)
+        for root_tag, child_tag, key, feature_class in self.feature_roots:
+            feature_root = ET.Element(root_tag)
+            opened = False
+            for feature in self.iter_features(key):
+                feature.toXML(feature_root)
+                if len(feature_root) and not opened:
+                    writer.start(feature_root, 1)
+                    opened = True
+                for child in feature_root:
+                    writer.write_element(child, 2)
+                feature_root.clear()
+            if opened:
+                writer.end(feature_root, 1)
+            else:
+                writer.write_element(feature_root, 1)
+        global_root = self._global_toXML(ET.Element("Story"))
+        for child in global_root:
+            writer.write_element(child, 1)
+        writer.end(project_root)
+        writer.close()
+        return file_
 
     def toprettyxml(self):
-        tree = self.toXML()
-        xml_string = ET.tostring(tree, encoding="unicode")
-        xml_string = minidom.parseString(xml_string).toprettyxml()
-        # WARNING: Need to make sure that this doesn't miss up paragraphs of
-        # text
-        xml_string = "\n".join(
-            [line for line in xml_string.split("\n") if line.strip()])
-        return xml_string
+        xml_file = io.StringIO()
+        self.write_prettyxml(xml_file)
+        return xml_file.getvalue()
 
     def save_XML(self, filename):
         with open(filename, "w") as file_:
-            file_.write(self.toprettyxml())
+            self.write_prettyxml(file_)
 
     def sort_groups(self):
         """Sort groups such that no group contains a later group"""
@@ -451,22 +715,20 @@ class W3DProject(W3DFeature):
                     break
             if cur_len == len(new_groups):
                 new_groups.append(group)
-        self["groups"] = new_groups
+        self["groups"].extend(new_groups)
 
-    def setup_controls(self):
-        self.add_move_toggle()
+    def setup_controls(self, scene_plan):
+        self.add_move_toggle(scene_plan)
 
-        add_key_movement(self.main_camera, "Forward", "W", 2, -0.15)
-        add_key_movement(self.main_camera, "Backward", "S", 2, 0.15)
-        add_key_movement(self.main_camera, "Left", "A", 0, -0.15)
-        add_key_movement(self.main_camera, "Right", "D", 0, 0.15)
+        add_key_movement(scene_plan, "CAMERA", "Forward", "W", 2, -0.15)
+        add_key_movement(scene_plan, "CAMERA", "Backward", "S", 2, 0.15)
+        add_key_movement(scene_plan, "CAMERA", "Left", "A", 0, -0.15)
+        add_key_movement(scene_plan, "CAMERA", "Right", "D", 0, 0.15)
 
-    def setup_scripts(self):
+    def setup_scripts(self, scene_plan):
         """Load pre-written scripts into blend"""
-        bpy.data.texts.new("angles.py")
-        script = bpy.data.texts["angles.py"]
-        script.write(ANGLES_SCRIPT)
-        return script
+        scene_plan.write_text("angles.py", ANGLES_SCRIPT)
+        return "angles.py"
 
     def setup_camera(self):
         bpy.ops.object.camera_add(rotation=(math.pi / 2, 0, 0))
@@ -485,14 +747,9 @@ class W3DProject(W3DFeature):
         vr_center.name = "VRCENTER"
         self.main_camera.parent = vr_center
         bpy.data.scenes['Scene'].camera = self.main_camera
-        bpy.data.scenes['Scene'].game_settings.resolution_x = 800
-        bpy.data.scenes['Scene'].game_settings.resolution_y = 600
-        bpy.data.scenes['Scene'].game_settings.frame_type = "EXTEND"
 
-    def setup_settings(self):
+    def setup_settings(self, scene_plan):
         """Put any global settings in w3d_settings.py"""
-        bpy.data.texts.new("w3d_settings.py")
-        settings_script = bpy.data.texts["w3d_settings.py"]
         script_text = [
             "import logging",
             "W3D_DEBUG = {}".format(self["debug"]),
@@ -504,41 +761,203 @@ class W3DProject(W3DFeature):
             "        format='%(asctime)-15s %(levelname)8s %(name)s "
             "%(message)s')",
         ]
-        settings_script.write("\n".join(script_text))
-
-    def add_move_toggle(self):
-        bpy.context.scene.objects.active = self.main_camera
-        bpy.ops.logic.controller_add(
-            type='PYTHON',
-            object=self.main_camera.name,
-            name="move_toggle")
-        self.main_camera.game.controllers[-1].name = "move_toggle"
-        controller = self.main_camera.game.controllers["move_toggle"]
-        controller.mode = "MODULE"
-        controller.module = "move.move_toggle"
-
-        bpy.ops.object.game_property_new(
-            type="BOOL",
-            name="toggle_movement"
-        )
-        self.main_camera.game.properties["toggle_movement"].value = False
-        bpy.ops.logic.sensor_add(
-            type="KEYBOARD",
-            object=self.main_camera.name,
-            name="toggle_movement"
-        )
-        self.main_camera.game.sensors[-1].name = "toggle_movement"
-        sensor = self.main_camera.game.sensors["toggle_movement"]
-        sensor.key = "TAB"
-
-        bpy.data.texts.new("move.py")
-        script = bpy.data.texts["move.py"]
-        script.write(MOVE_TOGGLE_SCRIPT)
-
-        controller.link(sensor=sensor)
-
-    def blend(self):
-        """Create representation of W3DProject in Blender"""
+        scene_plan.write_text("w3d_settings.py", "\n".join(script_text))
+
+    def add_move_toggle(self, scene_plan):
+        controller = scene_plan.add_controller(
+            "CAMERA", "move_toggle", "PYTHON",
+            mode="MODULE", module="move.move_toggle")
+        scene_plan.add_property("CAMERA", "toggle_movement", "BOOL", False)
+        sensor = scene_plan.add_sensor(
+            "CAMERA", "toggle_movement", "KEYBOARD", key="TAB")
+
+        scene_plan.write_text("move.py", MOVE_TOGGLE_SCRIPT)
+
+        scene_plan.link(controller, sensor=sensor)
+
+    def _planned(self, scene_plan, key, timer, features=None):
+        """Iterate over features under key, attributing entries added to
+        scene_plan and time spent during each iteration to that feature
+
+        :param features: Features to iterate over instead of all features
+            under key"""
+        if features is None:
+            features = self.iter_features(key)
+        for feature in features:
+            source = "{}/{}".format(key, feature["name"])
+            with scene_plan.planning(source), timer.span(source, FEATURE):
+                yield feature
+
+    def plan_scene(self, timer=None):
+        """Return a ScenePlan of the game logic, scripts, and settings for
+        this project
+
+        This does not require Blender. Each entry in the plan records the
+        feature that planned it, e.g. "timelines/intro" or "project" for
+        entries common to all projects.
+
+        :param ExportTimer timer: If given, record time spent in each phase
+            of planning and on each feature
+        """
+        if timer is None:
+            timer = ExportTimer()
+        scene_plan = ScenePlan()
+        with timer.span("plan"):
+            self._plan_scene(scene_plan, timer)
+        return scene_plan
+
+    def _plan_scene(self, scene_plan, timer):
+        with scene_plan.planning("project"), timer.span("plan/settings"):
+            scene_plan.set_scene(**{
+                "game_settings.physics_gravity": 0,
+                "game_settings.material_mode": "GLSL",
+                "layers": [layer in (1, 3, 20) for layer in range(1, 21)],
+                "game_settings.resolution_x": 800,
+                "game_settings.resolution_y": 600,
+                "game_settings.frame_type": "EXTEND"
+            })
+            scene_plan.set_world(horizon_color=[
+                value / 255.0 for value in self["background"]
+            ])
+            # scene_plan.set_world(ambient_color=[
+            #     value / 255.0 for value in self["background"]
+            # ])
+            self.setup_settings(scene_plan)
+        with scene_plan.planning("project"), timer.span("plan/controls"):
+            self.setup_controls(scene_plan)
+            self.setup_scripts(scene_plan)
+            setup_mouselook(self, scene_plan)
+            setup_click(self, scene_plan)
+            if self["schedule_timelines"]:
+                setup_timeline_scheduler(scene_plan)
+            # Script for assigning group names
+            scene_plan.write_text("group_defs.py", "")
+
+        # Assets
+        with timer.span("plan/sounds"):
+            for sound in self._planned(scene_plan, "sounds", timer):
+                sound.plan_logic(scene_plan)
+
+        # Objects
+        with timer.span("plan/groups"):
+            self.sort_groups()
+            for group in self._planned(scene_plan, "groups", timer):
+                group.plan_objects(scene_plan)
+            for group in self._planned(scene_plan, "groups", timer):
+                group.plan_groups(scene_plan)
+        # Objects created from rows of tables are kept only if they have a
+        # link, which must be the same through later passes
+        linked_objects = []
+        with timer.span("plan/objects"):
+            for object_ in self._planned(scene_plan, "objects", timer):
+                object_.plan_logic(scene_plan)
+                if object_["link"] is not None:
+                    linked_objects.append(object_)
+
+        # Particle action logic
+        with timer.span("plan/particle_actions"):
+            for paction in self._planned(
+                    scene_plan, "particle_actions", timer):
+                paction.plan_logic(scene_plan)
+
+        # Activators
+        with timer.span("plan/activators"):
+            for timeline in self._planned(scene_plan, "timelines", timer):
+                timeline.plan_logic(
+                    scene_plan, scheduled=self["schedule_timelines"])
+            for trigger in self._planned(
+                    scene_plan, "trigger_events", timer):
+                trigger.plan_logic(scene_plan)
+            position_triggers = [
+                trigger.activator for trigger in self["trigger_events"]
+                if isinstance(trigger.activator, BlenderPositionTrigger)]
+            if position_triggers:
+                with scene_plan.planning("project"):
+                    setup_position_detector(scene_plan, position_triggers)
+            look_triggers = [
+                trigger.activator for trigger in self["trigger_events"]
+                if isinstance(trigger.activator, BlenderLookAtTrigger)]
+            if look_triggers:
+                with scene_plan.planning("project"):
+                    setup_look_detector(scene_plan, look_triggers)
+        # Write any necessary game engine logic for Activators
+        with timer.span("plan/logic"):
+            for timeline in self._planned(scene_plan, "timelines", timer):
+                timeline.write_blender_logic()
+            for object_ in self._planned(
+                    scene_plan, "objects", timer, linked_objects):
+                object_["link"].write_blender_logic()
+            for trigger in self._planned(
+                    scene_plan, "trigger_events", timer):
+                trigger.write_blender_logic()
+        # Link game engine logic bricks for Activators
+        with timer.span("plan/links"):
+            for timeline in self._planned(scene_plan, "timelines", timer):
+                timeline.link_blender_logic()
+            for object_ in self._planned(
+                    scene_plan, "objects", timer, linked_objects):
+                object_["link"].link_blender_logic()
+            for trigger in self._planned(
+                    scene_plan, "trigger_events", timer):
+                trigger.link_blender_logic()
+
+    def blend_geometry(self, tracker=None, timer=None):
+        """Create the Blender objects of this project that are not created
+        from its ScenePlan: meshes, text, lamps, sounds, and the camera
+
+        :param DatablockTracker tracker: If given, record the datablocks
+            created by each sound and object
+        :param ExportTimer timer: If given, record time spent creating the
+            camera and each feature
+        """
+        if timer is None:
+            timer = ExportTimer()
+        with timer.span("camera"):
+            # TODO: Handle non-standard wall placements
+            W3DPlacement._create_relative_to_objects()
+            self.setup_camera()
+        # Create assets, then objects
+        self.blend_features(
+            iter_geometry_features(self), tracker=tracker, timer=timer)
+
+    def blend_features(self, features, tracker=None, timer=None):
+        """Create Blender representation of each given feature
+
+        :param features: Iterable of (source, feature) pairs
+        :param DatablockTracker tracker: If given, record the datablocks
+            created by each feature under its source
+        :param ExportTimer timer: If given, record time spent on each
+            feature, under a phase named after the key of its source (e.g.
+            "objects")
+        """
+        if timer is None:
+            timer = ExportTimer()
+        for key, key_features in groupby(
+                features, lambda item: item[0].split("/", 1)[0]):
+            with timer.span(key):
+                for source, feature in key_features:
+                    with timer.span(source, FEATURE):
+                        if tracker is None:
+                            feature.blend()
+                        else:
+                            with tracker.tracking(source):
+                                feature.blend()
+        with timer.span("scene_update"):
+            bpy.context.scene.update()
+
+    def blend(self, export_context=None, incremental=False):
+        """Create representation of W3DProject in Blender
+
+        :param ExportContext export_context: Context holding the caches used
+            during this export, e.g. to inspect its statistics afterwards. If
+            None, a new context is used. Its caches are emptied once the
+            export is complete.
+        :param bool incremental: If True, update the open .blend file, which
+            should hold an earlier incremental export of this project, by
+            rebuilding only the features that changed since then (see
+            :mod:`pyw3d.incremental`). If it holds no usable record of an
+            earlier export, it is replaced by a full export.
+        """
         # if self["debug"]:
         #     LOGGER.debug("Validating project")
         #     self.validate(project=self)
@@ -546,73 +965,57 @@ class W3DProject(W3DFeature):
         if self["profile"]:
             import cProfile
             cProfile.runctx(
-                'self._blend()', {}, {"self": self}, "profile.out"
+                'self._blend(export_context, incremental)', {},
+                {
+                    "self": self, "export_context": export_context,
+                    "incremental": incremental
+                },
+                "profile.out"
             )
         else:
-            self._blend()
-
-    def _blend(self):
-        clear_blender_scene()
-        bpy.data.scenes["Scene"].game_settings.physics_gravity = 0
-        bpy.data.scenes["Scene"].game_settings.material_mode = "GLSL"
-        bpy.data.scenes["Scene"].layers = [
-            layer in (1, 3, 20) for layer in range(1, 21)]
-        # TODO: Handle non-standard wall placements
-        W3DPlacement._create_relative_to_objects()
-        self.setup_settings()
-        self.setup_camera()
-        self.setup_controls()
-        self.setup_scripts()
-        setup_mouselook(self)
-        setup_click(self)
-        self.sort_groups()
-        bpy.data.texts.new("group_defs.py")  # Script for assigning group names
-        bpy.data.worlds["World"].horizon_color = [
-            value / 255.0 for value in self["background"]
-        ]
-        # bpy.data.worlds["World"].ambient_color = [
-        #     value / 255.0 for value in self["background"]
-        # ]
-
-        # Create assets
-        for sound in self["sounds"]:
-            sound.blend()
-
-        # Create Objects
-        for group in self["groups"]:
-            group.blend_objects()
-        for group in self["groups"]:
-            group.blend_groups()
-        for object_ in self["objects"]:
-            object_.blend()
-        bpy.context.scene.update()
-
-        # Create particle action logic
-        for paction in self["particle_actions"]:
-            paction.blend()
-
-        # Create Activators
-        for timeline in self["timelines"]:
-            timeline.blend()
-        for trigger in self["trigger_events"]:
-            trigger.blend()
-        # Write any necessary game engine logic for Activators
-        for timeline in self["timelines"]:
-            timeline.write_blender_logic()
-        for object_ in self["objects"]:
-            if object_["link"] is not None:
-                object_["link"].write_blender_logic()
-        for trigger in self["trigger_events"]:
-            trigger.write_blender_logic()
-        # Link game engine logic bricks for Activators
-        for timeline in self["timelines"]:
-            timeline.link_blender_logic()
-        for object_ in self["objects"]:
-            if object_["link"] is not None:
-                object_["link"].link_blender_logic()
-        for trigger in self["trigger_events"]:
-            trigger.link_blender_logic()
-
-        bpy.context.scene.update()
-        setup_blender_layout()
-        bpy.ops.file.pack_all()
+            self._blend(
+                export_context=export_context, incremental=incremental)
+
+    def _blend(self, export_context=None, incremental=False):
+        if export_context is None:
+            export_context = ExportContext()
+        timer = export_context.timer
+        with export_context, timer.span("blend"):
+            scene_plan = self.plan_scene(timer=timer)
+            applier = SceneApplier(scene_plan, timer=timer)
+            record = None
+            update = None
+            if incremental:
+                with timer.span("incremental_check"):
+                    record = ExportRecord.from_project(self, scene_plan)
+                    update = IncrementalUpdate.from_blend(
+                        self, scene_plan, record)
+            if update is not None:
+                with timer.span("incremental_update"):
+                    tracker = update.apply(
+                        applier, export_context,
+                        partial(self.blend_features, timer=timer))
+            else:
+                tracker = None
+                with timer.span("clear"):
+                    if incremental:
+                        # Start from an empty file, as a new Blender would
+                        bpy.ops.wm.read_homefile()
+                        tracker = DatablockTracker()
+                    clear_blender_scene()
+                # Scene layers determine the layers of newly linked objects,
+                # so scene settings are applied before any objects are created
+                applier.apply_scene_settings()
+                self.blend_geometry(tracker=tracker, timer=timer)
+                applier.apply_objects()
+
+            with timer.span("scene_update"):
+                bpy.context.scene.update()
+            setup_blender_layout()
+            with timer.span("pack_all"):
+                bpy.ops.file.pack_all()
+            if record is not None:
+                with timer.span("save_record"):
+                    record.datablocks = tracker.datablocks
+                    record.save()
+        LOGGER.info(timer.format_summary())
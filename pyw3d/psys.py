@@ -26,11 +26,6 @@ from .validators import ValidPyString, IsNumeric,\
     IsInteger, FeatureValidator, OptionValidator, ListValidator
 from .errors import BadW3DXML
 LOGGER = logging.getLogger("pyw3d")
-try:
-    import bpy
-except ImportError:
-    LOGGER.info(
-        "Module bpy not found. Loading pyw3d.psys as standalone")
 
 
 class W3DPDomain(W3DFeature):
@@ -375,12 +370,10 @@ def get_velocity_vector():
             velocity_domain_logic=self["velocity_domain"].generate_logic()
         )
 
-    def blend(self):
-        """Create representation of W3DPSys in Blender"""
+    def plan_logic(self, scene_plan):
+        """Add script for this W3DPAction to scene plan"""
         paction_name = generate_paction_name(self["name"])
         paction_module = "{}.py".format(paction_name)
-        bpy.data.texts.new(paction_module)
-        script = bpy.data.texts[paction_module]
-        script.write(self.generate_logic())
+        scene_plan.write_text(paction_module, self.generate_logic())
 
-        return script
+        return paction_module
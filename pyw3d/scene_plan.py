@@ -0,0 +1,517 @@
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""Plain-data description of the game logic of a project in Blender
+
+Exporting a project to Blender happens in two stages. First, each feature
+creates its geometry (meshes, text curves, lamps, etc.) directly in Blender.
+Everything else (scene settings, empties, game properties, logic bricks and
+the links between them, and Python scripts stored as text blocks) is decided
+in pure Python and recorded in a ScenePlan, which a SceneApplier then creates
+in Blender. Since planning does not require Blender, plans can be built,
+compared and timed anywhere.
+
+Every entry in a plan records the source feature that planned it (see
+:meth:`ScenePlan.planning`).
+"""
+import logging
+from collections import Counter, namedtuple, OrderedDict
+from contextlib import contextmanager
+from .timing import ExportTimer
+LOGGER = logging.getLogger("pyw3d")
+try:
+    import bpy
+    from _bpy import ops as ops_module
+    BPY_OPS_CALL = ops_module.call
+except ImportError:
+    LOGGER.debug(
+        "Module bpy not found. Scene plans cannot be applied")
+
+ObjectRef = namedtuple("ObjectRef", ("name",))
+ObjectRef.__doc__ = """Setting value referring to a Blender object by name"""
+SoundFileRef = namedtuple("SoundFileRef", ("filename",))
+SoundFileRef.__doc__ = """Setting value referring to the Blender sound loaded
+from the given file"""
+BrickRef = namedtuple("BrickRef", ("object", "kind", "name"))
+BrickRef.__doc__ = """Reference to a logic brick, where kind is one of
+"sensor", "controller" or "actuator\""""
+
+EmptySpec = namedtuple("EmptySpec", ("name", "settings", "source"))
+PropertySpec = namedtuple(
+    "PropertySpec", ("object", "name", "type", "value", "source"))
+BrickSpec = namedtuple(
+    "BrickSpec", ("object", "kind", "name", "type", "settings", "source"))
+LinkSpec = namedtuple("LinkSpec", ("controller", "brick", "source"))
+
+BRICK_KINDS = ("sensor", "controller", "actuator")
+
+
+def freeze_settings(settings):
+    """Return settings as a sorted tuple of (attribute, value) pairs
+
+    Attributes may be dotted paths (e.g. "game.use_ghost"). List values are
+    converted to tuples, so that plans can be hashed and compared."""
+    return tuple(sorted(
+        (key, tuple(value) if isinstance(value, list) else value)
+        for key, value in settings.items()
+    ))
+
+
+class ScenePlan(object):
+    """Record of the Blender data to be created for a project
+
+    :ivar OrderedDict scene_settings: Settings of the Blender scene
+    :ivar OrderedDict world_settings: Settings of the Blender world
+    :ivar OrderedDict empties: EmptySpecs by object name
+    :ivar OrderedDict object_settings: Settings of objects created during
+        the geometry stage of the export, by object name
+    :ivar list properties: PropertySpecs in order of creation
+    :ivar list bricks: BrickSpecs in order of creation
+    :ivar list links: LinkSpecs in order of creation
+    :ivar OrderedDict texts: Contents of each text block by name
+    """
+
+    def __init__(self):
+        self.scene_settings = OrderedDict()
+        self.world_settings = OrderedDict()
+        self.empties = OrderedDict()
+        self.object_settings = OrderedDict()
+        self.properties = []
+        self.bricks = []
+        self.links = []
+        self.texts = OrderedDict()
+        self.text_sources = OrderedDict()
+        self.setting_sources = OrderedDict()
+        self._brick_index = {}
+        self._link_set = set()
+        self.source = None
+
+    @contextmanager
+    def planning(self, source):
+        """Attribute all entries added within this context to source
+
+        :param str source: Label of the feature being planned, e.g.
+            "timelines/intro"
+        """
+        previous_source = self.source
+        self.source = source
+        try:
+            yield self
+        finally:
+            self.source = previous_source
+
+    def set_scene(self, **settings):
+        """Set attributes of the Blender scene (dotted paths allowed)"""
+        self.scene_settings.update(settings)
+
+    def set_world(self, **settings):
+        """Set attributes of the Blender world"""
+        self.world_settings.update(settings)
+
+    def add_empty(self, name, **settings):
+        """Add an empty Blender object with given attributes"""
+        self.empties[name] = EmptySpec(
+            name, freeze_settings(settings), self.source)
+        return ObjectRef(name)
+
+    def set_object(self, name, **settings):
+        """Set attributes of a Blender object created during the geometry
+        stage"""
+        self.object_settings.setdefault(name, OrderedDict()).update(settings)
+        for key in settings:
+            self.setting_sources[(name, key)] = self.source
+
+    def add_property(self, object_name, name, property_type, value):
+        """Add a game property to a Blender object
+
+        :param str property_type: One of "BOOL", "INT", "FLOAT", "STRING" or
+            "TIMER"
+        """
+        spec = PropertySpec(
+            object_name, name, property_type, value, self.source)
+        self.properties.append(spec)
+        return spec
+
+    def get_properties(self, object_name):
+        """Return dictionary of game property values for given object"""
+        return {
+            spec.name: spec.value for spec in self.properties
+            if spec.object == object_name}
+
+    def _add_brick(self, kind, object_name, name, brick_type, settings):
+        spec = BrickSpec(
+            object_name, kind, name, brick_type, freeze_settings(settings),
+            self.source)
+        ref = BrickRef(object_name, kind, name)
+        self._brick_index[ref] = len(self.bricks)
+        self.bricks.append(spec)
+        return ref
+
+    def add_sensor(self, object_name, name, sensor_type, **settings):
+        """Add a sensor to a Blender object
+
+        :return: BrickRef for the new sensor
+        """
+        return self._add_brick(
+            "sensor", object_name, name, sensor_type, settings)
+
+    def add_controller(self, object_name, name, controller_type, **settings):
+        """Add a controller to a Blender object
+
+        :return: BrickRef for the new controller
+        """
+        return self._add_brick(
+            "controller", object_name, name, controller_type, settings)
+
+    def add_actuator(self, object_name, name, actuator_type, **settings):
+        """Add an actuator to a Blender object
+
+        :return: BrickRef for the new actuator
+        """
+        return self._add_brick(
+            "actuator", object_name, name, actuator_type, settings)
+
+    def get_brick(self, ref):
+        """Return BrickSpec for given BrickRef
+
+        :raises KeyError: If no such brick is planned"""
+        return self.bricks[self._brick_index[ref]]
+
+    def link(self, controller, sensor=None, actuator=None):
+        """Link controller to sensor and/or actuator
+
+        :param BrickRef controller: Controller to link
+        :param BrickRef sensor: Sensor to link
+        :param BrickRef actuator: Actuator to link
+        """
+        for brick in (sensor, actuator):
+            if brick is None or (controller, brick) in self._link_set:
+                continue
+            self._link_set.add((controller, brick))
+            self.links.append(LinkSpec(controller, brick, self.source))
+
+    def write_text(self, name, text):
+        """Append text to text block, creating it if necessary"""
+        if name not in self.texts:
+            self.texts[name] = []
+            self.text_sources[name] = self.source
+        self.texts[name].append(text)
+
+    def get_text(self, name):
+        """Return full contents of text block"""
+        return "".join(self.texts[name])
+
+    def get_sources(self):
+        """Return set of sources of all entries in plan"""
+        sources = set(self.text_sources.values())
+        sources.update(self.setting_sources.values())
+        for entries in (
+                self.empties.values(), self.properties, self.bricks,
+                self.links):
+            sources.update(entry.source for entry in entries)
+        return sources
+
+    def summary(self):
+        """Return dictionary of number of entries of each kind"""
+        summary = OrderedDict((
+            ("empties", len(self.empties)),
+            ("object_settings", sum(
+                len(settings) for settings in self.object_settings.values())),
+            ("properties", len(self.properties))))
+        for kind in BRICK_KINDS:
+            summary[kind + "s"] = sum(
+                spec.kind == kind for spec in self.bricks)
+        summary["links"] = len(self.links)
+        summary["texts"] = len(self.texts)
+        return summary
+
+
+def set_attribute(target, path, value):
+    """Set attribute given by dotted path on target"""
+    *parents, name = path.split(".")
+    for parent in parents:
+        target = getattr(target, parent)
+    setattr(target, name, value)
+
+
+class SceneApplier(object):
+    """Create the Blender data described by a ScenePlan
+
+    Blender objects referred to by the plan, other than its empties, must
+    already exist. The create and apply methods take an optional collection
+    of names, in which case only the part of the plan concerning those objects
+    (or texts) is created; this is used for incremental exports (see
+    :mod:`pyw3d.incremental`).
+
+    :param ScenePlan scene_plan: The plan to apply
+    :param ExportTimer timer: If given, record time spent creating each kind
+        of data
+
+    :ivar LogicBrickBuilder brick_builder: Builder of the logic bricks in plan
+    """
+
+    def __init__(self, scene_plan, timer=None):
+        self.scene_plan = scene_plan
+        self.timer = timer if timer is not None else ExportTimer()
+        self._objects = {}
+        self.brick_builder = LogicBrickBuilder(self)
+
+    def get_object(self, name):
+        """Return Blender object with given name
+
+        Looking up objects by name in bpy.data.objects takes time proportional
+        to the number of objects, so objects are looked up in an index of all
+        objects, which is rebuilt if a name is not found."""
+        try:
+            return self._objects[name]
+        except KeyError:
+            self._objects = {
+                blender_object.name: blender_object
+                for blender_object in bpy.data.objects}
+            return self._objects[name]
+
+    def resolve(self, value):
+        """Return Blender data for references used as setting values"""
+        if isinstance(value, ObjectRef):
+            return self.get_object(value.name)
+        if isinstance(value, SoundFileRef):
+            from .sounds import generate_blender_audio_from_file
+            return generate_blender_audio_from_file(value.filename)
+        return value
+
+    def apply_settings(self, target, settings):
+        for path, value in settings:
+            set_attribute(target, path, self.resolve(value))
+
+    def apply(self):
+        """Apply all settings and create all data in plan"""
+        self.apply_scene_settings()
+        self.apply_objects()
+
+    def apply_objects(self):
+        """Create texts, empties, and logic and apply settings of objects"""
+        for name, create in (
+                ("texts", self.create_texts),
+                ("empties", self.create_empties),
+                ("object_settings", self.apply_object_settings),
+                ("properties", self.create_properties),
+                ("bricks", self.create_bricks),
+                ("links", self.create_links)):
+            with self.timer.span("apply/" + name):
+                create()
+
+    def apply_scene_settings(self):
+        """Apply settings of scene and world"""
+        with self.timer.span("apply/scene_settings"):
+            self.apply_settings(
+                bpy.data.scenes["Scene"],
+                self.scene_plan.scene_settings.items())
+            self.apply_settings(
+                bpy.data.worlds["World"],
+                self.scene_plan.world_settings.items())
+
+    def create_texts(self, only=None):
+        for name in self.scene_plan.texts:
+            if only is not None and name not in only:
+                continue
+            text = bpy.data.texts.new(name)
+            text.write(self.scene_plan.get_text(name))
+
+    def create_empties(self, only=None):
+        for spec in self.scene_plan.empties.values():
+            if only is not None and spec.name not in only:
+                continue
+            blender_object = bpy.data.objects.new(spec.name, None)
+            bpy.context.scene.objects.link(blender_object)
+            blender_object.name = spec.name
+            self._objects[blender_object.name] = blender_object
+            self.apply_settings(blender_object, spec.settings)
+
+    def apply_object_settings(self, only=None):
+        for name, settings in self.scene_plan.object_settings.items():
+            if only is not None and name not in only:
+                continue
+            self.apply_settings(self.get_object(name), settings.items())
+
+    def create_properties(self, only=None):
+        """Create game properties in plan
+
+        Game properties can only be created by operators. Objects with the
+        same names and types of properties are therefore grouped: properties
+        are created on the first object of each group and then copied to the
+        rest of the group by a single operator. Values are then set through
+        the data API.
+        """
+        layouts = OrderedDict()
+        for spec in self.scene_plan.properties:
+            if only is not None and spec.object not in only:
+                continue
+            layouts.setdefault(spec.object, []).append(
+                (spec.name, spec.type))
+        groups = OrderedDict()
+        for name, layout in layouts.items():
+            groups.setdefault(tuple(layout), []).append(
+                self.get_object(name))
+
+        scene_objects = bpy.context.scene.objects
+        for layout, blender_objects in groups.items():
+            scene_objects.active = blender_objects[0]
+            for property_name, property_type in layout:
+                BPY_OPS_CALL(
+                    "object.game_property_new", None,
+                    {'type': property_type, 'name': property_name}
+                )
+            if len(blender_objects) > 1:
+                self.copy_properties(blender_objects[0], blender_objects[1:])
+
+        for spec in self.scene_plan.properties:
+            if only is not None and spec.object not in only:
+                continue
+            self.get_object(spec.object).game.properties[
+                spec.name].value = spec.value
+
+    def copy_properties(self, source, targets):
+        """Replace game properties of targets with those of source
+
+        The selection is restored afterwards."""
+        selected = list(bpy.context.selected_objects)
+        for blender_object in selected:
+            blender_object.select = False
+        for blender_object in targets:
+            blender_object.select = True
+        bpy.context.scene.objects.active = source
+        BPY_OPS_CALL(
+            "object.game_property_copy", None, {'operation': 'REPLACE'})
+        for blender_object in targets:
+            blender_object.select = False
+        for blender_object in selected:
+            blender_object.select = True
+
+    def create_bricks(self, only=None):
+        """Create logic bricks in plan (see :class:`LogicBrickBuilder`)"""
+        self.brick_builder.create_bricks(
+            spec for spec in self.scene_plan.bricks
+            if only is None or spec.object in only)
+
+    def get_collection(self, blender_object, kind):
+        """Return collection of logic bricks of given kind"""
+        return getattr(blender_object.game, kind + "s")
+
+    def get_brick(self, ref):
+        """Return Blender logic brick for BrickRef"""
+        return self.get_collection(
+            self.get_object(ref.object), ref.kind)[ref.name]
+
+    def create_links(self, only=None):
+        """Create links in plan
+
+        :param only: If given, only create links for which this returns True
+        """
+        get_brick = self.brick_builder.get_brick
+        for spec in self.scene_plan.links:
+            if only is not None and not only(spec):
+                continue
+            controller = get_brick(spec.controller)
+            controller.link(**{spec.brick.kind: get_brick(spec.brick)})
+        LOGGER.debug("Logic brick statistics: {}".format(
+            self.brick_builder.stats()))
+
+
+class LogicBrickBuilder(object):
+    """Create the logic bricks of many objects in one pass
+
+    Logic bricks can only be added by operators acting on the active object.
+    Bricks are therefore grouped by object, so that each object is made
+    active once, and each brick is named by the operator that adds it rather
+    than renamed afterwards. Blender keeps the names of an object's bricks
+    unique only among bricks of the same kind (sensors, controllers or
+    actuators), so a brick is only renamed if the operator had to change its
+    name because another brick of that kind already had it. Created bricks
+    are indexed by BrickRef, so that links are made without looking bricks up
+    by name.
+
+    Calls to bpy made are counted. The calls that activating, adding and
+    renaming each brick in turn and looking up both ends of each link by name
+    would have needed on top of these are also tallied, as an estimate
+    derived from the number of bricks and links rather than a measurement.
+
+    :param SceneApplier applier: Applier used to find objects and apply
+        brick settings
+
+    :ivar Counter calls: Number of calls made by type
+    :ivar Counter saved: Estimated number of calls saved by type
+    """
+
+    def __init__(self, applier):
+        self.applier = applier
+        self.bricks = {}
+        self.calls = Counter()
+        self.saved = Counter()
+
+    def create_bricks(self, specs):
+        """Create logic bricks for BrickSpecs, preserving the order of bricks
+        on each object"""
+        by_object = OrderedDict()
+        for spec in specs:
+            by_object.setdefault(spec.object, []).append(spec)
+
+        scene_objects = bpy.context.scene.objects
+        for object_name, object_specs in by_object.items():
+            blender_object = self.applier.get_object(object_name)
+            scene_objects.active = blender_object
+            self.calls["active object"] += 1
+            self.saved["active object"] += len(object_specs) - 1
+            for spec in object_specs:
+                self.bricks[BrickRef(spec.object, spec.kind, spec.name)] = \
+                    self.add_brick(blender_object, spec)
+
+    def add_brick(self, blender_object, spec):
+        """Add brick to blender_object, which must be active"""
+        BPY_OPS_CALL(
+            "logic.{}_add".format(spec.kind), None,
+            {'type': spec.type, 'object': spec.object, 'name': spec.name}
+        )
+        self.calls["operator"] += 1
+        brick = self.applier.get_collection(blender_object, spec.kind)[-1]
+        if brick.name == spec.name:
+            self.saved["rename"] += 1
+        else:
+            brick.name = spec.name
+            self.calls["rename"] += 1
+        self.applier.apply_settings(brick, spec.settings)
+        return brick
+
+    def get_brick(self, ref):
+        """Return Blender logic brick for BrickRef
+
+        Bricks not created by this builder are looked up by name."""
+        try:
+            brick = self.bricks[ref]
+        except KeyError:
+            self.calls["name lookup"] += 1
+            return self.applier.get_brick(ref)
+        self.saved["name lookup"] += 1
+        return brick
+
+    def stats(self):
+        """Return dictionary of calls made and estimated calls saved"""
+        return {
+            "calls": sum(self.calls.values()),
+            "estimated_saved": sum(self.saved.values()),
+            "calls_by_type": dict(self.calls),
+            "estimated_saved_by_type": dict(self.saved)
+        }
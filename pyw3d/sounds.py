@@ -20,6 +20,7 @@
 import logging
 LOGGER = logging.getLogger("pyw3d")
 import math
+import os
 import xml.etree.ElementTree as ET
 from functools import total_ordering
 from .features import W3DFeature
@@ -28,6 +29,8 @@ from .validators import IsNumeric, OptionValidator, ValidPyString, IsBoolean,\
 from .errors import ConsistencyError, BadW3DXML
 from .xml_tools import bool2text, text2bool
 from .names import generate_blender_sound_name
+from .export_context import get_export_context
+from .scene_plan import SoundFileRef
 try:
     import bpy
     from _bpy import ops as ops_module
@@ -36,32 +39,26 @@ except ImportError:
     pass
 
 
-def audio_playback_object():
-    """Get empty used to coordinate audio playback in Blender"""
-    try:
-        logging.debug("AUDIO object already exists")
-        return bpy.data.objects["AUDIO"]
-    except KeyError:
-        logging.debug("Creating AUDIO object")
-        audio_object = bpy.data.objects.new("AUDIO", None)
-        bpy.context.scene.objects.link(audio_object)
-        audio_object.name = "AUDIO"
-        return audio_object
-
-
 def generate_blender_audio_from_file(filename):
+    """Load sound file into Blender, reusing sounds kept in the active
+    :class:`pyw3d.export_context.ExportContext`"""
+    sounds = get_export_context().sounds
     try:
-        return generate_blender_audio_from_file._sounds[
-            filename]
-    except AttributeError:
-        generate_blender_audio_from_file._sounds = {}
+        return sounds[filename]
     except KeyError:
-        BPY_OPS_CALL(
-            "sound.open", None, {'filepath': filename}
-        )
-        generate_blender_audio_from_file._sounds[
-            filename] = bpy.data.sounds[0]
-    return generate_blender_audio_from_file(filename)
+        pass
+    # Sounds already in the file are reused when exporting incrementally
+    filepath = os.path.abspath(filename)
+    for blender_sound in bpy.data.sounds:
+        if os.path.abspath(bpy.path.abspath(
+                blender_sound.filepath)) == filepath:
+            sounds[filename] = blender_sound
+            return blender_sound
+    BPY_OPS_CALL(
+        "sound.open", None, {'filepath': filename}
+    )
+    sounds[filename] = bpy.data.sounds[0]
+    return sounds[filename]
 
 
 @total_ordering
@@ -211,29 +208,26 @@ class W3DSound(W3DFeature):
             self["filename"]
         )
         blender_sound.name = sound_name
+        return blender_sound
 
+    def plan_logic(self, scene_plan):
+        """Add actuator for W3DSound to the AUDIO object in scene plan"""
+        sound_name = generate_blender_sound_name(self["name"])
+        if "AUDIO" not in scene_plan.empties:
+            scene_plan.add_empty("AUDIO")
         LOGGER.debug("Creating actuator for {}".format(sound_name))
-        bpy.context.scene.objects.active = audio_playback_object()
-        BPY_OPS_CALL(
-            "logic.actuator_add", None,
-            {
-                'type': 'SOUND',
-                'object': "AUDIO",
-                'name': sound_name
-            }
-        )
-        actuator = audio_playback_object().game.actuators[-1]
-        actuator.name = sound_name
-        actuator.sound = blender_sound
-        actuator.use_sound_3d = (self["movement_mode"] == "Positional")
         if self["repetitions"] < 0:
-            actuator.mode = "LOOPSTOP"
+            mode = "LOOPSTOP"
         else:
-            actuator.mode = "PLAYSTOP"
+            mode = "PLAYSTOP"
         # TODO: Deal with non-infinite loops
-
-        actuator.pitch = 12 * math.log(self["frequency_scale"], 2)
-        actuator.volume = self["volume_scale"]
+        actuator = scene_plan.add_actuator(
+            "AUDIO", sound_name, "SOUND",
+            sound=SoundFileRef(self["filename"]),
+            use_sound_3d=(self["movement_mode"] == "Positional"),
+            mode=mode,
+            pitch=12 * math.log(self["frequency_scale"], 2),
+            volume=self["volume_scale"])
         if not self.is_default("pan"):
             LOGGER.info("Panning audio is not supported at this time")
-        return audio_playback_object()
+        return actuator
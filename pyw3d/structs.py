@@ -17,25 +17,42 @@
 
 """Non-feature data structures used by Writing3D
 """
-from collections import MutableSequence
+from bisect import bisect_right
+from collections.abc import MutableSequence
 
 
 class SortedList(MutableSequence):
     """A list that is guaranteed to remain sorted
 
+    Items with equal keys are kept in the order in which they were added. The
+    key for each item is computed once, when it is added, and cached.
+
     :param init_list: Initial list of elements (not necessarily sorted)
     :param sort_key: Key function for sorting"""
     def __init__(self, init_list=[], sort_key=None):
         self.sort_key = sort_key
-        self._data = init_list[:]
+        self._data = list(init_list)
+        self._keys = self._get_keys(self._data)
         self.sort()
 
+    def _get_keys(self, items):
+        """Return list of sort keys for given items"""
+        if self.sort_key is None:
+            return list(items)
+        return [self.sort_key(item) for item in items]
+
     def __setitem__(self, index, value):
-        self._data.__setitem__(index, value)
-        self.sort()
+        if isinstance(index, slice):
+            self._data[index] = value
+            self._keys = self._get_keys(self._data)
+            self.sort()
+        else:
+            del self[index]
+            self.add(value)
 
     def __delitem__(self, index):
         del self._data[index]
+        del self._keys[index]
 
     def __len__(self):
         return len(self._data)
@@ -45,29 +62,37 @@ class SortedList(MutableSequence):
 
     def insert(self, index, new_item):
         self._data.insert(index, new_item)
+        self._keys.insert(index, self._get_keys((new_item,))[0])
 
     def add(self, new_item):
         """Add new_item to list, maintaining proper ordering"""
-        for index, item in enumerate(self):
-            if self.sort_key is None:
-                if new_item < item:
-                    self._data.insert(index, new_item)
-                    return
-            else:
-                if self.sort_key(new_item) < self.sort_key(item):
-                    self._data.insert(index, new_item)
-                    return
-        self._data.insert(len(self), new_item)
+        if self.sort_key is None:
+            key = new_item
+        else:
+            key = self.sort_key(new_item)
+        index = bisect_right(self._keys, key)
+        self._data.insert(index, new_item)
+        self._keys.insert(index, key)
 
     def sort(self):
-        self._data.sort(key=self.sort_key)
+        order = sorted(range(len(self._keys)), key=self._keys.__getitem__)
+        self._data = [self._data[index] for index in order]
+        self._keys = [self._keys[index] for index in order]
 
     def append(self, value):
         self.add(value)
 
     def extend(self, value_list):
-        for value in value_list:
-            self.add(value)
+        """Add all values in value_list, sorting only once
+
+        Values with keys equal to those of existing items are placed after
+        them, in the order in which they appear in value_list."""
+        value_list = list(value_list)
+        if not value_list:
+            return
+        self._data.extend(value_list)
+        self._keys.extend(self._get_keys(value_list))
+        self.sort()
 
     def reverse(self):
         raise NotImplementedError("Cannot reverse a SortedList")
@@ -0,0 +1,310 @@
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""Columnar storage for large numbers of W3D objects
+
+A W3DObjectTable stores the properties that typically vary between objects in
+a large generated scene (names, positions, colors, scales and visibility) in
+NumPy arrays, so that they can be generated, checked and converted with
+vectorized operations. W3DObjects are created from rows of the table only when
+they are needed. A table is added to a project through its "object_tables"
+list, where it remains unexpanded until the project is exported.
+"""
+import copy
+import re
+import logging
+from collections.abc import Sequence
+from .errors import InvalidArgument
+from .features import trusted_construction
+from .objects import W3DObject, W3DContent
+from .placement import W3DPlacement, W3DRotation
+LOGGER = logging.getLogger("pyw3d")
+try:
+    import numpy
+except ImportError:
+    numpy = None
+    LOGGER.debug(
+        "Module numpy not found. W3DObjectTable will be unavailable")
+
+
+NAMES_REGEX = re.compile(r"[A-Za-z0-9_\n]*")
+
+
+def array_to_blender_axes(positions):
+    """Convert (N, 3) array from legacy axis orientation and scale to Blender
+
+    Array equivalent of :func:`pyw3d.placement.convert_to_blender_axes`"""
+    positions = numpy.asarray(positions, dtype=float)
+    return numpy.stack((
+        positions[:, 0] * 0.3048,
+        -positions[:, 2] * 0.3048,
+        positions[:, 1] * 0.3048), axis=1)
+
+
+def array_to_legacy_axes(positions):
+    """Convert (N, 3) array from Blender axis orientation and scale to legacy
+
+    Array equivalent of :func:`pyw3d.placement.convert_to_legacy_axes`"""
+    positions = numpy.asarray(positions, dtype=float)
+    return numpy.stack((
+        positions[:, 0] / 0.3048,
+        positions[:, 2] / 0.3048,
+        -positions[:, 1] / 0.3048), axis=1)
+
+
+class W3DObjectTable(Sequence):
+    """A table of W3DObjects stored as NumPy arrays
+
+    Each row of the table corresponds to one W3DObject. Indexing or iterating
+    over the table creates new W3DObjects for the requested rows. Since values
+    are validated for the whole table at once, these objects are created
+    without further validation. Each object receives its own copy of the
+    shared rotation, content and other arguments, and changes to objects
+    created in this way are not written back to the table. Once validated, the
+    arrays of the table are read-only.
+
+    :param names: Sequence of N object names
+    :param positions: (N, 3) array of positions in Blender axes (see
+        array_to_blender_axes)
+    :param contents: A single W3DContent shared by all objects or a sequence
+        of W3DContents indexed by content_indices
+    :param content_indices: Length N array of indices into contents. If
+        omitted, all objects use the first element of contents.
+    :param colors: (N, 3) array of RGB colors from 0 to 255
+    :param scales: Length N array of nonnegative scaling factors
+    :param visible: Length N array of booleans
+    :param W3DRotation rotation: Rotation shared by all objects
+    :param str relative_to: Option for relative_to shared by all objects
+    :param object_arguments: Additional W3DObject arguments shared by all
+        objects (e.g. lighting, click_through)
+    """
+
+    def __init__(
+            self, names, positions, contents, content_indices=None,
+            colors=None, scales=None, visible=None, rotation=None,
+            relative_to="Center", **object_arguments):
+        if numpy is None:
+            raise ImportError("W3DObjectTable requires numpy")
+        # Arrays and shared values are copied, since the table keeps them
+        # read-only once validated
+        self.names = numpy.array(names, dtype=str)
+        size = len(self.names)
+        self.positions = numpy.array(positions, dtype=float)
+        if isinstance(contents, W3DContent):
+            contents = [contents]
+        self.contents = tuple(copy.deepcopy(list(contents)))
+        if content_indices is None:
+            self.content_indices = numpy.zeros(size, dtype=int)
+        else:
+            self.content_indices = numpy.array(content_indices)
+        if colors is None:
+            colors = numpy.tile(
+                W3DObject.default_arguments["color"], (size, 1))
+        self.colors = numpy.array(colors)
+        if scales is None:
+            scales = numpy.full(size, W3DObject.default_arguments["scale"])
+        self.scales = numpy.array(scales, dtype=float)
+        if visible is None:
+            visible = numpy.full(
+                size, W3DObject.default_arguments["visible"], dtype=bool)
+        self.visible = numpy.array(visible, dtype=bool)
+        if rotation is None:
+            rotation = W3DRotation()
+        self.rotation = copy.deepcopy(rotation)
+        self.relative_to = relative_to
+        self.object_arguments = copy.deepcopy(object_arguments)
+        self.validate()
+        self.colors = self.colors.astype(numpy.uint8)
+        self.content_indices = self.content_indices.astype(int)
+        for column in (
+                self.names, self.positions, self.content_indices,
+                self.colors, self.scales, self.visible):
+            column.flags.writeable = False
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("W3DObjectTable index out of range")
+        rotation, content, object_arguments = copy.deepcopy((
+            self.rotation, self.contents[self.content_indices[index]],
+            self.object_arguments))
+        with trusted_construction():
+            placement = W3DPlacement(
+                position=tuple(float(x) for x in self.positions[index]),
+                relative_to=self.relative_to,
+                rotation=rotation
+            )
+            new_object = W3DObject(
+                name=str(self.names[index]),
+                placement=placement,
+                color=tuple(int(x) for x in self.colors[index]),
+                scale=float(self.scales[index]),
+                visible=bool(self.visible[index]),
+                content=content,
+                **object_arguments
+            )
+        return new_object
+
+    def _check(self, valid, description):
+        """Raise InvalidArgument if any entry of boolean array valid is False
+
+        :param valid: Boolean array with one entry per row of the table
+        :param str description: Description of the requirement that failed
+        """
+        if not numpy.all(valid):
+            row = int(numpy.flatnonzero(~valid)[0])
+            raise InvalidArgument(
+                "{} (row {}, object {})".format(
+                    description, row, self.names[row]))
+
+    def validate(self, project=None):
+        """Check all values in the table at once
+
+        The checks performed are equivalent to those made by the validators of
+        W3DObject and W3DPlacement.
+
+        :param W3DProject project: Unused, accepted so that tables can be
+            validated as part of a project"""
+        size = len(self.names)
+        if self.names.ndim != 1:
+            raise InvalidArgument("Object names must be a flat sequence")
+        joined_names = "\n".join(self.names.tolist())
+        if (
+                NAMES_REGEX.fullmatch(joined_names) is None or
+                joined_names.count("\n") != max(size - 1, 0)):
+            self._check(numpy.array([
+                bool(re.fullmatch(r"[A-Za-z0-9_]*", name))
+                for name in self.names.tolist()]),
+                "Name must contain only alphanumeric characters or"
+                " underscore")
+        for label, column, shape in (
+                ("positions", self.positions, (size, 3)),
+                ("colors", self.colors, (size, 3)),
+                ("content indices", self.content_indices, (size,)),
+                ("scales", self.scales, (size,)),
+                ("visibilities", self.visible, (size,))):
+            if column.shape != shape:
+                raise InvalidArgument(
+                    "Expected {} array of shape {} but got {}".format(
+                        label, shape, column.shape))
+        self._check(
+            numpy.all(numpy.isfinite(self.positions), axis=1),
+            "Position must be finite")
+        self._check(
+            numpy.all(
+                (self.colors >= 0) & (self.colors <= 255) &
+                (self.colors == numpy.round(self.colors)), axis=1),
+            "Color values must be integers from 0 to 255")
+        self._check(self.scales >= 0, "Scale must be >= 0")
+        self._check(
+            (self.content_indices >= 0) &
+            (self.content_indices < len(self.contents)) &
+            (self.content_indices == numpy.round(self.content_indices)),
+            "Content index must refer to an element of contents")
+        for content in self.contents:
+            if not isinstance(content, W3DContent):
+                raise InvalidArgument(
+                    "{} is not a W3DContent".format(content))
+        return True
+
+    def legacy_positions(self):
+        """Return (N, 3) array of positions in legacy axes"""
+        return array_to_legacy_axes(self.positions)
+
+    @classmethod
+    def from_legacy_positions(table_class, names, positions, *args, **kwargs):
+        """Create W3DObjectTable from positions in legacy axes, as used in
+        W3D XML
+
+        All other arguments are as for W3DObjectTable."""
+        return table_class(
+            names, array_to_blender_axes(positions), *args, **kwargs)
+
+    @classmethod
+    def from_objects(table_class, objects):
+        """Create W3DObjectTable from existing W3DObjects
+
+        Objects must share the same rotation, relative_to, and all values
+        other than those stored as columns of the table (as does every table
+        created from W3DObjectTable rows).
+
+        :param objects: Sequence of W3DObjects
+        """
+        objects = list(objects)
+        columns = ("name", "placement", "color", "scale", "visible", "content")
+        if objects:
+            first = objects[0]
+            rotation = first["placement"]["rotation"]
+            relative_to = first["placement"]["relative_to"]
+            object_arguments = {
+                key: value for key, value in first.items()
+                if key not in columns}
+        else:
+            rotation = None
+            relative_to = "Center"
+            object_arguments = {}
+        contents = []
+        content_lookup = {}
+        content_indices = []
+        for object_ in objects:
+            if (
+                    object_["placement"]["rotation"] != rotation or
+                    object_["placement"]["relative_to"] != relative_to or
+                    {key: value for key, value in object_.items()
+                     if key not in columns} != object_arguments):
+                raise InvalidArgument(
+                    "Object {} cannot be stored in same table as {}".format(
+                        object_["name"], objects[0]["name"]))
+            content = object_["content"]
+            if id(content) not in content_lookup:
+                content_lookup[id(content)] = len(contents)
+                contents.append(content)
+            content_indices.append(content_lookup[id(content)])
+        return table_class(
+            [object_["name"] for object_ in objects],
+            numpy.array(
+                [object_["placement"]["position"] for object_ in objects],
+                dtype=float).reshape(len(objects), 3),
+            contents,
+            content_indices=content_indices,
+            colors=numpy.array(
+                [object_["color"] for object_ in objects]).reshape(
+                    len(objects), 3),
+            scales=[object_["scale"] for object_ in objects],
+            visible=[object_["visible"] for object_ in objects],
+            rotation=rotation,
+            relative_to=relative_to,
+            **object_arguments
+        )
+
+    def toXML(self, all_objects_root):
+        """Store each row of table as Object node within ObjectRoot node
+
+        W3DObjects are created one at a time, so that the whole table is never
+        held in memory as W3DObjects.
+
+        :param :py:class:xml.etree.ElementTree.Element all_objects_root
+        """
+        for object_ in self:
+            object_.toXML(all_objects_root)
+        return all_objects_root
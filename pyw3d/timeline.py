@@ -31,6 +31,14 @@ from .errors import EBKAC
 from .structs import SortedList
 
 
+def timed_action_key(timed_action):
+    """Return sort key for (time, action) tuple in a W3DTimeline
+
+    Actions are ordered by start time alone, so that actions with the same
+    start time remain in the order in which they were added."""
+    return timed_action[0]
+
+
 class W3DTimeline(W3DFeature):
     """Represent timeline for choreography of actions in the W3D
 
@@ -58,9 +66,10 @@ class W3DTimeline(W3DFeature):
     def __init__(self, *args, **kwargs):
         super(W3DTimeline, self).__init__(*args, **kwargs)
         if "actions" not in self:
-            self["actions"] = SortedList()
+            self["actions"] = SortedList(sort_key=timed_action_key)
         else:
-            self["actions"] = SortedList(self["actions"])
+            self["actions"] = SortedList(
+                self["actions"], sort_key=timed_action_key)
 
     def toXML(self, all_timelines_root):
         """Store W3DTimeline as Timeline node within TimelineRoot node
@@ -97,6 +106,7 @@ class W3DTimeline(W3DFeature):
         if "start-immediately" in timeline_root.attrib:
             new_timeline["start_immediately"] = text2bool(timeline_root.attrib[
                 "start-immediately"])
+        timed_actions = []
         for timed_action in timeline_root.findall("TimedActions"):
             try:
                 action_time = float(timed_action.attrib["seconds-time"])
@@ -105,19 +115,24 @@ class W3DTimeline(W3DFeature):
                     "TimedActions node must specify numeric seconds-time "
                     "attribute")
             for child in timed_action.getchildren():
-                new_timeline["actions"].add(
-                    (action_time, W3DAction.fromXML(child)))
+                timed_actions.append((action_time, W3DAction.fromXML(child)))
+        new_timeline["actions"].extend(timed_actions)
 
         return new_timeline
 
-    def blend(self):
-        """Create Blender object to implement W3DTimeline"""
+    def plan_logic(self, scene_plan, scheduled=False):
+        """Add Blender object and logic implementing W3DTimeline to scene
+        plan
+
+        :param bool scheduled: If True, the timeline is driven by the shared
+        timeline scheduler (see
+        :func:`pyw3d.activators.timelines.setup_timeline_scheduler`)"""
         self.activator = BlenderTimeline(
-            self["name"], self["actions"],
-            start_immediately=self["start_immediately"])
-        LOGGER.debug("Creating timeline {}".format(self["name"]))
+            self["name"], self["actions"], scene_plan,
+            start_immediately=self["start_immediately"], scheduled=scheduled)
+        LOGGER.debug("Planning timeline {}".format(self["name"]))
         self.activator.create_blender_objects()
-        return self.activator.base_object
+        return self.activator
 
     def link_blender_logic(self):
         """Link BGE logic bricks for this W3DTimeline"""
@@ -125,7 +140,7 @@ class W3DTimeline(W3DFeature):
             self.activator.link_logic_bricks()
         except AttributeError:
             raise EBKAC(
-                "blend() must be called before link_blender_logic()")
+                "plan_logic() must be called before link_blender_logic()")
 
     def write_blender_logic(self):
         """Write any necessary game engine logic for this W3DTimeline"""
@@ -136,4 +151,4 @@ class W3DTimeline(W3DFeature):
             self.activator.write_python_logic()
         except AttributeError:
             raise EBKAC(
-                "blend() must be called before write_blender_logic()")
+                "plan_logic() must be called before write_blender_logic()")
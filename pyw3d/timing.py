@@ -0,0 +1,190 @@
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""Timing spans for the phases of an export
+
+Each export records how long each of its phases took (planning, creating
+geometry, applying the plan, packing files, etc.) in an ExportTimer, along
+with the time spent on each feature. A timer can be saved as a JSON summary,
+or as a Chrome trace, which can be opened at chrome://tracing or in Perfetto
+to see the phases and features of an export on a timeline.
+"""
+import json
+import os
+import time
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+
+Span = namedtuple(
+    "Span", ("name", "category", "start", "duration", "depth"))
+Span.__doc__ = """Time in seconds spent in a named part of an export, where
+start is measured from the creation of the timer and depth is the number of
+enclosing spans"""
+
+PHASE = "phase"
+FEATURE = "feature"
+
+
+class ExportTimer(object):
+    """Record of timing spans of one export
+
+    :param int slowest: Number of slowest features to report
+
+    :ivar list spans: Completed Spans, in order of completion
+    """
+
+    def __init__(self, slowest=10):
+        self.slowest = slowest
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name, category=PHASE):
+        """Record time spent within this context
+
+        :param str name: Name of phase, or source of feature (e.g.
+            "objects/intro")
+        :param str category: PHASE or FEATURE
+        """
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.spans.append(Span(
+                name, category, start - self._origin,
+                time.perf_counter() - start, self._depth))
+
+    def get_phases(self):
+        """Return OrderedDict of total seconds spent in each phase, in order
+        of first start
+
+        Spans nested within a span of the same name (e.g. a scene update
+        within a scene update) are already part of the enclosing span, and
+        are not counted again."""
+        phases = OrderedDict()
+        enclosing = []
+        for span in sorted(
+                self.spans, key=lambda span: (span.start, span.depth)):
+            if span.category != PHASE:
+                continue
+            while enclosing and (
+                    enclosing[-1].depth >= span.depth or
+                    enclosing[-1].start + enclosing[-1].duration <
+                    span.start):
+                enclosing.pop()
+            if all(outer.name != span.name for outer in enclosing):
+                phases[span.name] = phases.get(span.name, 0) + span.duration
+            enclosing.append(span)
+        return phases
+
+    def get_feature_totals(self):
+        """Return dictionary of total seconds spent on each feature
+
+        A feature may be timed several times, e.g. once while planning its
+        logic and once while creating its geometry."""
+        totals = {}
+        for span in self.spans:
+            if span.category == FEATURE:
+                totals[span.name] = totals.get(span.name, 0) + span.duration
+        return totals
+
+    def get_slowest_features(self, number=None):
+        """Return list of (source, seconds) for slowest features, slowest
+        first
+
+        :param int number: Number of features to return. Defaults to slowest
+            given on creation.
+        """
+        if number is None:
+            number = self.slowest
+        return sorted(
+            self.get_feature_totals().items(),
+            key=lambda item: (-item[1], item[0]))[:number]
+
+    def get_total(self):
+        """Return seconds from start of first span to end of last"""
+        if not self.spans:
+            return 0
+        return (
+            max(span.start + span.duration for span in self.spans) -
+            min(span.start for span in self.spans))
+
+    def to_dict(self):
+        """Return JSON-serializable summary of phases and slowest features"""
+        return OrderedDict((
+            ("total", self.get_total()),
+            ("phases", self.get_phases()),
+            ("features", len(self.get_feature_totals())),
+            ("slowest_features", [
+                OrderedDict((("source", source), ("seconds", seconds)))
+                for source, seconds in self.get_slowest_features()])
+        ))
+
+    def to_chrome_trace(self):
+        """Return spans in Chrome's trace event format"""
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": span.start * 1e6,
+                    "dur": span.duration * 1e6,
+                    "pid": pid,
+                    "tid": 0
+                }
+                for span in sorted(
+                    self.spans, key=lambda span: (span.start, span.depth))
+            ],
+            "displayTimeUnit": "ms"
+        }
+
+    def save(self, summary_filename=None, trace_filename=None):
+        """Write JSON summary and/or Chrome trace of this timer
+
+        :param str summary_filename: File for summary (see :meth:`to_dict`)
+        :param str trace_filename: File for Chrome trace
+        """
+        for filename, contents in (
+                (summary_filename, self.to_dict),
+                (trace_filename, self.to_chrome_trace)):
+            if filename is not None:
+                with open(filename, "w") as timing_file:
+                    json.dump(contents(), timing_file, indent=2)
+
+    def format_summary(self):
+        """Return human-readable summary of phases and slowest features"""
+        lines = ["Export took {:.3f} s".format(self.get_total())]
+        for name, seconds in self.get_phases().items():
+            lines.append("  {:<24} {:>9.3f} s".format(name, seconds))
+        slowest = self.get_slowest_features()
+        if slowest:
+            lines.append("Slowest features:")
+            for source, seconds in slowest:
+                lines.append("  {:<24} {:>9.3f} s".format(source, seconds))
+        return "\n".join(lines)
+
+
+def get_timing_filenames(filename):
+    """Return names of JSON summary and Chrome trace written for the export
+    to filename"""
+    base = os.path.splitext(filename)[0]
+    return base + ".timing.json", base + ".trace.json"
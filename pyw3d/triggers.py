@@ -32,6 +32,7 @@ from .activators import BlenderTrigger, BlenderPositionTrigger, \
     BlenderPointTrigger, BlenderDirectionTrigger, BlenderLookObjectTrigger, \
     BlenderObjectPositionTrigger
 from .actions import W3DAction
+from .names import generate_blender_object_name, generate_group_name
 
 
 class W3DTrigger(W3DFeature):
@@ -77,15 +78,16 @@ class W3DTrigger(W3DFeature):
                 return trigger_class.fromXML(trigger_root)
         return BareTrigger.fromXML(trigger_root)
 
-    def blend(self):
-        """Create representation of W3DTrigger in Blender"""
+    def plan_logic(self, scene_plan):
+        """Add representation of W3DTrigger to scene plan"""
         self.activator = BlenderTrigger(
             self["name"],
             self["actions"],
+            scene_plan,
             enable_immediately=self["enabled"],
             remain_enabled=self["remain_enabled"])
         self.activator.create_blender_objects()
-        return self.activator.base_object
+        return self.activator
 
     def link_blender_logic(self):
         """Link BGE logic bricks for this W3DTrigger"""
@@ -93,14 +95,14 @@ class W3DTrigger(W3DFeature):
             self.activator.link_logic_bricks()
         except AttributeError:
             raise EBKAC(
-                "blend() must be called before link_blender_logic()")
+                "plan_logic() must be called before link_blender_logic()")
 
     def write_blender_logic(self):
         try:
             self.activator.write_python_logic()
         except AttributeError:
             raise EBKAC(
-                "blend() must be called before write_blender_logic()")
+                "plan_logic() must be called before write_blender_logic()")
 
 
 class BareTrigger(W3DFeature):
@@ -335,16 +337,17 @@ class HeadPositionTrigger(HeadTrackTrigger):
             new_trigger["box"] = EventBox.fromXML(box_node)
         return new_trigger
 
-    def blend(self):
-        """Create representation of W3DTrigger in Blender"""
+    def plan_logic(self, scene_plan):
+        """Add representation of W3DTrigger to scene plan"""
         self.activator = BlenderPositionTrigger(
             self["name"],
             self["actions"],
+            scene_plan,
             self["box"],
             enable_immediately=self["enabled"],
             remain_enabled=self["remain_enabled"])
         self.activator.create_blender_objects()
-        return self.activator.base_object
+        return self.activator
 
 
 class LookAtPoint(HeadTrackTrigger):
@@ -399,16 +402,17 @@ class LookAtPoint(HeadTrackTrigger):
         new_trigger["angle"] = float(node.attrib["angle"])
         return new_trigger
 
-    def blend(self):
-        """Create representation of W3DTrigger in Blender"""
+    def plan_logic(self, scene_plan):
+        """Add representation of W3DTrigger to scene plan"""
         self.activator = BlenderPointTrigger(
             self["name"],
             self["actions"],
+            scene_plan,
             self["point"],
             enable_immediately=self["enabled"],
             remain_enabled=self["remain_enabled"])
         self.activator.create_blender_objects()
-        return self.activator.base_object
+        return self.activator
 
 
 class LookAtDirection(HeadTrackTrigger):
@@ -465,16 +469,18 @@ class LookAtDirection(HeadTrackTrigger):
         new_trigger["angle"] = float(node.attrib["angle"])
         return new_trigger
 
-    def blend(self):
-        """Create representation of W3DTrigger in Blender"""
+    def plan_logic(self, scene_plan):
+        """Add representation of W3DTrigger to scene plan"""
         self.activator = BlenderDirectionTrigger(
             self["name"],
             self["actions"],
+            scene_plan,
             self["direction"],
             enable_immediately=self["enabled"],
-            remain_enabled=self["remain_enabled"])
+            remain_enabled=self["remain_enabled"],
+            angle=self["angle"])
         self.activator.create_blender_objects()
-        return self.activator.base_object
+        return self.activator
 
 
 class LookAtObject(HeadTrackTrigger):
@@ -525,16 +531,17 @@ class LookAtObject(HeadTrackTrigger):
         new_trigger["object"] = node.attrib["name"].strip()
         return new_trigger
 
-    def blend(self):
-        """Create representation of W3DTrigger in Blender"""
+    def plan_logic(self, scene_plan):
+        """Add representation of W3DTrigger to scene plan"""
         self.activator = BlenderLookObjectTrigger(
             self["name"],
             self["actions"],
+            scene_plan,
             self["object"],
             enable_immediately=self["enabled"],
             remain_enabled=self["remain_enabled"])
         self.activator.create_blender_objects()
-        return self.activator.base_object
+        return self.activator
 
 
 class MovementTrigger(W3DTrigger):
@@ -621,21 +628,22 @@ class MovementTrigger(W3DTrigger):
         new_trigger["box"] = EventBox.fromXML(node)
         return new_trigger
 
-    def blend(self):
-        """Create representation of W3DTrigger in Blender"""
+    def plan_logic(self, scene_plan):
+        """Add representation of W3DTrigger to scene plan"""
         if self["type"] == "Single Object":
-            objects_string = "['{}']".format(self["object_name"])
+            objects_string = "['{}']".format(
+                generate_blender_object_name(self["object_name"]))
         else:
-            objects_string = self["object_name"]
-        if "All" in self["type"]:
-            detect_any = False
+            objects_string = generate_group_name(self["object_name"])
+        detect_any = "All" not in self["type"]
         self.activator = BlenderObjectPositionTrigger(
             self["name"],
             self["actions"],
+            scene_plan,
             self["box"],
             objects_string,
             enable_immediately=self["enabled"],
             remain_enabled=self["remain_enabled"],
             detect_any=detect_any)
         self.activator.create_blender_objects()
-        return self.activator.base_object
+        return self.activator
@@ -343,7 +343,16 @@ class ReferenceValidator(Validator):
             LOGGER.info("Cannot check relative reference to {}".format(
                 value))
             return self.fallback_validator(value)
-        return value in self.valid_menu_items
+        # Only W3DProjects keep indices of names
+        get_name_index = getattr(
+            self.ref_path.project, "get_name_index", None)
+        if get_name_index is None:
+            name_index = None
+        else:
+            name_index = get_name_index(self.ref_path.path)
+        if name_index is None:
+            return value in self.valid_menu_items
+        return value in name_index
 
     def coerce(self, value):
         return self.fallback_validator.coerce(value)
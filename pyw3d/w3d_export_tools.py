@@ -19,45 +19,131 @@
 """
 
 import os
+import re
 import sys
+import glob
+import json
+import time
 import pickle
+import shutil
 import subprocess
 import argparse
-from pyw3d import BLENDER_EXEC, BLENDER_PLAY
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pyw3d import BLENDER_EXEC, BLENDER_PLAY, LOG_DIR
 from pyw3d import project
+from pyw3d.cache import ExportCache, get_blender_version
+from pyw3d.errors import ExportError
+from pyw3d.export_context import ExportContext
+from pyw3d.timing import get_timing_filenames
 
+LOGGER = logging.getLogger("pyw3d")
 EXPORT_SCRIPT = os.path.abspath(__file__)
+PICKLE_EXTENSIONS = (".p", ".pkl", ".pickle")
+PHASE_REGEX = re.compile(r"^W3D_PHASE (\w+) ([0-9.]+)$", re.MULTILINE)
+VERSION_REGEX = re.compile(r"^(\d+)\.(\d+)")
+PYTHON_EXIT_CODE_VERSION = (2, 78)
+"""Earliest Blender version accepting --python-exit-code"""
 
 
 def pickle_w3dproject(input_project, filename="run.p"):
-    """Dump W3DProject to pickle file"""
-    pickle.dump(input_project, open(filename, "wb"))
+    """Dump W3DProject to pickle file
+
+    Features are restored from the pickle without being validated again (see
+    :class:`pyw3d.features.W3DFeature`)"""
+    with open(filename, "wb") as pickle_file:
+        pickle.dump(input_project, pickle_file)
 
 
 def unpickle_w3dproject(filename="run.p"):
     """Create w3dproject from pickle file"""
-    return pickle.load(open(filename, "rb"))
+    with open(filename, "rb") as pickle_file:
+        return pickle.load(pickle_file)
 
 
 def export_to_blender(
-        input_project, filename="run.blend", display=True, fullscreen=False):
+        input_project, filename="run.blend", display=True, fullscreen=False,
+        workspace=None, timings=None, incremental=False, export_cache=None,
+        save_timing=False):
     """Save project as .blend file
 
+    Outside of Blender, the project is handed to a Blender subprocess through
+    a pickle file in a new directory unique to this export, which is removed
+    once the export is complete. Several exports may therefore run at once.
+
     :param str filename: Name of .blend file to export to
     :param bool display: Display project in standalone player after export?
+    :param str workspace: Directory in which to create the directory for the
+        pickle file. If None, the system temporary directory is used.
+    :param dict timings: If given, the time in seconds spent in each phase of
+        the export is stored here by phase name
+    :param bool incremental: If True and filename holds an earlier
+        incremental export of this project, rebuild only the features that
+        changed since then (see :mod:`pyw3d.incremental`)
+    :param ExportCache export_cache: If given, copy the .blend file from
+        this cache if the same project was exported before, and otherwise
+        add the exported file to it
+    :param bool save_timing: Write a JSON summary and a Chrome trace of the
+        time spent in each phase and feature of the export beside the .blend
+        file (see :mod:`pyw3d.timing`)?
     """
+    if timings is None:
+        timings = {}
+    if export_cache is not None:
+        start = time.time()
+        cache_key = export_cache.get_key(input_project)
+        cache_hit = export_cache.fetch(cache_key, filename)
+        timings["cache"] = time.time() - start
+        if cache_hit:
+            if display:
+                display_blender_output(
+                    filename=os.path.abspath(filename), fullscreen=fullscreen)
+            return
     try:
         import bpy  # Check if we're in Blender environment
-        input_project.blend()
+        if incremental and os.path.isfile(filename):
+            start = time.time()
+            bpy.ops.wm.open_mainfile(filepath=os.path.abspath(filename))
+            timings["open"] = time.time() - start
+        start = time.time()
+        export_context = ExportContext()
+        input_project.blend(
+            export_context=export_context, incremental=incremental)
+        timings["blend"] = time.time() - start
+        start = time.time()
         if os.path.exists(filename):
             os.remove(filename)
         bpy.ops.wm.save_as_mainfile(filepath=filename)
+        timings["save"] = time.time() - start
+        if save_timing:
+            summary_filename, trace_filename = get_timing_filenames(filename)
+            export_context.timer.save(
+                summary_filename=summary_filename,
+                trace_filename=trace_filename)
     except ImportError:
-        pickle_w3dproject(input_project)
-        subprocess.check_call([
-            BLENDER_EXEC, "--background", "--python", EXPORT_SCRIPT, "--", "-f"
-            "pickle", "run.p", "-o", os.path.abspath(filename)]
-        )
+        job_directory = tempfile.mkdtemp(prefix="w3d_export_", dir=workspace)
+        try:
+            start = time.time()
+            pickle_filename = os.path.join(job_directory, "run.p")
+            pickle_w3dproject(input_project, filename=pickle_filename)
+            timings["handoff"] = time.time() - start
+            start = time.time()
+            blender_call = [
+                BLENDER_EXEC, "--background", "--python", EXPORT_SCRIPT, "--",
+                "-f", "pickle", pickle_filename, "-o",
+                os.path.abspath(filename)]
+            if incremental:
+                blender_call.append("--incremental")
+            if save_timing:
+                blender_call.append("--save-timing")
+            subprocess.check_call(blender_call)
+            timings["blender"] = time.time() - start
+        finally:
+            shutil.rmtree(job_directory, ignore_errors=True)
+    if export_cache is not None:
+        export_cache.store(cache_key, filename)
     if display:
         display_blender_output(
             filename=os.path.abspath(filename), fullscreen=fullscreen)
@@ -74,30 +160,591 @@ def display_blender_output(filename="run.blend", fullscreen=False):
     subprocess.call(blender_play_call)
 
 
+def load_project_file(project_file, filetype="xml"):
+    """Load project from XML or pickle file
+
+    :param str filetype: One of "xml" or "pickle"
+    """
+    if filetype == "xml":
+        return project.W3DProject.fromXML_file(project_file)
+    if filetype == "pickle":
+        return unpickle_w3dproject(project_file)
+    raise ValueError("Unknown filetype {}".format(filetype))
+
+
+def get_export_key(export_cache, project_file, filetype="xml"):
+    """Return key of project file in export cache, or None if it cannot be
+    loaded
+
+    The working directory is restored after loading the project."""
+    call_directory = os.getcwd()
+    try:
+        return export_cache.get_key(
+            load_project_file(project_file, filetype=filetype))
+    except Exception as error:
+        LOGGER.warning("Export cache not used for {}: {}".format(
+            project_file, error))
+        return None
+    finally:
+        os.chdir(call_directory)
+
+
+def reports_python_errors(blender_exec=BLENDER_EXEC):
+    """Return True if blender_exec can exit with an error code when a Python
+    script fails (Blender 2.78 or later)
+
+    If the version of Blender cannot be determined, False is returned."""
+    try:
+        match = VERSION_REGEX.match(get_blender_version(blender_exec))
+    except OSError:
+        return False
+    return match is not None and tuple(
+        int(part) for part in match.groups()) >= PYTHON_EXIT_CODE_VERSION
+
+
+def get_blender_call(
+        project_file, output, filetype="xml", report_phases=False,
+        incremental=False, save_timing=False):
+    """Return command line for exporting a project file in a new Blender
+    process
+
+    With Blender 2.78 or later, the process exits with a nonzero code if the
+    export fails. Earlier versions exit with code 0 regardless, so that a
+    failed export can only be recognized by its missing output.
+
+    :param bool report_phases: Print time taken by each phase of export?
+    :param bool incremental: Update output incrementally?
+    :param bool save_timing: Write timing summary and trace beside output?
+    """
+    blender_call = [BLENDER_EXEC, "--background"]
+    if reports_python_errors(BLENDER_EXEC):
+        blender_call.extend(["--python-exit-code", "1"])
+    blender_call.extend([
+        "--python", EXPORT_SCRIPT, "--", "-f", filetype, project_file, "-o",
+        output
+    ])
+    if report_phases:
+        blender_call.append("--report-phases")
+    if incremental:
+        blender_call.append("--incremental")
+    if save_timing:
+        blender_call.append("--save-timing")
+    return blender_call
+
+
+def export_file(
+        project_file, output, filetype="xml", display=False,
+        fullscreen=False, timings=None, incremental=False,
+        export_cache=None, save_timing=False):
+    """Load project from file and save it as .blend file
+
+    :param str project_file: Name of XML or pickle file containing project
+    :param str output: Name of .blend file to export to
+    :param str filetype: One of "xml" or "pickle"
+    :param dict timings: If given, the time in seconds spent in each phase of
+        the export is stored here by phase name
+    :param bool incremental: Update output incrementally (see
+        :func:`export_to_blender`)?
+    :param ExportCache export_cache: Cache of exported .blend files to use
+    :param bool save_timing: Write timing summary and trace beside output
+        (see :func:`export_to_blender`)?
+    :return: Name of .blend file
+    """
+    if timings is None:
+        timings = {}
+    start = time.time()
+    input_project = load_project_file(project_file, filetype=filetype)
+    timings["load"] = time.time() - start
+    export_to_blender(
+        input_project, filename=output, display=display,
+        fullscreen=fullscreen, timings=timings, incremental=incremental,
+        export_cache=export_cache, save_timing=save_timing)
+    return output
+
+
+def export_files(exports, jobs=1, export_cache=None, **kwargs):
+    """Save several projects as .blend files, running up to jobs exports at
+    once
+
+    With a single job, projects are exported one after another in this
+    process. Otherwise, each export runs in its own Blender process, as for
+    :func:`export_batch`.
+
+    :param exports: List of (project file, .blend file) pairs
+    :param int jobs: Maximum number of exports to run at once
+    :param ExportCache export_cache: Cache of exported .blend files to use
+    :param kwargs: Further arguments to export_file
+    :return: List of names of .blend files
+    :raises ExportError: If two exports share a .blend file or any export
+        fails
+    """
+    exports = [
+        (os.path.abspath(project_file), os.path.abspath(output))
+        for project_file, output in exports
+    ]
+    check_outputs(exports)
+    if jobs <= 1 or len(exports) <= 1:
+        return [
+            export_file(
+                project_file, output, export_cache=export_cache, **kwargs)
+            for project_file, output in exports
+        ]
+    log_dir = tempfile.mkdtemp(
+        prefix=time.strftime("export_%Y%m%d-%H%M%S_"), dir=LOG_DIR)
+    batch = make_batch(
+        exports, log_dir, filetype=kwargs.get("filetype", "xml"),
+        incremental=kwargs.get("incremental", False),
+        save_timing=kwargs.get("save_timing", False))
+    run_batch(
+        batch, jobs, retries=0, export_cache=export_cache,
+        progress=LOGGER.info)
+    for job in batch:
+        if job.status != "done":
+            raise ExportError("Export of {} failed (see {})".format(
+                job.project_file, job.log_file))
+    if kwargs.get("display", False):
+        for project_file, output in exports:
+            display_blender_output(
+                filename=output, fullscreen=kwargs.get("fullscreen", False))
+    return [output for project_file, output in exports]
+
+
+def check_outputs(exports):
+    """Raise ExportError if two exports would save the same .blend file
+
+    :param exports: List of (project file, .blend file) pairs
+    """
+    sources = {}
+    for project_file, output in exports:
+        key = os.path.normcase(os.path.abspath(output))
+        if key in sources:
+            raise ExportError(
+                "{} and {} would both be exported to {}".format(
+                    sources[key], project_file, output))
+        sources[key] = project_file
+
+
+def get_batch_outputs(project_files, output_dir=None):
+    """Return (project file, .blend file) pair for each project file
+
+    If output_dir is given, .blend files keep the paths of their project
+    files relative to the directory containing all of them, so that projects
+    with the same name in different directories do not overwrite each other.
+
+    :param project_files: List of absolute project filenames
+    :param str output_dir: Directory in which to save .blend files. If None,
+        each .blend file is saved next to its project file.
+    """
+    if output_dir is None or not project_files:
+        return [
+            (project_file, os.path.splitext(project_file)[0] + ".blend")
+            for project_file in project_files
+        ]
+    root = os.path.commonpath(
+        [os.path.dirname(project_file) for project_file in project_files])
+    return [
+        (project_file, os.path.join(
+            output_dir,
+            os.path.relpath(os.path.splitext(project_file)[0], root) +
+            ".blend"))
+        for project_file in project_files
+    ]
+
+
+def expand_inputs(patterns):
+    """Return sorted list of files matching any of the given glob patterns
+
+    Patterns which match no file are kept as they are, so that missing inputs
+    are reported as failed jobs rather than silently dropped.
+
+    :param patterns: Iterable of filenames or glob patterns
+    """
+    filenames = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for filename in matches:
+            filename = os.path.abspath(filename)
+            if filename not in seen:
+                seen.add(filename)
+                filenames.append(filename)
+    return filenames
+
+
+def guess_filetype(project_file, default="xml"):
+    """Return "pickle" for files with a pickle extension and default
+    otherwise"""
+    if os.path.splitext(project_file)[1].lower() in PICKLE_EXTENSIONS:
+        return "pickle"
+    return default
+
+
+class BatchJob(object):
+    """A single export run by :func:`export_batch`
+
+    :ivar str status: One of "pending", "running", "done" or "failed"
+    :ivar int attempts: Number of times the export has been started
+    :ivar float elapsed: Wall-clock time of all attempts in seconds
+    :ivar dict phases: Time in seconds of each phase of the last attempt, as
+        reported by Blender
+    """
+
+    def __init__(
+            self, index, project_file, output, filetype, log_file,
+            incremental=False, save_timing=False):
+        self.index = index
+        self.project_file = project_file
+        self.output = output
+        self.filetype = filetype
+        self.log_file = log_file
+        self.incremental = incremental
+        self.save_timing = save_timing
+        self.cache_key = None
+        self.cached = False
+        self.status = "pending"
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.phases = {}
+        self.returncode = None
+
+    def get_call(self):
+        """Return Blender command line for this export"""
+        return get_blender_call(
+            self.project_file, self.output, filetype=self.filetype,
+            report_phases=True, incremental=self.incremental,
+            save_timing=self.save_timing)
+
+    def run(self, timeout=None):
+        """Run export once, appending Blender output to log file
+
+        An attempt only succeeds if it writes its output anew, since Blender
+        versions before 2.78 exit with code 0 even if the export fails. Any
+        existing output is therefore removed first, unless it is to be updated
+        incrementally.
+
+        :return: True if export succeeded
+        """
+        self.attempts += 1
+        self.status = "running"
+        if not self.incremental and os.path.exists(self.output):
+            os.remove(self.output)
+        start = time.time()
+        with open(self.log_file, "a") as log:
+            log.write("=== Attempt {}: {}\n".format(
+                self.attempts, " ".join(self.get_call())))
+            log.flush()
+            try:
+                self.returncode = subprocess.call(
+                    self.get_call(), stdout=log, stderr=subprocess.STDOUT,
+                    timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.returncode = None
+                log.write("=== Timed out after {} s\n".format(timeout))
+            except OSError as error:
+                self.returncode = None
+                log.write("=== Could not start Blender: {}\n".format(error))
+        self.elapsed += time.time() - start
+        with open(self.log_file) as log:
+            self.phases = {
+                name: float(seconds)
+                for name, seconds in PHASE_REGEX.findall(
+                    log.read().split("=== Attempt")[-1])
+            }
+        # Modification times may only be recorded to the second
+        success = (
+            self.returncode == 0 and os.path.isfile(self.output) and
+            os.path.getmtime(self.output) >= int(start))
+        self.status = "done" if success else "failed"
+        return success
+
+    def get_summary(self):
+        """Return dictionary describing this job"""
+        return {
+            "project_file": self.project_file,
+            "output": self.output,
+            "status": self.status,
+            "cached": self.cached,
+            "attempts": self.attempts,
+            "elapsed": self.elapsed,
+            "phases": self.phases,
+            "log_file": self.log_file
+        }
+
+
+def export_batch(
+        patterns, output_dir=None, jobs=None, retries=1, timeout=None,
+        log_dir=None, filetype="xml", progress=print, incremental=False,
+        export_cache=None, save_timing=False):
+    """Export many projects, each in its own Blender process
+
+    Up to jobs Blender processes run at once. The output of each is written to
+    a separate log file, and failed exports are retried. A JSON summary of all
+    jobs, including the time taken by each phase of each export, is written
+    to summary.json in the log directory.
+
+    :param patterns: Iterable of project filenames or glob patterns. Files
+        with a pickle extension are loaded as pickles; all others as filetype.
+    :param str output_dir: Directory in which to save .blend files, keeping
+        their paths relative to the directory containing all project files.
+        If None, each .blend file is saved next to its project file.
+    :param int jobs: Maximum number of exports to run at once. Defaults to the
+        number of CPUs.
+    :param int retries: Number of times to retry each failed export
+    :param float timeout: Time in seconds after which an attempt is abandoned
+    :param str log_dir: Directory for log files. If None, a new directory
+        within the pyw3d log directory is used.
+    :param progress: Callable taking a string, called as each job finishes
+    :param bool incremental: Update existing .blend files incrementally?
+    :param ExportCache export_cache: If given, projects found in this cache
+        are copied from it rather than exported, and other exports are added
+        to it
+    :param bool save_timing: Write timing summary and trace beside each
+        .blend file (see :func:`export_to_blender`)?
+    :return: Dictionary summarizing the batch
+    :raises ExportError: If two projects would be saved to the same .blend
+        file
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if output_dir is not None:
+        output_dir = os.path.abspath(output_dir)
+    exports = get_batch_outputs(expand_inputs(patterns), output_dir=output_dir)
+    check_outputs(exports)
+    if log_dir is None:
+        log_dir = tempfile.mkdtemp(
+            prefix=time.strftime("batch_%Y%m%d-%H%M%S_"), dir=LOG_DIR)
+    os.makedirs(log_dir, exist_ok=True)
+    for project_file, output in exports:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    batch = make_batch(
+        exports, log_dir, filetype=filetype, incremental=incremental,
+        save_timing=save_timing)
+    wall_clock = run_batch(
+        batch, jobs, retries=retries, timeout=timeout,
+        export_cache=export_cache, progress=progress)
+
+    phase_totals = {}
+    for job in batch:
+        for name, seconds in job.phases.items():
+            phase_totals[name] = phase_totals.get(name, 0.0) + seconds
+    summary = {
+        "wall_clock": wall_clock,
+        "jobs": jobs,
+        "succeeded": sum(job.status == "done" for job in batch),
+        "failed": sum(job.status == "failed" for job in batch),
+        "phase_totals": phase_totals,
+        "exports": [job.get_summary() for job in batch]
+    }
+    if export_cache is not None:
+        summary["export_cache"] = export_cache.stats()
+    summary_file = os.path.join(log_dir, "summary.json")
+    with open(summary_file, "w") as summary_output:
+        json.dump(summary, summary_output, indent=2)
+    summary["summary_file"] = summary_file
+    return summary
+
+
+def make_batch(
+        exports, log_dir, filetype="xml", incremental=False,
+        save_timing=False):
+    """Return a BatchJob for each export, logging to files in log_dir
+
+    :param exports: List of (project file, .blend file) pairs
+    :param str filetype: Filetype of project files without a pickle
+        extension
+    :param bool incremental: Update existing .blend files incrementally?
+    :param bool save_timing: Write timing summary and trace beside each
+        .blend file?
+    """
+    batch = []
+    for index, (project_file, output) in enumerate(exports):
+        base_name = os.path.splitext(os.path.basename(project_file))[0]
+        batch.append(BatchJob(
+            index, project_file, output,
+            guess_filetype(project_file, default=filetype),
+            os.path.join(log_dir, "{:04d}_{}.log".format(index, base_name)),
+            incremental=incremental, save_timing=save_timing
+        ))
+    return batch
+
+
+def run_batch(
+        batch, jobs, retries=1, timeout=None, export_cache=None,
+        progress=print):
+    """Run BatchJobs, up to jobs at once, retrying those that fail
+
+    :param batch: List of BatchJobs
+    :param int jobs: Maximum number of exports to run at once
+    :param int retries: Number of times to retry each failed export
+    :param float timeout: Time in seconds after which an attempt is abandoned
+    :param ExportCache export_cache: If given, jobs found in this cache are
+        copied from it rather than exported, and other exports are added to
+        it
+    :param progress: Callable taking a string, called as each job finishes
+    :return: Wall-clock time taken in seconds
+    """
+    if export_cache is not None:
+        # Projects are loaded here rather than in worker threads, since
+        # loading a project changes the working directory
+        for job in batch:
+            job.cache_key = get_export_key(
+                export_cache, job.project_file, filetype=job.filetype)
+
+    finished = [0]
+    progress_lock = threading.Lock()
+
+    def run_job(job):
+        if export_cache is not None:
+            with progress_lock:
+                job.cached = export_cache.fetch(job.cache_key, job.output)
+            if job.cached:
+                job.status = "done"
+        while not job.cached and not job.run(timeout=timeout) and (
+                job.attempts <= retries):
+            with progress_lock:
+                progress("Retrying {} (attempt {} failed; see {})".format(
+                    job.project_file, job.attempts, job.log_file))
+        if export_cache is not None and job.status == "done" and (
+                not job.cached):
+            with progress_lock:
+                export_cache.store(job.cache_key, job.output)
+        with progress_lock:
+            finished[0] += 1
+            progress("[{}/{}] {} {} ({:.1f} s{})".format(
+                finished[0], len(batch), job.status, job.project_file,
+                job.elapsed, ", cached" if job.cached else ""))
+        return job
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        list(executor.map(run_job, batch))
+    return time.time() - start
+
+
+def print_batch_summary(summary):
+    """Print summary returned by :func:`export_batch`"""
+    print("{} of {} exports succeeded in {:.1f} s using {} workers".format(
+        summary["succeeded"], len(summary["exports"]), summary["wall_clock"],
+        summary["jobs"]))
+    for name, seconds in sorted(summary["phase_totals"].items()):
+        print("    {:<10} {:10.1f} s".format(name, seconds))
+    if "export_cache" in summary:
+        print_cache_stats(summary["export_cache"])
+    for export in summary["exports"]:
+        if export["status"] != "done":
+            print("FAILED: {} (see {})".format(
+                export["project_file"], export["log_file"]))
+    print("Summary written to {}".format(summary["summary_file"]))
+
+
+def print_cache_stats(stats):
+    """Print statistics of an ExportCache"""
+    print("Export cache: {} hits, {} misses ({:.0%} hit rate)".format(
+        stats["hits"], stats["misses"], stats["hit_rate"]))
+
+
 if __name__ == "__main__":
     argv = sys.argv
     if "--" in argv:
         argv = argv[argv.index("--") + 1:]
     else:
         argv = argv[1:]
+    if argv[:1] == ["--worker"]:
+        from pyw3d import export_worker
+        export_worker.main(argv[1:])
+        sys.exit(0)
     parser = argparse.ArgumentParser()
-    parser.add_argument("project_file")
+    parser.add_argument(
+        "project_file", nargs="+",
+        help="project file(s) to export; with --batch, glob patterns may be"
+        " used")
     parser.add_argument(
         "-f", "--filetype", default="xml", choices=["xml", "pickle"],
         help="input filetype")
     parser.add_argument(
-        "-o", "--output", default="run.blend",
-        help="filename for output blend file")
+        "-b", "--batch", default=False, action="store_true",
+        help="export each project in its own Blender process, with logs,"
+        " retries and a timing summary")
+    parser.add_argument(
+        "--output-dir", default=None,
+        help="with --batch, directory for output blend files, which keep the"
+        " layout of the directories holding the project files")
+    parser.add_argument(
+        "--retries", default=1, type=int,
+        help="with --batch, number of times to retry a failed export")
+    parser.add_argument(
+        "--timeout", default=None, type=float,
+        help="with --batch, seconds after which an export attempt fails")
+    parser.add_argument(
+        "--log-dir", default=None,
+        help="with --batch, directory for log files and summary")
+    parser.add_argument(
+        "--report-phases", default=False, action="store_true",
+        help=argparse.SUPPRESS)
+    parser.add_argument(
+        "-o", "--output", default=None,
+        help="filename for output blend file (default run.blend). With"
+        " several project files, each is exported next to its project file"
+        " instead.")
+    parser.add_argument(
+        "-j", "--jobs", default=None, type=int,
+        help="number of exports to run at once (default 1, or the number of"
+        " CPUs with --batch)")
+    parser.add_argument(
+        "-i", "--incremental", default=False, action="store_true",
+        help="update existing output blend files, rebuilding only features"
+        " changed since they were last exported with this option")
+    parser.add_argument(
+        "-t", "--save-timing", default=False, action="store_true",
+        help="write a JSON summary and a Chrome trace of the time spent in"
+        " each phase and feature of the export beside each blend file")
+    parser.add_argument(
+        "-c", "--cache", default=False, action="store_true",
+        help="copy blend files of projects exported before from the export"
+        " cache (configured in ~/.w3d.json) instead of exporting them again")
     parser.add_argument(
         "-d", "--display", default=False, action="store_true")
     parser.add_argument(
         "-s", "--fullscreen", default=False, action="store_true")
     args = parser.parse_args(argv)
+    export_cache = None
+    if args.cache:
+        export_cache = ExportCache.from_config()
 
-    if args.filetype == "xml":
-        input_project = project.W3DProject.fromXML_file(args.project_file)
-    elif args.filetype == "pickle":
-        input_project = unpickle_w3dproject(args.project_file)
-    export_to_blender(
-        input_project, filename=args.output, display=args.display,
-        fullscreen=args.fullscreen)
+    if args.batch:
+        summary = export_batch(
+            args.project_file, output_dir=args.output_dir, jobs=args.jobs,
+            retries=args.retries, timeout=args.timeout,
+            log_dir=args.log_dir, filetype=args.filetype,
+            incremental=args.incremental, export_cache=export_cache,
+            save_timing=args.save_timing)
+        print_batch_summary(summary)
+        sys.exit(1 if summary["failed"] else 0)
+
+    if len(args.project_file) == 1:
+        timings = {}
+        export_file(
+            args.project_file[0], args.output or "run.blend",
+            filetype=args.filetype, display=args.display,
+            fullscreen=args.fullscreen, timings=timings,
+            incremental=args.incremental, export_cache=export_cache,
+            save_timing=args.save_timing)
+        if args.report_phases:
+            for name, seconds in sorted(timings.items()):
+                print("W3D_PHASE {} {:.6f}".format(name, seconds))
+            sys.stdout.flush()
+    else:
+        if args.output is not None:
+            parser.error("--output requires a single project file")
+        exports = [
+            (project_file, os.path.splitext(project_file)[0] + ".blend")
+            for project_file in args.project_file
+        ]
+        export_files(
+            exports, jobs=args.jobs or 1, filetype=args.filetype,
+            display=args.display, fullscreen=args.fullscreen,
+            incremental=args.incremental, export_cache=export_cache,
+            save_timing=args.save_timing)
+    if export_cache is not None:
+        print_cache_stats(export_cache.stats())
@@ -17,6 +17,7 @@
 
 """Convenience tools for working with W3D xml"""
 import re
+import sys
 from .errors import BadW3DXML
 
 
@@ -85,3 +86,117 @@ def find_xml_text(root, search):
         return search_root.text
     except AttributeError:
         return None
+
+
+def _escape_pretty(data):
+    """Escape text or attribute data in the same way as xml.dom.minidom"""
+    return data.replace("&", "&amp;").replace("<", "&lt;").replace(
+        "\"", "&quot;").replace(">", "&gt;")
+
+
+def _normalize_newlines(text):
+    """Normalize line endings as an XML parser would"""
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+class PrettyXMLWriter(object):
+    """Write indented XML to a file object in a single pass
+
+    Output is identical to serializing an ElementTree, re-parsing it with
+    xml.dom.minidom, pretty-printing it and then discarding whitespace-only
+    lines, but no copy of the document is ever held in memory.
+
+    :param file_: Writable text file object
+    :param str indent: String used for each level of indentation
+    """
+
+    def __init__(self, file_, indent="\t"):
+        self.file_ = file_
+        self.indent = indent
+        self._line = []
+        self._first_line = True
+
+    def _flush_line(self):
+        line = "".join(self._line)
+        self._line = []
+        # WARNING: Need to make sure that this doesn't mess up paragraphs of
+        # text
+        if line.strip():
+            if not self._first_line:
+                self.file_.write("\n")
+            self.file_.write(line)
+            self._first_line = False
+
+    def write(self, text):
+        """Write text to file, dropping any line consisting only of
+        whitespace"""
+        lines = text.split("\n")
+        self._line.append(lines[0])
+        for line in lines[1:]:
+            self._flush_line()
+            self._line.append(line)
+
+    def close(self):
+        """Write any remaining partial line to file"""
+        self._flush_line()
+
+    def write_declaration(self):
+        """Write XML declaration"""
+        self.write('<?xml version="1.0" ?>\n')
+
+    def _open_tag(self, element, level):
+        tag = ["{}<{}".format(self.indent * level, element.tag)]
+        attrib = element.attrib.keys()
+        if sys.version_info < (3, 8):  # minidom sorted attributes until 3.8
+            attrib = sorted(attrib)
+        for name in attrib:
+            tag.append(' {}="{}"'.format(
+                name, _escape_pretty(element.attrib[name])))
+        return "".join(tag)
+
+    def start(self, element, level=0):
+        """Write opening tag of element on its own line
+
+        :param element: The element whose tag should be opened
+        :type element: :class:`xml.etree.ElementTree.Element`
+        :param int level: Indentation level of element
+        """
+        self.write("{}>\n".format(self._open_tag(element, level)))
+
+    def end(self, element, level=0):
+        """Write closing tag of element on its own line"""
+        self.write("{}</{}>\n".format(self.indent * level, element.tag))
+
+    def write_element(self, element, level=0):
+        """Write element and all of its children
+
+        :param element: The element to write
+        :type element: :class:`xml.etree.ElementTree.Element`
+        :param int level: Indentation level of element
+        """
+        nodes = []
+        if element.text:
+            nodes.append(element.text)
+        for child in element:
+            nodes.append(child)
+            if child.tail:
+                nodes.append(child.tail)
+
+        open_tag = self._open_tag(element, level)
+        if not nodes:
+            self.write("{}/>\n".format(open_tag))
+        elif len(nodes) == 1 and isinstance(nodes[0], str):
+            self.write("{}>{}</{}>\n".format(
+                open_tag, _escape_pretty(_normalize_newlines(nodes[0])),
+                element.tag))
+        else:
+            self.write("{}>\n".format(open_tag))
+            for node in nodes:
+                if isinstance(node, str):
+                    self.write(_escape_pretty("{}{}\n".format(
+                        self.indent * (level + 1), _normalize_newlines(node)
+                    )))
+                else:
+                    self.write_element(node, level + 1)
+            self.end(element, level)
+
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""A comparison of one-shot and persistent export workers
+
+Each XML sample is exported once by a new worker process per project and once
+by a single persistent worker. By default, the stand-in worker is used, so
+that this script runs without Blender; pass --blender to use Blender instead.
+
+To run this script, use the following command::
+
+    $ python3 export_worker_sample.py [--blender]
+"""
+import glob
+import os
+import sys
+import tempfile
+import time
+from pyw3d.export_worker import ExportWorker, BLENDER_WORKER_COMMAND, \
+    STAND_IN_WORKER_COMMAND
+
+if "--blender" in sys.argv:
+    command = BLENDER_WORKER_COMMAND
+else:
+    command = STAND_IN_WORKER_COMMAND
+
+sample_dir = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "xml_samples")
+project_files = sorted(glob.glob(os.path.join(sample_dir, "*.xml")))
+output_dir = tempfile.mkdtemp(prefix="w3d_worker_sample_")
+
+
+def output_for(project_file):
+    return os.path.join(output_dir, os.path.splitext(
+        os.path.basename(project_file))[0] + ".blend")
+
+start = time.time()
+for project_file in project_files:
+    with ExportWorker(command=command, fallback=False) as worker:
+        worker.export(project_file, output_for(project_file))
+one_shot = time.time() - start
+
+start = time.time()
+with ExportWorker(command=command, fallback=False) as worker:
+    for project_file in project_files:
+        worker.export(project_file, output_for(project_file))
+persistent = time.time() - start
+
+print("Projects:            {}".format(len(project_files)))
+print("One worker each:     {:.2f} s".format(one_shot))
+print("Persistent worker:   {:.2f} s".format(persistent))
+print("Output written to {}".format(output_dir))
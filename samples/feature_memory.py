@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""A benchmark for the memory used by a large project
+
+A project with 50000 objects, each with a placement, rotation, text content
+and a link, is built while tracing memory allocations.
+
+To run this script, use the following command::
+
+    $ python3 feature_memory.py [number of objects]
+"""
+import sys
+import time
+import tracemalloc
+from pyw3d import project, objects, placement, actions
+
+try:
+    num_objects = int(sys.argv[1])
+except IndexError:
+    num_objects = 50000
+
+tracemalloc.start()
+start = time.time()
+my_project = project.W3DProject(allow_movement=True)
+for i in range(num_objects):
+    my_project["objects"].append(objects.W3DObject(
+        name="text{}".format(i),
+        color=(i % 256, 0, 0),
+        placement=placement.W3DPlacement(
+            position=(i, 0, -4),
+            rotation=placement.W3DRotation(
+                rotation_mode="LookAt",
+                rotation_vector=(0, 0, 0)
+            )
+        ),
+        content=objects.W3DText(text="Text {}".format(i)),
+        link=objects.W3DLink(
+            actions={
+                -1: [
+                    actions.ObjectAction(
+                        object_name="text{}".format(i),
+                        visible=False
+                    )
+                ]
+            }
+        )
+    ))
+elapsed = time.time() - start
+current, peak = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+
+print("Objects:             {}".format(num_objects))
+print("Build time:          {:.2f} s".format(elapsed))
+print("Current memory:      {:.1f} MiB".format(current / 2**20))
+print("Peak memory:         {:.1f} MiB".format(peak / 2**20))
+print("Bytes per object:    {:.0f}".format(current / num_objects))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""A benchmark for repeated validation of a project during editing
+
+Projects of increasing size are validated once in full, then again without
+changes and again after editing a single object. For each validation, the wall
+time taken is shown along with the number of validators called. Since
+unchanged features are skipped without being visited, both the time and the
+number of calls after an edit depend on the edit rather than the size of the
+project.
+
+To run this script, use the following command::
+
+    $ python3 incremental_validation.py
+"""
+import time
+from pyw3d import project, objects, placement, actions, timeline, validators
+
+validator_calls = [0]
+
+
+def count_calls(validator_class):
+    """Wrap __call__ of validator_class to count calls to it"""
+    original_call = validator_class.__call__
+
+    def counted_call(self, *args, **kwargs):
+        validator_calls[0] += 1
+        return original_call(self, *args, **kwargs)
+    validator_class.__call__ = counted_call
+
+for name in dir(validators):
+    value = getattr(validators, name)
+    if isinstance(value, type) and issubclass(value, validators.Validator):
+        count_calls(value)
+
+
+def build_project(num_objects):
+    """Create a project with num_objects text objects and a timeline
+    showing each of them"""
+    my_project = project.W3DProject(allow_movement=True)
+    for i in range(num_objects):
+        my_project["objects"].append(objects.W3DObject(
+            name="text{}".format(i),
+            color=(i % 256, 0, 0),
+            placement=placement.W3DPlacement(position=(i, 0, -4)),
+            content=objects.W3DText(text="Text {}".format(i)),
+        ))
+    my_project["timelines"].append(timeline.W3DTimeline(
+        name="show",
+        actions=[
+            (i / 10, actions.ObjectAction(
+                object_name="text{}".format(i), visible=True))
+            for i in range(0, num_objects, 10)
+        ]
+    ))
+    return my_project
+
+
+def timed_validation(my_project):
+    """Validate project and return elapsed wall time in milliseconds and
+    number of validator calls"""
+    validator_calls[0] = 0
+    start = time.perf_counter()
+    my_project.validate(project=my_project)
+    return (time.perf_counter() - start) * 1000, validator_calls[0]
+
+# Validators keep a reference to the last project they were used with, so all
+# projects are built before any is validated
+all_projects = [
+    build_project(num_objects) for num_objects in (100, 200, 400, 800)]
+
+print("{:>8} {:>20} {:>20} {:>20}".format(
+    "objects", "full (ms / calls)", "unchanged", "one edit"))
+for my_project in all_projects:
+    num_objects = len(my_project["objects"])
+    full = timed_validation(my_project)
+    unchanged = timed_validation(my_project)
+    my_project["objects"][num_objects // 2]["color"] = (0, 255, 0)
+    edited = timed_validation(my_project)
+    print("{:>8} {:>20} {:>20} {:>20}".format(num_objects, *(
+        "{:.3f} / {}".format(*result)
+        for result in (full, unchanged, edited))))
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""A benchmark for the detection logic of MovementTriggers on large groups
+
+The detect_event function generated for a MovementTrigger is run against a
+stand-in for the Blender game engine's scene, so this script runs without
+Blender. As in the game engine, looking up an object in the scene by name
+searches the list of all objects in the scene. The time per tick of the
+generated code is compared with looking up every tracked object by name on
+every tick.
+
+To run this script, use the following command::
+
+    $ python3 movement_trigger_benchmark.py [number of objects]
+"""
+import sys
+import time
+import types
+from pyw3d import project, objects, groups, triggers
+
+try:
+    num_objects = int(sys.argv[1])
+except IndexError:
+    num_objects = 1000
+num_ticks = 200
+
+
+class GameObject(dict):
+    """Stand-in for a KX_GameObject, holding game properties"""
+
+    def __init__(self, name, position=(0, 0, 0)):
+        super(GameObject, self).__init__()
+        self.name = name
+        self.position = position
+        self.invalid = False
+
+
+class ObjectList(list):
+    """Stand-in for CListValue, which finds objects by name by searching the
+    whole list"""
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for object_ in self:
+                if object_.name == key:
+                    return object_
+            raise KeyError(key)
+        return super(ObjectList, self).__getitem__(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+my_project = project.W3DProject()
+object_names = ["box{}".format(i) for i in range(num_objects)]
+for name in object_names:
+    my_project["objects"].append(objects.W3DObject(
+        name=name, content=objects.W3DText(text=name)))
+my_project["groups"].append(groups.W3DGroup(
+    name="boxes", objects=object_names))
+for trigger_type in ("Group(Any)", "Group(All)"):
+    my_project["trigger_events"].append(triggers.MovementTrigger(
+        name=trigger_type.strip(")").replace("(", "_"),
+        type=trigger_type,
+        object_name="boxes",
+        box=triggers.EventBox(
+            corner1=(-1, -1, -1), corner2=(1, 1, 1), direction="Outside")
+    ))
+scene_plan = my_project.plan_scene()
+
+scene = types.SimpleNamespace(objects=ObjectList(
+    GameObject("object_{}".format(name)) for name in object_names))
+sys.modules["bge"] = types.SimpleNamespace(logic=types.SimpleNamespace(
+    getCurrentScene=lambda: scene))
+for module_name in ("mathutils", "angles"):
+    sys.modules[module_name] = types.ModuleType(module_name)
+for module_name in ("w3d_settings", "group_defs"):
+    module = types.ModuleType(module_name)
+    sys.modules[module_name] = module
+    exec(scene_plan.get_text(module_name + ".py"), module.__dict__)
+
+
+def detect_by_name(cont, all_objects):
+    """Detection looking up every tracked object by name on every tick"""
+    own = cont.owner
+    tracked = [scene.objects[name] for name in all_objects]
+    in_region = True
+    for object_ in tracked:
+        position = object_.position
+        in_region = in_region and not (
+            -1 <= position[0] <= 1 and -1 <= position[1] <= 1)
+    if in_region and own['enabled'] and own['status'] == 'Stop':
+        own['status'] = 'Start'
+
+
+print("Objects:  {}".format(num_objects))
+for trigger in my_project["trigger_events"]:
+    trigger_name = trigger.activator.name
+    module = types.ModuleType(trigger_name)
+    exec(scene_plan.get_text(trigger_name + ".py"), module.__dict__)
+    owner = GameObject(trigger_name)
+    owner["enabled"] = True
+    cont = types.SimpleNamespace(owner=owner)
+
+    start = time.time()
+    for tick in range(num_ticks):
+        owner["status"] = "Stop"
+        module.detect_event(cont)
+    generated_time = (time.time() - start) / num_ticks
+
+    all_objects = sys.modules["group_defs"].group_boxes
+    start = time.time()
+    for tick in range(num_ticks):
+        owner["status"] = "Stop"
+        detect_by_name(cont, all_objects)
+    by_name_time = (time.time() - start) / num_ticks
+
+    print("{}:".format(trigger["type"]))
+    print("  Generated detection:  {:.3f} ms/tick".format(
+        generated_time * 1000))
+    print("  Lookup by name:       {:.3f} ms/tick".format(
+        by_name_time * 1000))
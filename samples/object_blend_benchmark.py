@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""A benchmark counting the Blender operator calls made while creating
+objects
+
+Objects are created against a stand-in for Blender's Python modules, so this
+script runs without Blender. For projects of increasing size, it counts the
+operators called, the changes made to the selection and the lookups by name
+made while creating the geometry, game properties and logic bricks of each
+object. In Blender, each
+operator call updates the whole scene, so work grows with the square of the
+number of objects unless the number of operator calls stays roughly constant.
+Logic bricks can only be added by operators, so one call per brick remains.
+
+To run this script, use the following command::
+
+    $ python3 object_blend_benchmark.py [largest number of objects]
+"""
+import sys
+import time
+import types
+from collections import Counter
+
+
+class Anything(object):
+    """Stand-in for any Blender value not modelled below"""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = Anything()
+        setattr(self, name, value)
+        return value
+
+    def __call__(self, *args, **kwargs):
+        return Anything()
+
+    def __getitem__(self, key):
+        return Anything()
+
+    def __setitem__(self, key, value):
+        pass
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 1
+
+    def __add__(self, other):
+        return Anything()
+    __radd__ = __sub__ = __rsub__ = __mul__ = __rmul__ = __add__
+    __truediv__ = __neg__ = __add__
+
+
+class Collection(list):
+    """Stand-in for a collection of named Blender data"""
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for item in self:
+                if item.name == key:
+                    return item
+            raise KeyError(key)
+        return list.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [item.name for item in self]
+
+
+class ObjectCollection(Collection):
+    """Stand-in for bpy.data.objects, in which looking up an object by name
+    takes time proportional to the number of objects"""
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            COUNTS["name lookups"] += 1
+        return super().__getitem__(key)
+
+
+class BrickCollection(Collection):
+    """Stand-in for a collection of logic bricks, counting lookups by name"""
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            COUNTS["name lookups"] += 1
+        return super().__getitem__(key)
+
+
+class StubBrick(Anything):
+    def __init__(self, name):
+        self.name = name
+        self.links = []
+
+    def link(self, sensor=None, actuator=None):
+        self.links.append(sensor or actuator)
+
+
+class StubObject(Anything):
+    def __init__(self, name, data=None):
+        self.name = name
+        self.data = data if data is not None else Anything()
+        self.type = "MESH"
+        self.color = [1, 1, 1, 1]
+        self.material_slots = []
+        self._select = False
+        self.game = types.SimpleNamespace(
+            properties=Collection(), sensors=BrickCollection(),
+            controllers=BrickCollection(), actuators=BrickCollection())
+
+    @property
+    def select(self):
+        return self._select
+
+    @select.setter
+    def select(self, value):
+        COUNTS["selection changes"] += 1
+        self._select = value
+
+    def copy(self):
+        return new_object(self.name + ".001", self.data)
+
+
+def new_object(name, data):
+    new = StubObject(name, data)
+    data_objects.append(new)
+    return new
+
+
+def get_unique_name(bricks, name):
+    """Return name made unique among bricks, the logic bricks of one kind on
+    an object, as Blender does when adding a logic brick"""
+    taken = {brick.name for brick in bricks}
+    unique_name = name
+    number = 0
+    while unique_name in taken:
+        number += 1
+        unique_name = "{}.{:03d}".format(name, number)
+    return unique_name
+
+
+def call_operator(name, context=None, parameters=None):
+    parameters = parameters or {}
+    active = scene.objects.active
+    if name.startswith("logic."):
+        COUNTS["brick operator calls"] += 1
+        assert active.name == parameters["object"]
+        kind = name[len("logic."):-len("_add")]
+        bricks = getattr(active.game, kind + "s")
+        bricks.append(StubBrick(get_unique_name(bricks, parameters["name"])))
+        return {"FINISHED"}
+    COUNTS["operator calls"] += 1
+    if name == "object.game_property_new":
+        active.game.properties.append(types.SimpleNamespace(
+            name=parameters["name"], type=parameters["type"], value=None))
+    elif name == "object.game_property_copy":
+        for target in scene_objects:
+            if target.select and target is not active:
+                target.game.properties = Collection(
+                    types.SimpleNamespace(name=prop.name, type=prop.type,
+                                          value=prop.value)
+                    for prop in active.game.properties)
+    elif name in ("object.add", "object.camera_add"):
+        context.object = new_object("Added", None)
+        scene_objects.append(context.object)
+    return {"FINISHED"}
+
+
+class Operators(object):
+    def __init__(self, path=""):
+        self.path = path
+
+    def __getattr__(self, name):
+        return Operators(name if not self.path else self.path + "." + name)
+
+    def __call__(self, *args, **kwargs):
+        return call_operator(self.path, context, kwargs)
+
+
+COUNTS = Counter()
+data_objects = ObjectCollection()
+scene_objects = Collection()
+scene = Anything()
+scene.objects = types.SimpleNamespace(
+    link=scene_objects.append, active=None)
+context = Anything()
+context.scene = scene
+context.selectable_objects = scene_objects
+type(context).selected_objects = property(
+    lambda self: [obj for obj in scene_objects if obj.select])
+data = Anything()
+data.objects = data_objects
+data.objects.new = new_object
+bpy = types.ModuleType("bpy")
+bpy.data = data
+bpy.context = context
+bpy.ops = Operators()
+bpy.app = Anything()
+bpy_internal = types.ModuleType("_bpy")
+bpy_internal.ops = types.SimpleNamespace(call=call_operator)
+for name, module in (
+        ("bpy", bpy), ("_bpy", bpy_internal), ("bmesh", Anything()),
+        ("mathutils", Anything()), ("bge", Anything())):
+    sys.modules[name] = module
+
+from pyw3d import project, objects, placement, actions  # noqa: E402
+from pyw3d.export_context import ExportContext  # noqa: E402
+from pyw3d.scene_plan import SceneApplier  # noqa: E402
+
+
+def create_project(num_objects):
+    shapes = objects.W3DShape.argument_validators[
+        "shape_type"].valid_options
+    my_project = project.W3DProject()
+    for i in range(num_objects):
+        my_project["objects"].append(objects.W3DObject(
+            name="shape{}".format(i),
+            visible=bool(i % 2),
+            placement=placement.W3DPlacement(position=(i, 0, -4)),
+            content=objects.W3DShape(shape_type=shapes[i % len(shapes)]),
+            link=objects.W3DLink(actions={-1: [actions.ObjectAction(
+                object_name="shape{}".format(i), duration=1,
+                move_relative=True,
+                placement=placement.W3DPlacement(position=(0, 0.5, 0))
+            )]})
+        ))
+    return my_project
+
+
+def run(num_objects):
+    """Create objects with their game properties and logic bricks and return
+    counts"""
+    COUNTS.clear()
+    del data_objects[:]
+    del scene_objects[:]
+    my_project = create_project(num_objects)
+    scene_plan = my_project.plan_scene()
+    start = time.time()
+    with ExportContext():
+        my_project.blend_geometry()
+        applier = SceneApplier(scene_plan)
+        applier.apply_objects()
+    elapsed = time.time() - start
+    counts = COUNTS.copy()
+    for name in {spec.object for spec in scene_plan.properties}:
+        assert {
+            prop.name: prop.value
+            for prop in data_objects[name].game.properties
+        } == scene_plan.get_properties(name), name
+    for spec in scene_plan.bricks:
+        assert applier.get_brick(spec) is not None, spec
+    return counts, elapsed
+
+
+try:
+    max_objects = int(sys.argv[1])
+except IndexError:
+    max_objects = 1600
+
+print("{:>8} {:>10} {:>10} {:>10} {:>10} {:>8}".format(
+    "Objects", "Operators", "Bricks", "Selection", "Lookups", "Time"))
+num_objects = 100
+while num_objects <= max_objects:
+    counts, elapsed = run(num_objects)
+    print("{:>8} {:>10} {:>10} {:>10} {:>10} {:>7.3f}s".format(
+        num_objects, counts["operator calls"],
+        counts["brick operator calls"], counts["selection changes"],
+        counts["name lookups"], elapsed))
+    num_objects *= 2
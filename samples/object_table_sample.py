@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""An example showcasing generation of a large scene with W3DObjectTable
+
+Positions, colors and scales for every object are generated as NumPy arrays
+and checked all at once, rather than one W3DObject at a time. Requires numpy.
+
+To run this script, use the following command::
+
+    $ python3 object_table_sample.py [number of objects]
+"""
+
+import os
+import sys
+import time
+import numpy
+from pyw3d import project, objects, placement, export_to_blender
+from pyw3d.tables import W3DObjectTable
+
+try:
+    num_objects = int(sys.argv[1])
+except IndexError:
+    num_objects = 100000
+
+# First, create a W3DProject to hold everything else you'll create
+my_project = project.W3DProject(
+    call_directory=os.path.dirname(__file__),
+    allow_movement=True)
+
+start_time = time.time()
+# Scatter objects over a sphere of radius 10 (in legacy units)
+theta = numpy.arccos(numpy.random.uniform(-1, 1, num_objects))
+phi = numpy.random.uniform(0, 2 * numpy.pi, num_objects)
+positions = 10 * numpy.stack((
+    numpy.sin(theta) * numpy.cos(phi),
+    numpy.sin(theta) * numpy.sin(phi),
+    numpy.cos(theta)), axis=1)
+
+shapes = objects.W3DShape.argument_validators['shape_type'].valid_options
+table = W3DObjectTable.from_legacy_positions(
+    ["elem{}".format(i) for i in range(num_objects)],
+    positions,
+    [objects.W3DShape(shape_type=shape) for shape in shapes],
+    content_indices=numpy.arange(num_objects) % len(shapes),
+    colors=numpy.random.randint(0, 256, (num_objects, 3)),
+    scales=numpy.random.uniform(0.05, 0.2, num_objects),
+    rotation=placement.W3DRotation(
+        rotation_mode="LookAt",
+        rotation_vector=(0, 0, 0)
+    )
+)
+print("Generated {} objects in {:.2f} s".format(
+    num_objects, time.time() - start_time))
+
+# The table is kept as is by the project, and W3DObjects are only created from
+# its rows, one at a time, during export
+my_project["object_tables"].append(table)
+
+export_to_blender(
+    my_project, filename="object_table_sample.blend", display=False,
+    fullscreen=True
+)
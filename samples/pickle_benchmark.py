@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""A benchmark for pickling large projects, as done when handing a project
+to Blender for export
+
+To run this script, use the following command::
+
+    $ python3 pickle_benchmark.py [number of objects]
+"""
+import pickle
+import sys
+import time
+from pyw3d import project, objects, placement, actions, timeline
+
+try:
+    num_objects = int(sys.argv[1])
+except IndexError:
+    num_objects = 20000
+
+my_project = project.W3DProject(allow_movement=True)
+for i in range(num_objects):
+    my_project["objects"].append(objects.W3DObject(
+        name="text{}".format(i),
+        color=(i % 256, 0, 0),
+        placement=placement.W3DPlacement(
+            position=(i, 0, -4),
+            rotation=placement.W3DRotation(
+                rotation_mode="LookAt",
+                rotation_vector=(0, 0, 0)
+            )
+        ),
+        content=objects.W3DText(text="Text {}".format(i)),
+        link=objects.W3DLink(
+            actions={
+                -1: [
+                    actions.ObjectAction(
+                        object_name="text{}".format(i),
+                        visible=False
+                    )
+                ]
+            }
+        )
+    ))
+my_project["timelines"].append(timeline.W3DTimeline(
+    name="show",
+    actions=[
+        (i / 10, actions.ObjectAction(
+            object_name="text{}".format(i), visible=True))
+        for i in range(num_objects)
+    ]
+))
+
+start = time.time()
+data = pickle.dumps(my_project)
+pickle_time = time.time() - start
+start = time.time()
+pickle.loads(data)
+unpickle_time = time.time() - start
+
+print("Objects:        {}".format(num_objects))
+print("Pickle size:    {:.1f} MiB".format(len(data) / 2**20))
+print("Pickle time:    {:.3f} s".format(pickle_time))
+print("Unpickle time:  {:.3f} s".format(unpickle_time))
@@ -0,0 +1,117 @@
+# Copyright (C) 2016 William Hicks
+#
+# This file is part of Writing3D.
+#
+# Writing3D is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+"""A check of the timeline scheduler when one timeline restarts another
+
+The scripts generated for a project with schedule_timelines enabled are run
+against a stand-in for the Blender game engine, so this script runs without
+Blender. As in the game engine, the scheduler is notified of a change of
+status only if the status differs from its value at the previous tick.
+
+The timeline "kick" restarts the timeline "loop" while "loop" has an action
+in progress, so that the scheduler runs both timelines in the same tick and
+"kick" runs first. "loop" must then start over and stop once its actions are
+complete.
+
+To run this script, use the following command::
+
+    $ python3 timeline_scheduler_sample.py
+"""
+import sys
+import types
+from pyw3d import project, objects, timeline, actions
+
+tick_rate = 60
+num_ticks = 5 * tick_rate
+
+my_project = project.W3DProject(schedule_timelines=True)
+my_project["objects"].append(objects.W3DObject(
+    name="box", content=objects.W3DText(text="box")))
+my_project["timelines"].append(timeline.W3DTimeline(
+    name="loop", start_immediately=True, actions=[
+        (0, actions.ObjectAction(
+            object_name="box", visible=False, duration=1)),
+        (1, actions.ObjectAction(
+            object_name="box", visible=True, duration=1))
+    ]))
+my_project["timelines"].append(timeline.W3DTimeline(
+    name="kick", start_immediately=True, actions=[
+        (0.5, actions.TimelineAction(timeline_name="loop", change="Start"))
+    ]))
+scene_plan = my_project.plan_scene()
+
+
+class GameObject(dict):
+    """Stand-in for a KX_GameObject, holding game properties"""
+
+    def __init__(self, name):
+        super(GameObject, self).__init__()
+        self.name = name
+        self.visible = True
+        self.color = [1, 1, 1, 1]
+
+    def setVisible(self, visible):
+        self.visible = visible
+
+
+timeline_objects = [
+    GameObject(timeline_.activator.name)
+    for timeline_ in my_project["timelines"]]
+for timeline_, owner in zip(my_project["timelines"], timeline_objects):
+    owner["status"] = ("Stop", "Start")[timeline_["start_immediately"]]
+scene = types.SimpleNamespace(objects={
+    object_.name: object_
+    for object_ in [GameObject("object_box")] + timeline_objects})
+sys.modules["bge"] = types.SimpleNamespace(logic=types.SimpleNamespace(
+    getCurrentScene=lambda: scene, getLogicTicRate=lambda: tick_rate))
+sys.modules["mathutils"] = types.SimpleNamespace(
+    Quaternion=lambda *args: None)
+module_names = ["w3d_settings", "angles", "group_defs", "scheduler"] + [
+    owner.name for owner in timeline_objects]
+for module_name in module_names:
+    module = types.ModuleType(module_name)
+    sys.modules[module_name] = module
+    exec(scene_plan.get_text(module_name + ".py"), module.__dict__)
+
+scheduler = sys.modules["scheduler"]
+clock = [0.0]
+scheduler.monotonic = lambda: clock[0]
+scheduler_cont = types.SimpleNamespace(owner=GameObject("scheduler"))
+previous_status = {}
+loop_starts = []
+loop_stopped = None
+for tick in range(num_ticks):
+    clock[0] = tick / tick_rate
+    # Status sensors are checked before any controller runs
+    for owner in timeline_objects:
+        if owner["status"] != previous_status.get(owner.name):
+            previous_status[owner.name] = owner["status"]
+            scheduler.notify(types.SimpleNamespace(owner=owner))
+    loop_start = scene.objects["timeline_loop"].get("start_time")
+    scheduler.schedule(scheduler_cont)
+    loop = scene.objects["timeline_loop"]
+    if loop.get("start_time") != loop_start:
+        loop_starts.append(loop["start_time"])
+    if loop["status"] == "Stop" and loop_stopped is None:
+        loop_stopped = clock[0]
+
+print("loop started at: {}".format(
+    ", ".join("{:.3f} s".format(start) for start in loop_starts)))
+print("loop stopped at: {}".format(
+    "never" if loop_stopped is None else "{:.3f} s".format(loop_stopped)))
+assert loop_starts == [0.0, 0.5], loop_starts
+assert loop_stopped is not None and loop_stopped >= 2.5, loop_stopped